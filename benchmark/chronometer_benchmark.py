@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+#
+#  chronometer_benchmark.py
+#  pihole-display
+#
+#  Compares the per-field token scans the stat grabber used to parse
+#  pihole -c -e with the single pass chronometer parser on the test corpus,
+#  reports JSON.
+#
+#  Usage: python benchmark/chronometer_benchmark.py --repeat 1000
+#
+
+import os
+import sys
+import glob
+import json
+import argparse
+import platform
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from chronometer_parser import parse_chronometer
+from timing import time_calls
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'test', 'corpus', 'chronometer')
+
+
+def index_scan_parse(stat_string):
+    """ Parsing as implemented before: one list scan per field, string values,
+    typed afterwards by the display """
+    raw_stat_list = stat_string.split()
+    stats = {}
+    for key, label, offset in [('version_core', 'Core:', 1), ('version_web', 'Web:', 1),
+                               ('version_ftl', 'FTL:', 1), ('hostname', 'Hostname:', 1),
+                               ('uptime', 'Uptime:', 1), ('status', 'Pi-hole:', 1),
+                               ('known_client_count', '(Leased:', 1), ('blocking', '(Blocking:', 1),
+                               ('topclient', 'Client:', 1)]:
+        try:
+            stats[key] = raw_stat_list[raw_stat_list.index(label) + offset]
+        except (ValueError, IndexError):
+            stats[key] = ''
+    try:
+        stats['today_percentage'] = raw_stat_list[raw_stat_list.index('Today:') + 1][:-1]
+    except (ValueError, IndexError):
+        stats['today_percentage'] = ''
+    try:
+        stats['ratio'] = (raw_stat_list[raw_stat_list.index('(Total:') + 1],
+                          raw_stat_list[raw_stat_list.index('(Total:') + 3])
+    except (ValueError, IndexError):
+        stats['ratio'] = ''
+    return stats
+
+
+def run_benchmarks(repeat=1000):
+    results = {}
+    for path in sorted(glob.glob(os.path.join(CORPUS_PATH, '*.txt'))):
+        with open(path, 'r', encoding='utf-8') as output_file:
+            output = output_file.read()
+
+        result = {'index_scan': time_calls(lambda: index_scan_parse(output), repeat),
+                  'single_pass': time_calls(lambda: parse_chronometer(output), repeat)}
+        result['speedup'] = result['index_scan']['mean_ms'] / result['single_pass']['mean_ms']
+        results[os.path.basename(path)] = result
+
+    return {'meta': {'python': platform.python_version(),
+                     'machine': platform.machine(),
+                     'repeat': repeat},
+            'results': results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks parsing of pihole -c -e output')
+    parser.add_argument('--repeat', type=int, default=1000, help='calls per measurement')
+    parser.add_argument('--output', help='write JSON report to this file instead of stdout')
+    args = parser.parse_args()
+
+    report = run_benchmarks(repeat=args.repeat)
+    report_string = json.dumps(report, indent=4, sort_keys=True)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as report_file:
+            report_file.write(report_string)
+    else:
+        print(report_string)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+#
+#  page_conversion_benchmark.py
+#  pihole-display
+#
+#  Compares the per-pixel frame conversion of adafruit_ssd1306 image() with
+#  the vectorized PageCanvas path and reports the results as JSON.
+#
+#  Usage: python benchmark/page_conversion_benchmark.py --repeat 200
+#
+
+import os
+import sys
+import json
+import argparse
+import platform
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from page_canvas import PageCanvas
+from page_buffer import image_to_page_buffer
+from timing import time_calls
+
+
+def per_pixel_page_buffer(image):
+    """ Conversion as implemented by adafruit_ssd1306 image(): clear the buffer
+    and set every lit pixel individually """
+    width, height = image.size
+    buffer = bytearray(width * height // 8)
+    pixels = image.load()
+    for x in range(width):
+        for y in range(height):
+            if pixels[(x, y)]:
+                buffer[(y // 8) * width + x] |= 1 << (y % 8)
+    return bytes(buffer)
+
+
+def sample_frame(width, height):
+    """ Returns a frame with text-like density """
+    image = Image.new('1', (width, height))
+    draw = ImageDraw.Draw(image)
+    draw.text((0, 0), 'Blocked today:', fill=255)
+    draw.rectangle((0, 8, width - 4, 21), fill=255)
+    draw.rectangle((1, 9, width - 5, 20), fill=0)
+    draw.rectangle((2, 10, width // 3, 19), fill=255)
+    draw.text((0, 24), '(4,321/18,765', fill=255)
+    return image
+
+
+def run_benchmarks(repeat=200, width=128, height=32):
+    image = sample_frame(width, height)
+    canvas = PageCanvas(width, height)
+    bitmap = np.asarray(image.crop((0, 0, 64, 16)), dtype=bool)
+
+    assert per_pixel_page_buffer(image) == image_to_page_buffer(image, width, height // 8)
+
+    results = {'per_pixel_image_conversion': time_calls(lambda: per_pixel_page_buffer(image), repeat),
+               'vectorized_image_conversion': time_calls(lambda: image_to_page_buffer(image, width, height // 8), repeat),
+               'canvas_fill_rect': time_calls(lambda: canvas.fill_rect(2, 10, 80, 19), repeat),
+               'canvas_blit_unaligned': time_calls(lambda: canvas.blit(bitmap, 13, 5), repeat),
+               'canvas_shift_window': time_calls(lambda: canvas.shift_window(0, 24, width - 1, 31, -1), repeat),
+               'canvas_tobytes': time_calls(canvas.tobytes, repeat)}
+
+    results['conversion_speedup'] = (results['per_pixel_image_conversion']['mean_ms'] /
+                                     results['vectorized_image_conversion']['mean_ms'])
+
+    return {'meta': {'python': platform.python_version(),
+                     'numpy': np.__version__,
+                     'machine': platform.machine(),
+                     'size': [width, height],
+                     'repeat': repeat},
+            'results': results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks frame conversion into the SSD1306 page layout')
+    parser.add_argument('--repeat', type=int, default=200, help='calls per measurement')
+    parser.add_argument('--height', type=int, default=32, choices=(32, 64), help='display height')
+    parser.add_argument('--output', help='write JSON report to this file instead of stdout')
+    args = parser.parse_args()
+
+    report = run_benchmarks(repeat=args.repeat, height=args.height)
+    report_string = json.dumps(report, indent=4, sort_keys=True)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as report_file:
+            report_file.write(report_string)
+    else:
+        print(report_string)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+#
+#  proc_metrics_benchmark.py
+#  pihole-display
+#
+#  Compares the latency of the shell pipelines the stat grabber used to spawn
+#  with reading the same metrics from /proc and syscalls, reports JSON.
+#
+#  Usage: python benchmark/proc_metrics_benchmark.py --repeat 50
+#
+
+import os
+import sys
+import json
+import shutil
+import argparse
+import platform
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from proc_metrics import ProcMetrics
+from timing import time_calls
+
+##
+# Metric -> (shell pipeline, executable it needs, native reader)
+# arp runs without sudo here, the table is readable by everyone
+METRICS = {'local_ip': ("hostname -I | cut -d' ' -f1", 'hostname', lambda metrics: metrics.local_ip()),
+           'arp_table': ('arp -a | wc -l', 'arp', lambda metrics: metrics.arp_entries()),
+           'disk_space': ('df -h | awk \'$NF=="/"{printf "%d/%d GB  %s", $3,$2,$5}\'', 'df',
+                          lambda metrics: (metrics.disk_usage('/'), metrics.disk_percentage('/'))),
+           'memory': ('free -m', 'free', lambda metrics: metrics.memory_usage()),
+           'load_average': ('cat /proc/loadavg', 'cat', lambda metrics: metrics.load_average())}
+
+
+def run_benchmarks(repeat=50):
+    metrics = ProcMetrics()
+    results = {}
+    for name, (cmd, executable, read_native) in METRICS.items():
+        try:
+            read_native(metrics)
+        except OSError as exc:
+            results[name] = {'skipped': str(exc)}
+            continue
+
+        result = {'native': time_calls(lambda: read_native(metrics), repeat)}
+        if shutil.which(executable) is None:
+            result['subprocess'] = {'skipped': '{} not found'.format(executable)}
+        else:
+            result['subprocess'] = time_calls(lambda: subprocess.check_output(cmd, shell=True), repeat)
+            result['speedup'] = result['subprocess']['mean_ms'] / result['native']['mean_ms']
+        results[name] = result
+
+    return {'meta': {'python': platform.python_version(),
+                     'machine': platform.machine(),
+                     'repeat': repeat},
+            'results': results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks shell pipelines against /proc and syscall reads')
+    parser.add_argument('--repeat', type=int, default=50, help='calls per measurement')
+    parser.add_argument('--output', help='write JSON report to this file instead of stdout')
+    args = parser.parse_args()
+
+    report = run_benchmarks(repeat=args.repeat)
+    report_string = json.dumps(report, indent=4, sort_keys=True)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as report_file:
+            report_file.write(report_string)
+    else:
+        print(report_string)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python
+#
+#  render_benchmark.py
+#  pihole-display
+#
+#  Drives each view through the virtual display for a fixed number of ticks
+#  and reports frames/sec, p50/p99 frame time and allocations per frame as JSON.
+#
+#  Usage: python benchmark/render_benchmark.py --ticks 300 --output render.json
+#
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import PIL
+import numpy as np
+from led_display import Display
+from config import Config
+from metric_history import MetricHistory
+from timing import percentile
+
+
+FIXTURE_STATS = {'api': True,
+                 'version_core': 'v5.1.2',
+                 'version_web': 'v5.2.1',
+                 'version_ftl': 'v5.3.4',
+                 'hostname': 'pihole',
+                 'uptime': 45296,
+                 'status': 'Active',
+                 'known_client_count': 17,
+                 'today_percentage': 23.0,
+                 'blocking': 87234,
+                 'ratio': (4321, 18765),
+                 'topclient': 'living-room-television.lan',
+                 'active_device_count': 12}
+
+FIXTURE_WEATHER = {'connection': True,
+                   'weatherDesc': [{'value': 'Partly cloudy'}],
+                   'precipMM': '1.2mm',
+                   'winddir16Point': 'WSW',
+                   'windspeedKmph': '17',
+                   'pressure': '998',
+                   'temp_C': '19',
+                   'humidity': '81'}
+
+
+class FixtureStatGrabber():
+    """ Serves fixed stats so that benchmarks neither fork nor touch the network """
+
+    def get_pihole_stats(self):
+        return dict(FIXTURE_STATS)
+
+    def get_weather(self):
+        return dict(FIXTURE_WEATHER)
+
+    def get_time(self):
+        return '13:37'
+
+    def get_cpu_load(self):
+        return 42.0
+
+    def get_memory_percentage(self):
+        return 23.0
+
+    def get_metric_history(self):
+        return fixture_metric_history()
+
+    def get_query_history(self):
+        return fixture_query_history()
+
+
+def fixture_metric_history():
+    """ Returns a day of per-minute samples following a daily curve """
+    metric_history = MetricHistory()
+    minutes = np.arange(24 * 60 + 1)
+    curve = np.sin(minutes * np.pi / (24 * 60)) ** 2
+    for minute, value in zip(minutes, curve):
+        metric_history.add({'cpu': 10 + 60 * value,
+                            'memory': 23.0,
+                            'blocked_percentage': 35 - 20 * value,
+                            'queries': 20 * minute}, now=minute * 60)
+    return metric_history
+
+
+def fixture_query_history():
+    """ Returns (hour start, blocked, allowed) of a day following the same curve """
+    hours = np.arange(24)
+    curve = np.sin(hours * np.pi / 24) ** 2
+    return [(int(hour) * 3600, int(200 + 300 * value), int(600 + 1200 * value)) for hour, value in zip(hours, curve)]
+
+
+def draw_progress_view(display, tick):
+    display.current_message_dict = {'activity_name': 'UPDATING',
+                                    'activity_detail': 'FIRMWARE',
+                                    'activity_name_finished': 'UPDATE',
+                                    'activity_detail_finished': 'FINISHED',
+                                    'percentage': 0.5}
+    display.draw_progress_view(tick=tick)
+
+
+def draw_connection_view(display, tick):
+    display.current_message_dict = {'established': False,
+                                    'attempt_count': 3,
+                                    'messages': ['NO CONNECTION', 'PRESS WPS BUTTON', 'ON YOUR ROUTER']}
+    display.draw_connection_view(tick=tick)
+
+
+##
+# View name -> (draw function, drawn with state progress bar as in MODE.CYCLE)
+VIEWS = {'blocked_stats': (lambda display, tick: display.draw_blocked_stats(tick=tick), True),
+         'client_stats': (lambda display, tick: display.draw_client_stats(tick=tick), True),
+         'system_stats': (lambda display, tick: display.draw_system_stats(), True),
+         'weather_view': (lambda display, tick: display.draw_weather_view(tick=tick), True),
+         'history_view': (lambda display, tick: display.draw_history_view(), True),
+         'query_view': (lambda display, tick: display.draw_query_view(), True),
+         'progress_view': (draw_progress_view, False),
+         'chip': (lambda display, tick: display.draw_chip(pos=(0, 0), percentage=0.5, tick=tick), False),
+         'intro_view': (lambda display, tick: display.draw_intro_view(tick=tick), False),
+         'connection_view': (draw_connection_view, False)}
+
+
+def create_display(config):
+    """ Returns a display rendering fixture data into the virtual backend """
+    display = Display(backend='virtual', stat_grabber=FixtureStatGrabber(), config=config)
+    display.update_pihole_stats()
+    display.update_weather_view()
+    display.update_history_view()
+    display.update_query_view()
+    return display
+
+
+def render_frame(display, view, frame_index, ticks):
+    """ Renders and transfers a single frame the way Display.run() does """
+    draw_view, with_state_progress = view
+    tick = frame_index % display.max_fps
+
+    display.clear_display()
+    draw_view(display, tick)
+    if with_state_progress:
+        display.draw_state_progress(frame_index / ticks)
+    display.backend.show(display.canvas)
+
+
+def benchmark_view(display, view, ticks, warmup=10):
+    """ Returns timing and allocation results of a single view """
+    display.backend.invalidate()
+    for frame_index in range(warmup):
+        render_frame(display, view, frame_index, ticks)
+
+    ##
+    # Timing pass
+    bytes_before = display.backend.bytes_transferred
+    frame_times = []
+    started = time.perf_counter()
+    for frame_index in range(ticks):
+        frame_started = time.perf_counter()
+        render_frame(display, view, frame_index, ticks)
+        frame_times.append(time.perf_counter() - frame_started)
+    elapsed = time.perf_counter() - started
+    bytes_transferred = display.backend.bytes_transferred - bytes_before
+
+    ##
+    # Allocation pass, separate because tracing slows down every allocation
+    allocated_bytes = 0
+    blocks_before = sys.getallocatedblocks()
+    tracemalloc.start()
+    for frame_index in range(ticks):
+        # Restarts traced and peak memory at zero (reset_peak() needs Python 3.9)
+        tracemalloc.clear_traces()
+        render_frame(display, view, frame_index, ticks)
+        allocated_bytes += tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    retained_blocks = sys.getallocatedblocks() - blocks_before
+
+    frame_times.sort()
+    return {'frames': ticks,
+            'fps': ticks / elapsed,
+            'frame_time_p50_ms': percentile(frame_times, 0.5) * 1000,
+            'frame_time_p99_ms': percentile(frame_times, 0.99) * 1000,
+            'frame_time_max_ms': frame_times[-1] * 1000,
+            'allocated_bytes_per_frame': allocated_bytes / ticks,
+            'retained_blocks_per_frame': retained_blocks / ticks,
+            'bus_bytes_per_frame': bytes_transferred / ticks}
+
+
+def run_benchmarks(ticks=300, view_names=None, config=None):
+    """ Benchmarks all (or the named) views and returns the JSON-serializable report.
+    Without config, assets and glyph atlases are built in a temporary directory """
+    if config is None:
+        with tempfile.TemporaryDirectory(prefix='pihole-display-cache-') as cache_path:
+            return run_benchmarks(ticks, view_names, Config(cache_path=cache_path))
+
+    display = create_display(config)
+    results = {}
+
+    for name in view_names or VIEWS:
+        if name == 'intro_view' and not display.animation:
+            results[name] = {'skipped': 'no intro animation loaded'}
+            continue
+        results[name] = benchmark_view(display, VIEWS[name], ticks)
+
+    return {'meta': {'python': platform.python_version(),
+                     'pillow': PIL.__version__,
+                     'machine': platform.machine(),
+                     'backend': type(display.backend).__name__,
+                     'ticks': ticks,
+                     'timestamp': time.time()},
+            'views': results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks the render path of every view')
+    parser.add_argument('--ticks', type=int, default=300, help='frames rendered per view')
+    parser.add_argument('--views', nargs='*', choices=sorted(VIEWS), help='views to benchmark, all by default')
+    parser.add_argument('--output', help='write JSON report to this file instead of stdout')
+    args = parser.parse_args()
+
+    report = run_benchmarks(ticks=args.ticks, view_names=args.views)
+    report_string = json.dumps(report, indent=4, sort_keys=True)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as report_file:
+            report_file.write(report_string)
+    else:
+        print(report_string)
+
+
+if __name__ == "__main__":
+    main()
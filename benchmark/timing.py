@@ -0,0 +1,32 @@
+#
+#  timing.py
+#  pihole-display
+#
+#  Shared timing helpers of the benchmark scripts.
+#
+
+import time
+
+
+def percentile(sorted_values, fraction):
+    """ Returns the value at fraction (0.0 - 1.0) of an already sorted list """
+    index = int(round(fraction * (len(sorted_values) - 1)))
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+def time_calls(function, repeat, warmup=3):
+    """ Calls function repeat times and returns its timing statistics in milliseconds """
+    for _ in range(warmup):
+        function()
+
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - started)
+
+    durations.sort()
+    return {'calls': repeat,
+            'mean_ms': sum(durations) / repeat * 1000,
+            'p50_ms': percentile(durations, 0.5) * 1000,
+            'p99_ms': percentile(durations, 0.99) * 1000}
@@ -2,7 +2,12 @@
 
 import os
 from led_display import Display, MODE
+from display_group import DisplayGroup, parse_display_spec
+from frame_recorder import FrameRecorder
+from frame_metrics import install_dump_signal, DUMP_PATH
 from housekeeper import Housekeeper
+from stat_grabber import StatGrabber
+from config import ConfigWatcher, CONFIG_PATH
 from time import sleep
 
 
@@ -65,12 +70,41 @@ def main():
         cwd_path = os.getcwd()
 
         housekeeper = Housekeeper()
-        display = Display()
 
-        housekeeper.attach(display)
+        # Settings are parsed once and reloaded when pihole-display.ini changes
+        config_watcher = ConfigWatcher(os.environ.get('PIHOLE_DISPLAY_CONFIG', CONFIG_PATH))
+        config = config_watcher.config
+        stat_grabber = StatGrabber(config)
+        config_watcher.attach(stat_grabber)
+
+        # 'ssd1306' drives the panel, 'virtual' renders into memory
+        backend = os.environ.get('PIHOLE_DISPLAY_BACKEND', 'ssd1306')
+
+        # Several panels, e.g. PIHOLE_DISPLAYS='0x3C:128x32;0x3D:128x64:weather,blocked'
+        display_spec = os.environ.get('PIHOLE_DISPLAYS')
+        if display_spec:
+            display = DisplayGroup(parse_display_spec(display_spec), backend=backend,
+                                   stat_grabber=stat_grabber, config=config)
+            display.attach_to(housekeeper)
+            display.attach_to(config_watcher)
+        else:
+            display = Display(backend=backend, stat_grabber=stat_grabber, config=config)
+            housekeeper.attach(display)
+            config_watcher.attach(display)
+
+            # Record all frames for replay, see frame_recorder.py
+            recording_path = os.environ.get('PIHOLE_DISPLAY_RECORD')
+            if recording_path:
+                display.recorder = FrameRecorder(recording_path, display.width, display.height)
+
+        # Dump frame timing with `kill -USR1 <pid>`, print it with `frame_metrics.py report`
+        displays = display.displays if isinstance(display, DisplayGroup) else [display]
+        install_dump_signal({d.name: d.metrics for d in displays},
+                            os.environ.get('PIHOLE_DISPLAY_METRICS', DUMP_PATH))
 
         # display.daemon = True
         display.start()
+        config_watcher.start()
 
         housekeeper.boot()
 
@@ -87,7 +121,7 @@ def main():
         print('Keyboard Interrupt detected: Exiting.')
         # Shut down display
         housekeeper.clear_mode()
-        display.should_run = False
+        display.stop()
         # display.clear_display(refresh=True)
         display.join(5)
 
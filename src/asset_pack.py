@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+#
+#  asset_pack.py
+#  pihole-display
+#
+#  Compiles GIF animations and icons into a single binary pack of pre-dithered,
+#  packed 1-bit frames. The pack is memory-mapped at startup and frames are
+#  only decoded when they are drawn. It is keyed by the hashes of its source
+#  files and rebuilt automatically whenever one of them changes.
+#
+#  Usage: python src/asset_pack.py  (compiles anim/ and icons/ ahead of time)
+#
+
+import os
+import sys
+import json
+import mmap
+import struct
+import hashlib
+from PIL import Image
+
+##
+# File layout: magic, version, header length, JSON header, frame data
+PACK_MAGIC = b'PHDA'
+PACK_VERSION = 1
+PACK_PREAMBLE = struct.Struct('<4sHI')
+
+ICON_SIZE = (32, 32)
+
+
+def file_hash(path):
+    """ Returns the SHA1 hex digest of a file """
+    digest = hashlib.sha1()
+    with open(path, 'rb') as source_file:
+        for chunk in iter(lambda: source_file.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def iter_frames_of_gif(gif):
+    """ Yields all frames of a gif, sharing the palette of the first frame """
+    try:
+        i = 0
+        while True:
+            gif.seek(i)
+            imframe = gif.copy()
+            if i == 0:
+                palette = imframe.getpalette()
+            elif imframe.mode == 'P' and palette is not None:
+                # Newer Pillow versions already return later frames as RGB/L
+                imframe.putpalette(palette)
+            yield imframe
+            i += 1
+    except EOFError:
+        pass
+
+
+def asset_key(name, size=None):
+    """ Returns the pack key of an asset at size (None = original size) """
+    if size is None:
+        return name
+    return '{}@{}x{}'.format(name, size[0], size[1])
+
+
+def source_assets(base_path):
+    """ Returns {key: (path, kind, size)} for all animations and icons below base_path """
+    assets = {}
+
+    anim_directory = os.path.join(base_path, 'anim')
+    if os.path.isdir(anim_directory):
+        for name in sorted(os.listdir(anim_directory)):
+            if name.lower().endswith('.gif'):
+                assets[asset_key(name)] = (os.path.join(anim_directory, name), 'animation', None)
+
+    icon_directory = os.path.join(base_path, 'icons')
+    if os.path.isdir(icon_directory):
+        for name in sorted(os.listdir(icon_directory)):
+            if name.lower().endswith(('.png', '.bmp', '.gif')):
+                assets[asset_key(name, ICON_SIZE)] = (os.path.join(icon_directory, name), 'icon', ICON_SIZE)
+
+    return assets
+
+
+def convert_frames(path, kind, size):
+    """ Returns the mode '1' frames of an asset, converted exactly like the
+    display used to do it at runtime """
+    source = Image.open(path, mode='r')
+
+    if kind == 'icon':
+        return [source.resize(size).convert('1')]
+
+    frames = []
+    for frame in iter_frames_of_gif(source):
+        if size is None:
+            frames.append(frame.convert('1'))
+        else:
+            frames.append(frame.resize(size).convert('1'))
+    return frames
+
+
+def compile_asset_pack(pack_path, assets):
+    """ Converts all assets and writes them into a pack at pack_path """
+    header = {'sources': {}, 'entries': {}}
+    data = bytearray()
+
+    for key, (path, kind, size) in assets.items():
+        header['sources'][key] = file_hash(path)
+        frames = []
+        for frame in convert_frames(path, kind, size):
+            frame_bytes = frame.tobytes()
+            frames.append({'offset': len(data),
+                           'length': len(frame_bytes),
+                           'size': list(frame.size)})
+            data += frame_bytes
+        header['entries'][key] = frames
+
+    header_bytes = json.dumps(header, sort_keys=True).encode('utf-8')
+
+    # Write atomically, a running display may have the old pack mapped
+    temporary_path = '{}.tmp'.format(pack_path)
+    with open(temporary_path, 'wb') as pack_file:
+        pack_file.write(PACK_PREAMBLE.pack(PACK_MAGIC, PACK_VERSION, len(header_bytes)))
+        pack_file.write(header_bytes)
+        pack_file.write(data)
+    os.replace(temporary_path, pack_path)
+
+
+class AnimationFrames():
+    """ Sequence of frames that are decoded from the pack on access """
+
+    def __init__(self, pack, entries):
+        self.pack = pack
+        self.entries = entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __getitem__(self, index):
+        return self.pack.decode_frame(self.entries[index])
+
+    def __iter__(self):
+        for entry in self.entries:
+            yield self.pack.decode_frame(entry)
+
+
+class AssetPack():
+    """ Read-only, memory-mapped asset pack """
+
+    def __init__(self, pack_path):
+        self.pack_path = pack_path
+        with open(pack_path, 'rb') as pack_file:
+            self.data = mmap.mmap(pack_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, header_length = PACK_PREAMBLE.unpack_from(self.data, 0)
+        if magic != PACK_MAGIC or version != PACK_VERSION:
+            raise ValueError('Unsupported asset pack: {}'.format(pack_path))
+
+        header_start = PACK_PREAMBLE.size
+        header = json.loads(self.data[header_start:header_start + header_length].decode('utf-8'))
+        self.sources = header['sources']
+        self.entries = header['entries']
+        self.data_offset = header_start + header_length
+
+    def close(self):
+        self.data.close()
+
+    def decode_frame(self, entry):
+        start = self.data_offset + entry['offset']
+        return Image.frombytes('1', tuple(entry['size']), self.data[start:start + entry['length']])
+
+    def animation(self, name, size=None):
+        """ Returns the lazily decoded frames of an animation or None if it is not packed """
+        entries = self.entries.get(asset_key(name, size))
+        if entries is None:
+            return None
+        return AnimationFrames(self, entries)
+
+    def icon(self, name, size=ICON_SIZE):
+        """ Returns an icon or None if it is not packed at this size """
+        entries = self.entries.get(asset_key(name, size))
+        if not entries:
+            return None
+        return self.decode_frame(entries[0])
+
+    def is_current(self, assets):
+        """ Returns True if the pack was compiled from exactly these sources """
+        if set(self.sources) != set(assets):
+            return False
+        return all(self.sources[key] == file_hash(path) for key, (path, _, _) in assets.items())
+
+
+def load_asset_pack(base_path, pack_path):
+    """ Opens the pack at pack_path and recompiles it first if it is missing
+    or its sources changed. Returns None if the pack can not be provided """
+    assets = source_assets(base_path)
+
+    pack = None
+    if os.path.exists(pack_path):
+        try:
+            pack = AssetPack(pack_path)
+        except (OSError, ValueError, struct.error) as exc:
+            print(exc)
+
+    if pack is not None and pack.is_current(assets):
+        return pack
+
+    if pack is not None:
+        pack.close()
+
+    try:
+        os.makedirs(os.path.dirname(pack_path), exist_ok=True)
+        compile_asset_pack(pack_path, assets)
+        return AssetPack(pack_path)
+    except OSError as exc:
+        print(exc)
+        return None
+
+
+def main():
+    base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    pack_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(base_path, 'cache', 'assets.pack')
+
+    pack = load_asset_pack(base_path, pack_path)
+    if pack is None:
+        sys.exit(1)
+
+    for key, frames in sorted(pack.entries.items()):
+        print('{}: {} frame(s)'.format(key, len(frames)))
+    print('Asset pack written to {}'.format(pack_path))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+#
+#  chip_animation.py
+#  pihole-display
+#
+#  Chip graphic of the progress view. The geometry is rendered once into a
+#  table of body tiles (one per distinct fill level) and a table of pre-rendered
+#  "data line" noise frames, so that a progress frame costs a few blits.
+#  Tiles and frames are kept in SSD1306 page layout and blitted onto a
+#  PageCanvas, PIL only rasterizes them once.
+#
+
+import math
+import random
+import numpy as np
+from PIL import Image, ImageDraw
+
+from page_buffer import pixels_to_pages
+
+# Number of pre-rendered data line frames, cycled during long progress views
+NOISE_FRAME_COUNT = 90
+
+
+def chip_geometry(pos):
+    """ Returns the dimensions shared by the chip drawing functions """
+    geometry = {'outer_chip_size': 26,
+                'inner_chip_size': 12,
+                'pin_offset': 5,
+                'pin_count': 8,
+                'pin_length': 3}
+    # pin_offset = 3
+    # pin_count = 5
+    geometry['pin_distance'] = (geometry['outer_chip_size'] - 2*geometry['pin_offset'])/geometry['pin_count']
+    geometry['outer_square_x'] = pos[0] + geometry['pin_length']
+    geometry['outer_square_y'] = pos[1] + geometry['pin_length']
+
+    square_delta = (geometry['outer_chip_size'] - geometry['inner_chip_size'])/2
+    geometry['inner_square_x'] = geometry['outer_square_x'] + square_delta
+    geometry['inner_square_y'] = geometry['outer_square_y'] + square_delta
+    return geometry
+
+
+def vertical_percentage_offset(geometry, percentage):
+    """ Returns the top edge of the chip fill for percentage """
+    outer_bottom = geometry['outer_square_y'] + geometry['outer_chip_size']
+    if percentage is None:
+        return outer_bottom
+    return outer_bottom - percentage*geometry['outer_chip_size']
+
+
+def draw_chip_outline(draw, pos=(0, 0)):
+    """ Draws chip outline and pins """
+    g = chip_geometry(pos)
+    outer_chip_size = g['outer_chip_size']
+    pin_length = g['pin_length']
+    outer_square_x = g['outer_square_x']
+    outer_square_y = g['outer_square_y']
+
+    draw.rectangle((outer_square_x, outer_square_y, outer_square_x + outer_chip_size, outer_square_y + outer_chip_size),
+                   fill=0,
+                   outline=1)
+
+    for pin_idx in range(0, g['pin_count']):
+        # + 1 seems hacky. I probably messed something up
+        pin_pos_x = outer_square_x + g['pin_offset'] + pin_idx*g['pin_distance'] + 1
+        pin_pos_y = outer_square_y + g['pin_offset'] + pin_idx*g['pin_distance'] + 1
+        v_x = pos[0]
+        v_y = pos[1]
+
+        # vertical
+        draw.line((pin_pos_x, v_y, pin_pos_x, outer_square_y), fill=255, width=1)
+        draw.line((pin_pos_x,
+                   outer_square_y + outer_chip_size,
+                   pin_pos_x,
+                   1 + outer_square_y + outer_chip_size + pin_length),
+                  fill=255,
+                  width=1)
+
+        # horizontal
+        draw.line((v_x, pin_pos_y, outer_square_x, pin_pos_y), fill=255, width=1)
+        right_outer_border = outer_square_x + outer_chip_size + pin_length
+        draw.line((outer_square_x + outer_chip_size, pin_pos_y, right_outer_border, pin_pos_y),
+                  fill=255,
+                  width=1)
+
+
+def draw_chip_body(draw, pos=(0, 0), percentage=None):
+    """ Draws the fill level into the chip outline """
+    g = chip_geometry(pos)
+    outer_chip_size = g['outer_chip_size']
+    inner_chip_size = g['inner_chip_size']
+    outer_square_x = g['outer_square_x']
+    outer_square_y = g['outer_square_y']
+    inner_square_x = g['inner_square_x']
+    inner_square_y = g['inner_square_y']
+
+    offset = vertical_percentage_offset(g, percentage)
+
+    # Older Pillow versions swapped inverted corners, newer ones raise
+    if percentage is not None:
+        top, bottom = sorted((offset, outer_square_y + outer_chip_size))
+        draw.rectangle((outer_square_x, top, outer_square_x + outer_chip_size, bottom),
+                       fill=1,
+                       outline=1)
+
+    draw.rectangle((inner_square_x, inner_square_y, inner_square_x + inner_chip_size, inner_square_y + inner_chip_size),
+                   fill=0,
+                   outline=1)
+
+    if offset <= inner_square_y + inner_chip_size + 1:
+        draw.line((inner_square_x,
+                   max(offset, inner_square_y),
+                   inner_square_x,
+                   inner_square_y + inner_chip_size),
+                  fill=0, width=1)
+
+        draw.line((inner_square_x + inner_chip_size,
+                   max(offset, inner_square_y),
+                   inner_square_x + inner_chip_size,
+                   inner_square_y + inner_chip_size), fill=0, width=1)
+
+        top, bottom = sorted((offset, inner_square_y + inner_chip_size - 1))
+        draw.rectangle((inner_square_x + 1,
+                        top,
+                        inner_square_x + inner_chip_size - 1,
+                        bottom),
+                       fill=1,
+                       outline=1)
+
+        draw.line((inner_square_x,
+                   inner_square_y + inner_chip_size,
+                   inner_square_x + inner_chip_size,
+                   inner_square_y + inner_chip_size), fill=0, width=1)
+
+        if offset <= inner_square_y + 1:
+            draw.line((inner_square_x,
+                       inner_square_y,
+                       inner_square_x + inner_chip_size,
+                       inner_square_y), fill=0, width=1)
+
+
+def draw_data_lines(draw, width, pos=(0, 0), rng=random):
+    """ Draws random "data lines" leaving the right pins of the chip """
+    g = chip_geometry(pos)
+    right_outer_border = g['outer_square_x'] + g['outer_chip_size'] + g['pin_length']
+    data_pos = right_outer_border + 1
+    line_delta = width-data_pos
+
+    for pin_idx in range(0, g['pin_count']):
+        pin_pos_y = g['outer_square_y'] + g['pin_offset'] + pin_idx*g['pin_distance'] + 1
+        r = rng.randint(0,5)
+        if r<=1:
+            draw.line((data_pos,
+                       pin_pos_y,
+                       data_pos + rng.randint(5, line_delta),
+                       pin_pos_y),
+                      fill=255,
+                      width=1)
+
+
+def image_to_pages(image):
+    """ Returns the page bytes of a mode '1' image """
+    return pixels_to_pages(np.asarray(image, dtype=bool))
+
+
+class ChipAnimation():
+    """ Pre-rendered chip outline, body tiles and data line frames in page layout """
+
+    def __init__(self, width, height, pos=(0, 0), seed='denali', noise_frame_count=NOISE_FRAME_COUNT):
+        self.width = width
+        self.height = height
+        self.pos = pos
+        self.geometry = chip_geometry(pos)
+
+        # Outline and pins, part of the static layer of the progress view
+        image = Image.new('1', (width, height))
+        draw_chip_outline(ImageDraw.Draw(image), pos)
+        self.outline_pages = image_to_pages(image)
+
+        ##
+        # Body tiles span the full height (whole pages), fill levels above 100% cover the pins
+        g = self.geometry
+        self.body_box = (int(g['outer_square_x']),
+                         0,
+                         int(g['outer_square_x'] + g['outer_chip_size']) + 1,
+                         height)
+        self.body_tiles = {}
+
+        ##
+        # Data lines use the same random sequence as drawing them live would
+        rng = random.Random(seed)
+        self.noise_frames = []
+        for _ in range(noise_frame_count):
+            frame = Image.new('1', (width, height))
+            draw_data_lines(ImageDraw.Draw(frame), width, pos=pos, rng=rng)
+            self.noise_frames.append(image_to_pages(frame))
+
+    def level_key(self, percentage):
+        """ Returns a key that is equal for all percentages rendering the same body """
+        if percentage is None:
+            return None
+
+        g = self.geometry
+        offset = vertical_percentage_offset(g, percentage)
+        inner_bottom = g['inner_square_y'] + g['inner_chip_size']
+        # Covers coordinate truncation as well as rounding of the drawing backend
+        return (math.floor(offset),
+                offset - math.floor(offset) >= 0.5,
+                offset <= inner_bottom + 1,
+                offset <= g['inner_square_y'] + 1)
+
+    def body_tile(self, percentage):
+        """ Returns the page bytes of the chip body for percentage, rendered on first use """
+        key = self.level_key(percentage)
+        tile = self.body_tiles.get(key)
+        if tile is None:
+            image = Image.new('1', (self.width, self.height))
+            draw = ImageDraw.Draw(image)
+            draw_chip_outline(draw, self.pos)
+            draw_chip_body(draw, self.pos, percentage)
+            tile = image_to_pages(image.crop(self.body_box))
+            self.body_tiles[key] = tile
+        return tile
+
+    def draw_outline(self, canvas):
+        canvas.blit_pages(self.outline_pages, 0, 0)
+
+    def draw_body(self, canvas, percentage):
+        """ Replaces the chip body column of canvas with the fill level """
+        canvas.paste_pages(self.body_tile(percentage), self.body_box[0], 0)
+
+    def draw_data_lines(self, canvas, frame_index):
+        canvas.blit_pages(self.noise_frames[frame_index % len(self.noise_frames)], 0, 0)
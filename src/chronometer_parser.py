@@ -0,0 +1,120 @@
+#
+#  chronometer_parser.py
+#  pihole-display
+#
+#  Parses the output of pihole -c -e (chronometer.sh) in a single pass over
+#  its tokens. Values are converted once into typed stats: counts as int,
+#  the blocked percentage as float, the uptime in seconds. Fields that are
+#  missing or cannot be converted are reported instead of printed.
+#
+
+import re
+
+##
+# Label token -> stats field. The value follows the label, only the first
+# occurrence of a label counts
+LABELS = {'Core:': 'version_core',
+          'Web:': 'version_web',
+          'FTL:': 'version_ftl',
+          'Hostname:': 'hostname',
+          'Uptime:': 'uptime',
+          'Pi-hole:': 'status',
+          '(Blocking:': 'blocking',
+          'Today:': 'today_percentage',
+          '(Total:': 'ratio',
+          '(Leased:': 'leased_client_count',
+          'Client:': 'topclient'}
+
+# Only printed if Pi-hole's DHCP server is active
+OPTIONAL_FIELDS = ['leased_client_count']
+
+# Values of fields that are missing or invalid
+DEFAULTS = {'version_core': '',
+            'version_web': '',
+            'version_ftl': '',
+            'hostname': '',
+            'uptime': 0,
+            'status': '',
+            'blocking': 0,
+            'today_percentage': 0.0,
+            'ratio': (0, 0),
+            'leased_client_count': 0,
+            'topclient': ''}
+
+MISSING = 'missing'
+INVALID = 'invalid'
+
+ANSI_ESCAPE = re.compile(r'\x1b\[[0-9;]*[A-Za-z]')
+
+# "3 days, 04:56:12" or "04:56:12"
+UPTIME = re.compile(r'(?:(\d+) days?, )?(\d+):(\d{2}):(\d{2})')
+
+
+def parse_count(token):
+    """ Returns '87,234' as 87234 """
+    return int(token.replace(',', ''))
+
+
+def parse_percentage(token):
+    """ Returns '23.5%' as 23.5 """
+    if not token.endswith('%'):
+        raise ValueError('Not a percentage: {}'.format(token))
+    return float(token[:-1])
+
+
+def parse_uptime(text):
+    """ Returns the seconds of the chronometer uptime """
+    match = UPTIME.match(text)
+    if match is None:
+        raise ValueError('Not an uptime: {}'.format(text))
+    days, hours, minutes, seconds = (int(group or 0) for group in match.groups())
+    return ((days * 24 + hours) * 60 + minutes) * 60 + seconds
+
+
+##
+# Field -> function of the token list and the index of the value
+CONVERTERS = {'version_core': lambda tokens, index: tokens[index],
+              'version_web': lambda tokens, index: tokens[index],
+              'version_ftl': lambda tokens, index: tokens[index],
+              'hostname': lambda tokens, index: tokens[index],
+              # Up to three tokens: "3 days, 04:56:12"
+              'uptime': lambda tokens, index: parse_uptime(' '.join(tokens[index:index + 3])),
+              'status': lambda tokens, index: tokens[index],
+              'blocking': lambda tokens, index: parse_count(tokens[index]),
+              'today_percentage': lambda tokens, index: parse_percentage(tokens[index]),
+              # "(Total: 4,321 of 18,765)"
+              'ratio': lambda tokens, index: (parse_count(tokens[index]), parse_count(tokens[index + 2].rstrip(')'))),
+              'leased_client_count': lambda tokens, index: parse_count(tokens[index]),
+              'topclient': lambda tokens, index: tokens[index]}
+
+
+def parse_chronometer(output):
+    """ Returns the typed stats of a chronometer output and a report of the
+    fields that were missing or invalid (field: 'missing' or 'invalid').
+    Reported fields hold their default value """
+    if '\x1b' in output:
+        output = ANSI_ESCAPE.sub('', output)
+    tokens = output.split()
+
+    ##
+    # Single pass: token -> index of the following token. Built back to front,
+    # so that the first occurrence of a token wins
+    positions = dict(zip(reversed(tokens), range(len(tokens), 0, -1)))
+
+    stats = {}
+    report = {}
+    for label, field in LABELS.items():
+        converter = CONVERTERS[field]
+        if label not in positions:
+            stats[field] = DEFAULTS[field]
+            if field not in OPTIONAL_FIELDS:
+                report[field] = MISSING
+            continue
+
+        try:
+            stats[field] = converter(tokens, positions[label])
+        except (ValueError, IndexError):
+            stats[field] = DEFAULTS[field]
+            report[field] = INVALID
+
+    return stats, report
@@ -0,0 +1,143 @@
+#
+#  client_index.py
+#  pihole-display
+#
+#  Client names from known_clients, Pi-hole's custom.list and dhcp.leases and
+#  /etc/hosts, indexed by IP, MAC and hostname. The files are only parsed
+#  again when one of them changed (modification time, size or inode).
+#
+
+import os
+import threading
+
+PIHOLE_CUSTOM_LIST = '/etc/pihole/custom.list'
+PIHOLE_DHCP_LEASES = '/etc/pihole/dhcp.leases'
+HOSTS = '/etc/hosts'
+
+
+def read_lines(path):
+    """ Returns the fields of all lines of path, comments and empty lines skipped """
+    try:
+        with open(path, 'r', encoding='utf-8') as source_file:
+            lines = []
+            for line in source_file:
+                fields = line.split('#', 1)[0].split()
+                if fields:
+                    lines.append(fields)
+            return lines
+    except (IOError, UnicodeDecodeError) as exc:
+        print(exc)
+        return []
+
+
+def parse_hosts(path):
+    """ Returns (ip, hostname) pairs of a hosts file (also the format of custom.list) """
+    return [(fields[0], hostname) for fields in read_lines(path) for hostname in fields[1:]]
+
+
+def parse_dhcp_leases(path):
+    """ Returns (mac, ip, hostname) of dnsmasq leases, hostname None if unknown """
+    leases = []
+    for fields in read_lines(path):
+        # expiry, MAC, IP, hostname (* if unknown), client id
+        if len(fields) < 4:
+            continue
+        hostname = None if fields[3] == '*' else fields[3]
+        leases.append((fields[1].lower(), fields[2], hostname))
+    return leases
+
+
+def parse_known_clients(path):
+    """ Returns (client id, name) pairs, the id being an IP, MAC or hostname """
+    return [(fields[0], ' '.join(fields[1:])) for fields in read_lines(path) if len(fields) > 1]
+
+
+class ClientIndex():
+    """ Resolves client IPs, MACs and hostnames to display names """
+
+    def __init__(self, known_clients_path, custom_list_path=PIHOLE_CUSTOM_LIST,
+                 dhcp_leases_path=PIHOLE_DHCP_LEASES, hosts_path=HOSTS):
+        self.known_clients_path = known_clients_path
+        self.custom_list_path = custom_list_path
+        self.dhcp_leases_path = dhcp_leases_path
+        self.hosts_path = hosts_path
+
+        # Keys are lower case, MACs and hostnames are case insensitive
+        self.names = {}
+        self.hostnames = {}
+        self.macs = {}
+        self.lease_count = 0
+
+        self.signature = None
+        self.lock = threading.Lock()
+
+        # Statistics
+        self.build_count = 0
+
+    def file_signature(self):
+        """ Returns what identifies the current version of every source file """
+        signature = []
+        for path in (self.known_clients_path, self.custom_list_path, self.dhcp_leases_path, self.hosts_path):
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_mtime_ns, stat.st_size, stat.st_ino))
+            except OSError:
+                signature.append(None)
+        return signature
+
+    def reload_if_changed(self):
+        """ Rebuilds the index if a source file changed, returns True if it did """
+        signature = self.file_signature()
+        if signature == self.signature:
+            return False
+
+        self.build()
+        self.signature = signature
+        return True
+
+    def build(self):
+        # IP or MAC -> hostname, leases override the static files
+        hostnames = {}
+        for ip, hostname in parse_hosts(self.hosts_path):
+            hostnames.setdefault(ip.lower(), hostname)
+        for ip, hostname in parse_hosts(self.custom_list_path):
+            hostnames[ip.lower()] = hostname
+
+        # IP -> MAC
+        macs = {}
+        leases = parse_dhcp_leases(self.dhcp_leases_path)
+        for mac, ip, hostname in leases:
+            macs[ip.lower()] = mac
+            if hostname is not None:
+                hostnames[ip.lower()] = hostname
+                hostnames[mac] = hostname
+
+        # IP, MAC or hostname -> name given in known_clients
+        names = {client_id.lower(): name for client_id, name in parse_known_clients(self.known_clients_path)}
+
+        with self.lock:
+            self.names = names
+            self.hostnames = hostnames
+            self.macs = macs
+            self.lease_count = len(leases)
+            self.build_count += 1
+
+    def resolve(self, client_id):
+        """ Returns the display name of a client IP, MAC or hostname, the id itself if unknown """
+        key = client_id.lower()
+        with self.lock:
+            if key in self.names:
+                return self.names[key]
+
+            mac = self.macs.get(key)
+            if mac in self.names:
+                return self.names[mac]
+
+            hostname = self.hostnames.get(key)
+            if hostname is not None:
+                return self.names.get(hostname.lower(), hostname)
+        return client_id
+
+    def get_lease_count(self):
+        with self.lock:
+            return self.lease_count
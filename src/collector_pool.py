@@ -0,0 +1,172 @@
+#
+#  collector_pool.py
+#  pihole-display
+#
+#  Runs slow data collectors (shell commands, HTTP requests) on background
+#  worker threads. Every collector has its own interval and a hard deadline;
+#  readers only ever see the most recently completed result.
+#
+
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Collector():
+    """ A periodically executed collection function and its latest result """
+
+    def __init__(self, name, function, interval, deadline):
+        self.name = name
+        self.function = function
+        self.interval = interval
+        self.deadline = deadline
+
+        self.result = None
+        self.completed_at = None
+        self.started_at = None
+        self.next_run = 0
+        self.future = None
+        self.timed_out = False
+
+        # Statistics
+        self.run_count = 0
+        self.error_count = 0
+        self.timeout_count = 0
+
+    def is_running(self):
+        return self.future is not None and not self.future.done()
+
+    def is_stale(self, now):
+        """ A result is stale if there is none yet, the collector is hung or
+        the last result is older than its refresh interval allows """
+        if self.completed_at is None or self.timed_out:
+            return True
+        return now - self.completed_at > self.interval + self.deadline
+
+
+class CollectorPool():
+    """ Schedules collectors on a worker pool without ever blocking the reader """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.collectors = {}
+        self.lock = threading.Lock()
+        self.wake_event = threading.Event()
+
+        self.executor = None
+        self.thread = None
+        self.should_run = False
+
+    def register(self, name, function, interval, deadline):
+        """ Adds a collector that is executed every interval seconds """
+        self.collectors[name] = Collector(name, function, interval, deadline)
+
+    def set_interval(self, name, interval):
+        """ Changes the interval of collector name, its next run is rescheduled accordingly """
+        with self.lock:
+            collector = self.collectors[name]
+            collector.interval = interval
+            if collector.started_at is not None:
+                collector.next_run = collector.started_at + interval
+        self.wake_event.set()
+
+    def start(self):
+        """ Starts the scheduler thread, collectors run immediately """
+        if self.should_run:
+            return
+
+        self.should_run = True
+        # One worker per collector: a hung collector never delays the others
+        self.executor = ThreadPoolExecutor(max_workers=max(1, len(self.collectors)),
+                                           thread_name_prefix='collector')
+        self.thread = threading.Thread(target=self.run, name='collector-pool', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """ Stops scheduling, running collectors are not waited for """
+        self.should_run = False
+        self.wake_event.set()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+
+    def refresh(self, name):
+        """ Requests an immediate run of collector name """
+        self.collectors[name].next_run = 0
+        self.wake_event.set()
+
+    def run(self):
+        """ Scheduler loop: submits due collectors and enforces deadlines """
+        while self.should_run:
+            now = self.clock()
+            next_wake = now + 1.0
+
+            for collector in self.collectors.values():
+                if collector.is_running():
+                    if not collector.timed_out and now - collector.started_at > collector.deadline:
+                        collector.timed_out = True
+                        collector.timeout_count += 1
+                        print('Collector {} exceeded its deadline of {}s'.format(collector.name, collector.deadline))
+                    continue
+
+                if now >= collector.next_run:
+                    self.submit(collector, now)
+
+                next_wake = min(next_wake, collector.next_run)
+                if collector.is_running():
+                    next_wake = min(next_wake, collector.started_at + collector.deadline)
+
+            self.wake_event.wait(max(0, next_wake - self.clock()))
+            self.wake_event.clear()
+
+    def submit(self, collector, now):
+        collector.started_at = now
+        collector.next_run = now + collector.interval
+        collector.run_count += 1
+        try:
+            collector.future = self.executor.submit(collector.function)
+        except RuntimeError as exc:
+            # Executor was shut down
+            print(exc)
+            return
+        collector.future.add_done_callback(lambda future: self.complete(collector, future))
+
+    def complete(self, collector, future):
+        """ Stores the result of a finished collector run """
+        try:
+            result = future.result()
+        except Exception as exc:
+            # Keep the previous result, it is reported as stale eventually
+            print('Collector {} failed: {}'.format(collector.name, exc))
+            with self.lock:
+                collector.error_count += 1
+                collector.timed_out = False
+            return
+
+        with self.lock:
+            collector.result = result
+            collector.completed_at = self.clock()
+            collector.timed_out = False
+
+    def get_result(self, name):
+        """ Returns the latest completed result of collector name or None """
+        with self.lock:
+            return self.collectors[name].result
+
+    def is_stale(self, name):
+        with self.lock:
+            return self.collectors[name].is_stale(self.clock())
+
+    def get_status(self):
+        """ Returns age, staleness and counters of every collector """
+        now = self.clock()
+        status = {}
+        with self.lock:
+            for name, collector in self.collectors.items():
+                age = None if collector.completed_at is None else now - collector.completed_at
+                status[name] = {'age': age,
+                                'stale': collector.is_stale(now),
+                                'running': collector.is_running(),
+                                'runs': collector.run_count,
+                                'errors': collector.error_count,
+                                'timeouts': collector.timeout_count}
+        return status
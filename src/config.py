@@ -0,0 +1,311 @@
+#
+#  config.py
+#  pihole-display
+#
+#  Settings of the display: frame rate cap, screen durations, collector
+#  intervals, weather location and paths. The INI file is parsed once into an
+#  immutable Config. ConfigWatcher reloads it when the file (or the legacy
+#  location file) changes, using inotify where available and polling the
+#  modification time elsewhere, and notifies its observers of the new Config.
+#
+
+import os
+import time
+import struct
+import select
+import ctypes
+import ctypes.util
+import threading
+import configparser
+
+from types import MappingProxyType
+from typing import List, Mapping, NamedTuple
+from observer import Observer, Subject
+
+##
+# Repository root, relative paths of the config file are resolved against it
+BASE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_PATH = os.path.join(BASE_PATH, 'pihole-display.ini')
+
+# LED display can render 30fps max, the default and the upper limit of max_fps
+MAX_FPS = 30
+
+##
+# Seconds each cycle screen is shown, see led_display.SCREENS
+SCREEN_DURATIONS = MappingProxyType({'system': 10,
+                                     'weather': 10,
+                                     'blocked': 10,
+                                     'clients': 10,
+                                     'history': 10,
+                                     'queries': 10})
+
+##
+# Seconds between the runs of the stat_grabber collectors
+COLLECTOR_INTERVALS = MappingProxyType({'pihole': 30,
+                                        'weather': 300,
+                                        'query_history': 300,
+                                        'metric_history': 60})
+
+##
+# inotify(7), events of a file being replaced or written in the watched directory
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+INOTIFY_EVENT = struct.Struct('iIII')
+
+
+class ConfigError(Exception):
+    """ Config file could not be parsed """
+    pass
+
+
+class Config(NamedTuple):
+    """ Parsed settings, immutable. Replaced as a whole on reload """
+    max_fps: int = MAX_FPS
+    screen_durations: Mapping[str, float] = SCREEN_DURATIONS
+    collector_intervals: Mapping[str, float] = COLLECTOR_INTERVALS
+    location: str = ''
+    known_clients_path: str = os.path.join(BASE_PATH, 'known_clients')
+    location_path: str = os.path.join(BASE_PATH, 'location')
+    cache_path: str = os.path.join(BASE_PATH, 'cache')
+
+    def screen_duration(self, screen):
+        return self.screen_durations[screen]
+
+
+def parse_seconds(parser, section, defaults):
+    """ Returns defaults updated by the positive numbers of section """
+    values = dict(defaults)
+    if not parser.has_section(section):
+        return MappingProxyType(values)
+
+    for name in parser.options(section):
+        if name not in defaults:
+            raise ConfigError('Unknown option {} in [{}]'.format(name, section))
+        value = parser.getfloat(section, name)
+        if value <= 0:
+            raise ConfigError('[{}] {} must be positive'.format(section, name))
+        values[name] = value
+    return MappingProxyType(values)
+
+
+def read_location(path):
+    """ Returns the first line of the legacy location file, '' if there is none """
+    try:
+        with open(path, 'r', encoding='utf-8') as location_file:
+            return location_file.readline().strip()
+    except FileNotFoundError:
+        return ''
+
+
+def parse_config(text, base_path=BASE_PATH):
+    """ Returns the Config of INI text, raises ConfigError """
+    parser = configparser.ConfigParser(inline_comment_prefixes=(';', '#'))
+    try:
+        parser.read_string(text)
+
+        max_fps = parser.getint('display', 'max_fps', fallback=MAX_FPS)
+        if not 0 < max_fps <= MAX_FPS:
+            raise ConfigError('[display] max_fps must be between 1 and {}'.format(MAX_FPS))
+
+        paths = {}
+        for name, default in [('known_clients', 'known_clients'), ('location', 'location'), ('cache', 'cache')]:
+            path = os.path.expanduser(parser.get('paths', name, fallback=default))
+            paths[name] = os.path.join(base_path, path)
+
+        # The location file predates the config file and is still honoured
+        location = parser.get('weather', 'location', fallback='').strip()
+        if not location:
+            location = read_location(paths['location'])
+
+        return Config(max_fps=max_fps,
+                      screen_durations=parse_seconds(parser, 'screens', SCREEN_DURATIONS),
+                      collector_intervals=parse_seconds(parser, 'collectors', COLLECTOR_INTERVALS),
+                      location=location,
+                      known_clients_path=paths['known_clients'],
+                      location_path=paths['location'],
+                      cache_path=paths['cache'])
+    except (configparser.Error, ValueError) as exc:
+        raise ConfigError(str(exc)) from exc
+
+
+def load_config(path=CONFIG_PATH, base_path=BASE_PATH):
+    """ Returns the Config of the file at path, defaults if it does not exist.
+    Raises ConfigError """
+    try:
+        with open(path, 'r', encoding='utf-8') as config_file:
+            text = config_file.read()
+    except FileNotFoundError:
+        text = ''
+    except OSError as exc:
+        raise ConfigError(str(exc)) from exc
+    return parse_config(text, base_path)
+
+
+def read_config(path=CONFIG_PATH, base_path=BASE_PATH):
+    """ Returns the Config of the file at path. A broken file is reported and
+    the defaults are used """
+    try:
+        return load_config(path, base_path)
+    except ConfigError as exc:
+        print('Config {}: {}'.format(path, exc))
+        return Config()
+
+
+def file_signature(path):
+    """ Changes whenever the file is written or replaced """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+def open_inotify(directories):
+    """ Returns an inotify file descriptor watching directories for written
+    and replaced files. Raises OSError where inotify is not available """
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        inotify_init1 = libc.inotify_init1
+        inotify_add_watch = libc.inotify_add_watch
+    except (OSError, AttributeError) as exc:
+        raise OSError('inotify not available: {}'.format(exc)) from exc
+
+    file_descriptor = inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+    if file_descriptor < 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, os.strerror(errno))
+
+    for directory in directories:
+        # Directories are watched, editors and os.replace() swap the file itself
+        if inotify_add_watch(file_descriptor, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+            errno = ctypes.get_errno()
+            os.close(file_descriptor)
+            raise OSError(errno, os.strerror(errno), directory)
+    return file_descriptor
+
+
+def changed_names(events):
+    """ Returns the file names in a buffer of inotify events """
+    names = set()
+    offset = 0
+    while offset + INOTIFY_EVENT.size <= len(events):
+        watch_descriptor, mask, cookie, length = INOTIFY_EVENT.unpack_from(events, offset)
+        offset += INOTIFY_EVENT.size
+        names.add(os.fsdecode(events[offset:offset + length].rstrip(b'\0')))
+        offset += length
+    return names
+
+
+class ConfigWatcher(Subject):
+    """ Holds the current Config and reloads it when its files change """
+
+    def __init__(self, path=CONFIG_PATH, base_path=BASE_PATH, poll_interval=2.0):
+        self.path = path
+        self.base_path = base_path
+        self.poll_interval = poll_interval
+        self._observers: List[Observer] = []
+
+        # Parsed once at startup
+        self.config = read_config(path, base_path)
+        self.signatures = self.file_signatures()
+
+        self.should_run = False
+        self.thread = None
+
+        # Statistics
+        self.reload_count = 0
+        self.error_count = 0
+
+    ##
+    # Subject Interface
+    def attach(self, observer: Observer) -> None:
+        self._observers.append(observer)
+
+    def detach(self, observer: Observer) -> None:
+        self._observers.remove(observer)
+
+    def notify(self) -> None:
+        for observer in self._observers:
+            observer.update(self)
+
+    def watched_paths(self):
+        return [self.path, self.config.location_path]
+
+    def watched_directories(self):
+        """ Returns the directories of the watched files. They change with the
+        location path of a reloaded config """
+        return sorted({os.path.dirname(os.path.abspath(path)) for path in self.watched_paths()})
+
+    def file_signatures(self):
+        return [file_signature(path) for path in self.watched_paths()]
+
+    def check(self):
+        """ Reloads the config if one of its files changed. Returns True if a
+        new config was published """
+        signatures = self.file_signatures()
+        if signatures == self.signatures:
+            return False
+        self.signatures = signatures
+
+        try:
+            config = load_config(self.path, self.base_path)
+        except ConfigError as exc:
+            # Keep running with the last good config
+            print('Config {}: {}'.format(self.path, exc))
+            self.error_count += 1
+            return False
+
+        if config == self.config:
+            return False
+
+        # Readers see either the old or the new config, never a mix
+        self.config = config
+        self.reload_count += 1
+        self.notify()
+        return True
+
+    def start(self):
+        """ Watches the config files in the background """
+        if self.should_run:
+            return
+        self.should_run = True
+        self.thread = threading.Thread(target=self.run, name='config-watcher', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.should_run = False
+
+    def run(self):
+        directories = None
+        file_descriptor = None
+        try:
+            while self.should_run:
+                if self.watched_directories() != directories:
+                    # First run or the reloaded config moved a file, watch its new directory
+                    if file_descriptor is not None:
+                        os.close(file_descriptor)
+                        file_descriptor = None
+                    directories = self.watched_directories()
+                    try:
+                        file_descriptor = open_inotify(directories)
+                    except OSError as exc:
+                        print('Config changes are polled: {}'.format(exc))
+
+                if file_descriptor is None:
+                    time.sleep(self.poll_interval)
+                    self.check()
+                    continue
+
+                # Timeout to notice stop()
+                readable, _, _ = select.select([file_descriptor], [], [], self.poll_interval)
+                if not readable:
+                    continue
+                try:
+                    names = changed_names(os.read(file_descriptor, 4096))
+                except BlockingIOError:
+                    continue
+                if names & {os.path.basename(path) for path in self.watched_paths()}:
+                    self.check()
+        finally:
+            if file_descriptor is not None:
+                os.close(file_descriptor)
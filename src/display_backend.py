@@ -0,0 +1,181 @@
+#
+#  display_backend.py
+#  pihole-display
+#
+#  Pluggable output backends for the renderer. The SSD1306 backend drives the
+#  real panel via I2C, the virtual backend keeps frames in memory so that the
+#  renderer can be profiled and tested on any machine.
+#
+
+import time
+from abc import ABC, abstractmethod
+import numpy as np
+from PIL import Image
+
+from page_buffer import (SET_COL_ADDR, SET_PAGE_ADDR, DATA_CONTROL_BYTE,
+                         dirty_windows, window_cost, window_payload,
+                         image_to_page_buffer, pages_to_pixels)
+from page_canvas import PageCanvas
+
+
+class DisplayBackend(ABC):
+    """ Backend interface: Receives rendered frames (PageCanvas or mode '1'
+    image) and transfers the changed regions of their page buffer """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.pages = height // 8
+
+        ##
+        # Page buffer as it was last sent. None forces a full transfer
+        self.last_transferred_frame = None
+
+        # Statistics
+        self.frame_count = 0
+        self.bytes_transferred = 0
+
+        # Durations of the phases of the last show() call in seconds
+        self.last_convert_time = 0.0
+        self.last_transfer_time = 0.0
+
+    def page_buffer_for_image(self, image) -> bytes:
+        """ Converts image (mode '1' image or PageCanvas) into the SSD1306 page layout """
+        if isinstance(image, PageCanvas):
+            # Already in page layout
+            return image.tobytes()
+        return image_to_page_buffer(image, self.width, self.pages)
+
+    @abstractmethod
+    def write_window(self, window, frame) -> None:
+        """ Transfers the part of frame covered by window """
+        pass
+
+    def show(self, image):
+        """ Transfers all regions of image (mode '1' image or PageCanvas) that
+        changed since the last call """
+        started = time.perf_counter()
+        frame = self.page_buffer_for_image(image)
+        converted = time.perf_counter()
+
+        windows = dirty_windows(self.last_transferred_frame, frame, self.width, self.pages)
+        for window in windows:
+            self.write_window(window, frame)
+
+        self.last_convert_time = converted - started
+        self.last_transfer_time = time.perf_counter() - converted
+
+        self.frame_count += 1
+        self.bytes_transferred += window_cost(windows)
+        self.last_transferred_frame = frame
+
+    def invalidate(self):
+        """ Forces the next call of show() to transfer the whole screen """
+        self.last_transferred_frame = None
+
+
+##
+# All panels of a process share one I2C bus, see shared_i2c_bus()
+_shared_i2c = None
+
+
+def shared_i2c_bus():
+    """ Returns the I2C bus of the board, created on first use """
+    global _shared_i2c
+    if _shared_i2c is None:
+        from board import SCL, SDA
+        import busio
+        _shared_i2c = busio.I2C(SCL, SDA)
+    return _shared_i2c
+
+
+class SSD1306Backend(DisplayBackend):
+    """ SSD1306 OLED connected via I2C """
+
+    def __init__(self, width=128, height=32, address=0x3C, i2c=None):
+        ##
+        # Hardware modules are only available on the device
+        import adafruit_ssd1306
+
+        # Panels on the same bus are told apart by address.
+        # The driver locks the bus for every transfer, so render threads can share it
+        if i2c is None:
+            i2c = shared_i2c_bus()
+        self.i2c = i2c
+        self.address = address
+
+        ##
+        # Create the SSD1306 OLED class.
+        self.display = adafruit_ssd1306.SSD1306_I2C(width, height, self.i2c, addr=address)
+
+        # Displays narrower than the controller RAM are centered
+        self.column_offset = (128 - width) // 2
+
+        super(SSD1306Backend, self).__init__(width, height)
+
+    def page_buffer_for_image(self, image):
+        # Canvas bytes or vectorized conversion replace the per-pixel loop of display.image()
+        frame = super(SSD1306Backend, self).page_buffer_for_image(image)
+
+        # Keep the driver buffer in sync, its first byte is reserved for the I2C control byte
+        self.display.buffer[1:] = frame
+        return frame
+
+    def write_window(self, window, frame):
+        """ Restricts the controller address window and sends the covered part of frame """
+        page_start, page_end, col_start, col_end = window
+
+        for command in (SET_COL_ADDR,
+                        col_start + self.column_offset,
+                        col_end + self.column_offset,
+                        SET_PAGE_ADDR,
+                        page_start,
+                        page_end):
+            self.display.write_cmd(command)
+
+        payload = bytearray([DATA_CONTROL_BYTE])
+        payload += window_payload(frame, window, self.width)
+        with self.display.i2c_device:
+            self.display.i2c_device.write(payload)
+
+
+class VirtualBackend(DisplayBackend):
+    """ In-memory display that records what would have been sent to the panel """
+
+    def __init__(self, width=128, height=32, address=None):
+        super(VirtualBackend, self).__init__(width, height)
+        self.address = address
+        self.framebuffer = bytearray(self.pages * width)
+        self.window_count = 0
+
+    def write_window(self, window, frame):
+        page_start, page_end, col_start, col_end = window
+        for page in range(page_start, page_end + 1):
+            offset = page * self.width
+            self.framebuffer[offset + col_start:offset + col_end + 1] = frame[offset + col_start:offset + col_end + 1]
+        self.window_count += 1
+
+    def get_image(self):
+        """ Returns the current panel content as mode '1' image """
+        pages = np.frombuffer(bytes(self.framebuffer), dtype=np.uint8).reshape(self.pages, self.width)
+        return Image.fromarray(pages_to_pixels(pages))
+
+    def dump_png(self, path):
+        """ Writes the current panel content to path """
+        self.get_image().save(path, format='PNG')
+
+
+def backend_for_name(name, width=128, height=32, address=None):
+    """ Returns the backend configured by name. address selects the panel
+    on the bus, None uses the default address of the backend """
+    backends = {'ssd1306': SSD1306Backend,
+                'virtual': VirtualBackend}
+
+    try:
+        backend_class = backends[name]
+    except KeyError:
+        raise ValueError('Unknown display backend: {}'.format(name))
+
+    if address is None:
+        return backend_class(width=width, height=height)
+    return backend_class(width=width, height=height, address=address)
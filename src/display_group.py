@@ -0,0 +1,100 @@
+#
+#  display_group.py
+#  pihole-display
+#
+#  Drives several panels from one process. All displays of a group share one
+#  StatGrabber (collectors run once and every display reads their results),
+#  one asset pack and one I2C bus. Every display keeps its own address, size,
+#  screen playlist and render thread.
+#
+
+import os
+
+from config import read_config
+from stat_grabber import StatGrabber
+from asset_pack import load_asset_pack
+from display_backend import backend_for_name
+from led_display import Display, SCREENS, BASE_PATH
+
+SUPPORTED_SIZES = [(128, 32), (128, 64)]
+
+
+def parse_display_spec(spec):
+    """ Parses 'address:WIDTHxHEIGHT[:screen,screen,...]' entries separated by ';',
+    e.g. '0x3C:128x32;0x3D:128x64:weather,blocked' """
+    configs = []
+    for entry in spec.split(';'):
+        entry = entry.strip()
+        if not entry:
+            continue
+
+        fields = entry.split(':')
+        if len(fields) not in (2, 3):
+            raise ValueError('Invalid display spec: {}'.format(entry))
+
+        address = int(fields[0], 0)
+        width, height = (int(value) for value in fields[1].lower().split('x'))
+        if (width, height) not in SUPPORTED_SIZES:
+            raise ValueError('Unsupported display size: {}x{}'.format(width, height))
+
+        playlist = list(SCREENS)
+        if len(fields) == 3:
+            playlist = [screen.strip() for screen in fields[2].split(',') if screen.strip()]
+            unknown = [screen for screen in playlist if screen not in SCREENS]
+            if unknown:
+                raise ValueError('Unknown screen(s): {}'.format(', '.join(unknown)))
+
+        configs.append({'address': address,
+                        'width': width,
+                        'height': height,
+                        'playlist': playlist})
+
+    if not configs:
+        raise ValueError('Display spec does not contain any display')
+    return configs
+
+
+class DisplayGroup():
+    """ Displays fed by one shared stats pipeline """
+
+    def __init__(self, configs, backend='ssd1306', stat_grabber=None, config=None):
+        # Shared settings (config.py), configs are the per display specs
+        if config is None:
+            config = read_config()
+
+        if stat_grabber is None:
+            stat_grabber = StatGrabber(config)
+        self.stat_grabber = stat_grabber
+
+        self.assets = load_asset_pack(BASE_PATH, os.path.join(config.cache_path, 'assets.pack'))
+
+        self.displays = []
+        for idx, display_config in enumerate(configs):
+            display_backend = backend_for_name(backend,
+                                               width=display_config['width'],
+                                               height=display_config['height'],
+                                               address=display_config['address'])
+            display = Display(backend=display_backend,
+                              stat_grabber=self.stat_grabber,
+                              playlist=display_config['playlist'],
+                              assets=self.assets,
+                              name='display-{}'.format(idx),
+                              config=config)
+            self.displays.append(display)
+
+    def attach_to(self, subject):
+        """ Registers every display as observer of subject (e.g. the Housekeeper) """
+        for display in self.displays:
+            subject.attach(display)
+
+    def start(self):
+        for display in self.displays:
+            display.start()
+
+    def stop(self):
+        for display in self.displays:
+            display.stop()
+
+    def join(self, timeout=None):
+        for display in self.displays:
+            display.join(timeout)
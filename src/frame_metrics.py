@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+#
+#  frame_metrics.py
+#  pihole-display
+#
+#  Per-phase frame timing of the render loop. Every phase duration is counted
+#  into a fixed-bucket histogram, so recording a frame costs a few integer
+#  increments and memory does not grow. The stats are only dumped on SIGUSR1
+#  and formatted as table by the report command.
+#
+#  Usage: python src/frame_metrics.py report [dump]
+#
+
+import os
+import sys
+import json
+import signal
+import bisect
+import threading
+
+##
+# Upper bucket bounds in seconds, the last bucket counts everything above
+BUCKET_BOUNDS = [0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0]
+
+DUMP_PATH = '/tmp/pihole-display-metrics.json'
+
+##
+# Phases of a frame
+# draw: PIL drawing of the frame, collect: reading collector results on screen swaps,
+# convert: page buffer conversion, transfer: I2C transfer of the dirty windows,
+# overshoot: time the frame wait returned after its deadline
+PHASES = ['draw', 'collect', 'convert', 'transfer', 'overshoot']
+
+
+class Histogram():
+    """ Fixed-bucket histogram of durations """
+
+    def __init__(self, bounds=BUCKET_BOUNDS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.maximum:
+            self.maximum = value
+
+    def percentile(self, fraction):
+        """ Returns the upper bound of the bucket containing the fraction (0.0 - 1.0)
+        of all values, the maximum for the overflow bucket """
+        if self.count == 0:
+            return 0.0
+
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count > 0:
+                if index < len(self.bounds):
+                    return min(self.bounds[index], self.maximum)
+                return self.maximum
+        return self.maximum
+
+    def get_stats(self):
+        """ Returns count, mean, p50, p99 and max in milliseconds plus the bucket counts """
+        mean = self.total / self.count if self.count else 0.0
+        return {'count': self.count,
+                'mean_ms': mean * 1000,
+                'p50_ms': self.percentile(0.5) * 1000,
+                'p99_ms': self.percentile(0.99) * 1000,
+                'max_ms': self.maximum * 1000,
+                'buckets_ms': [bound * 1000 for bound in self.bounds],
+                'counts': list(self.counts)}
+
+
+class FrameMetrics():
+    """ Phase histograms and per-screen frame counters of a display """
+
+    def __init__(self):
+        self.histograms = {phase: Histogram() for phase in PHASES}
+        self.frames = {}
+        self.missed_frames = {}
+
+        # get_stats() may be called from the signal handler or another thread
+        self.lock = threading.Lock()
+
+    def add(self, phase, duration):
+        with self.lock:
+            self.histograms[phase].add(duration)
+
+    def add_frame(self, screen, missed_frames=0):
+        """ Counts a frame of screen and the frame deadlines it missed """
+        with self.lock:
+            self.frames[screen] = self.frames.get(screen, 0) + 1
+            if missed_frames:
+                self.missed_frames[screen] = self.missed_frames.get(screen, 0) + missed_frames
+
+    def reset(self):
+        with self.lock:
+            self.histograms = {phase: Histogram() for phase in PHASES}
+            self.frames = {}
+            self.missed_frames = {}
+
+    def get_stats(self):
+        with self.lock:
+            return {'phases': {phase: histogram.get_stats() for phase, histogram in self.histograms.items()},
+                    'frames': dict(self.frames),
+                    'missed_frames': dict(self.missed_frames)}
+
+
+def install_dump_signal(metrics_providers, path, signum=signal.SIGUSR1):
+    """ Dumps the metrics of all providers (name: FrameMetrics) to path when
+    the process receives signum. Has to be called from the main thread """
+    def handle_signal(received_signum, frame):
+        try:
+            with open(path, 'w') as dump_file:
+                json.dump({name: metrics.get_stats() for name, metrics in metrics_providers.items()},
+                          dump_file, indent=2, sort_keys=True)
+        except OSError as exc:
+            print(exc)
+
+    signal.signal(signum, handle_signal)
+
+
+def format_report(stats):
+    """ Returns stats (see FrameMetrics.get_stats()) as human readable table """
+    lines = ['{:<10} {:>8} {:>9} {:>9} {:>9} {:>9}'.format('phase', 'count', 'mean ms', 'p50 ms', 'p99 ms', 'max ms')]
+    for phase in PHASES:
+        phase_stats = stats['phases'][phase]
+        lines.append('{:<10} {:>8} {:>9.3f} {:>9.3f} {:>9.3f} {:>9.3f}'.format(phase,
+                                                                          phase_stats['count'],
+                                                                          phase_stats['mean_ms'],
+                                                                          phase_stats['p50_ms'],
+                                                                          phase_stats['p99_ms'],
+                                                                          phase_stats['max_ms']))
+    lines.append('')
+    lines.append('{:<10} {:>8} {:>9}'.format('screen', 'frames', 'missed'))
+    for screen in sorted(stats['frames']):
+        lines.append('{:<10} {:>8} {:>9}'.format(screen,
+                                                 stats['frames'][screen],
+                                                 stats['missed_frames'].get(screen, 0)))
+    return '\n'.join(lines)
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] != 'report':
+        print('Usage: frame_metrics.py report [dump]')
+        sys.exit(2)
+
+    path = sys.argv[2] if len(sys.argv) > 2 else os.environ.get('PIHOLE_DISPLAY_METRICS', DUMP_PATH)
+    with open(path, 'r', encoding='utf-8') as dump_file:
+        dump = json.load(dump_file)
+    print('\n\n'.join('{}\n{}'.format(name, format_report(stats)) for name, stats in sorted(dump.items())))
+
+
+if __name__ == "__main__":
+    main()
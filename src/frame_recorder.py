@@ -0,0 +1,272 @@
+#!/usr/bin/env python
+#
+#  frame_recorder.py
+#  pihole-display
+#
+#  Records every rendered frame together with the inputs it was rendered from
+#  (mode, screen, stats snapshot, animation counters and times). Frames are
+#  stored packed 1-bit, XOR-delta against the previous frame and run-length
+#  encoded, inputs only when they changed. The replayer renders the recorded
+#  inputs again and diffs the result pixel by pixel against the recorded frames.
+#
+#  Usage: python src/frame_recorder.py info <recording>
+#         python src/frame_recorder.py replay <recording> [diff directory]
+#
+
+import os
+import sys
+import json
+import struct
+import numpy as np
+from PIL import Image
+
+##
+# File layout: magic, version, header length, JSON header, records.
+# Record: flags, inputs length, frame data length, JSON inputs (changed keys
+# only, unless keyframe), frame data (XOR delta, unless keyframe; RLE, unless raw)
+RECORDING_MAGIC = b'PHDR'
+RECORDING_VERSION = 1
+RECORDING_PREAMBLE = struct.Struct('<4sHI')
+RECORD_HEADER = struct.Struct('<BII')
+
+# Frame and inputs are stored completely, not as delta to the previous record
+RECORD_KEYFRAME = 0x01
+# Frame data is not run-length encoded, RLE would have been larger
+RECORD_RAW = 0x02
+
+KEYFRAME_INTERVAL = 300
+
+
+def rle_encode(data):
+    """ Encodes bytes as (count, value) pairs, count 1-255 """
+    values = np.frombuffer(data, dtype=np.uint8)
+    if len(values) == 0:
+        return b''
+
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(values)) + 1))
+    lengths = np.diff(np.concatenate((starts, [len(values)])))
+
+    encoded = bytearray()
+    for start, length in zip(starts.tolist(), lengths.tolist()):
+        value = int(values[start])
+        while length > 0:
+            count = min(length, 255)
+            encoded += bytes((count, value))
+            length -= count
+    return bytes(encoded)
+
+
+def rle_decode(data):
+    pairs = np.frombuffer(data, dtype=np.uint8).reshape(-1, 2)
+    return np.repeat(pairs[:, 1], pairs[:, 0]).tobytes()
+
+
+def xor_bytes(a, b):
+    return np.bitwise_xor(np.frombuffer(a, dtype=np.uint8),
+                          np.frombuffer(b, dtype=np.uint8)).tobytes()
+
+
+class FrameRecorder():
+    """ Appends rendered frames and their inputs to a recording file """
+
+    def __init__(self, path, width, height, keyframe_interval=KEYFRAME_INTERVAL):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.keyframe_interval = keyframe_interval
+
+        self.previous_frame = None
+        self.previous_inputs = None
+
+        # Statistics
+        self.frame_count = 0
+        self.raw_bytes = 0
+        self.bytes_written = 0
+
+        header = {'width': width, 'height': height, 'keyframe_interval': keyframe_interval}
+        header_bytes = json.dumps(header, sort_keys=True).encode('utf-8')
+
+        self.file = open(path, 'wb')
+        self.write(RECORDING_PREAMBLE.pack(RECORDING_MAGIC, RECORDING_VERSION, len(header_bytes)))
+        self.write(header_bytes)
+
+    def write(self, data):
+        self.file.write(data)
+        self.bytes_written += len(data)
+
+    def record(self, image, inputs):
+        """ Appends the mode '1' image and the inputs it was rendered from """
+        frame = image.tobytes()
+        # Round trip through JSON, so that changes are detected on the stored values
+        inputs = json.loads(json.dumps(inputs, default=str))
+
+        flags = 0
+        if self.previous_frame is None or self.frame_count % self.keyframe_interval == 0:
+            flags |= RECORD_KEYFRAME
+            data = frame
+            changed_inputs = inputs
+        else:
+            data = xor_bytes(frame, self.previous_frame)
+            changed_inputs = {key: value for key, value in inputs.items()
+                              if key not in self.previous_inputs or self.previous_inputs[key] != value}
+
+        payload = rle_encode(data)
+        if len(payload) >= len(data):
+            flags |= RECORD_RAW
+            payload = data
+
+        inputs_bytes = json.dumps(changed_inputs, sort_keys=True).encode('utf-8')
+        self.write(RECORD_HEADER.pack(flags, len(inputs_bytes), len(payload)))
+        self.write(inputs_bytes)
+        self.write(payload)
+        if flags & RECORD_KEYFRAME:
+            # A recording cut off by a crash or power loss stays readable up to here
+            self.file.flush()
+
+        self.previous_frame = frame
+        self.previous_inputs = inputs
+        self.frame_count += 1
+        self.raw_bytes += len(frame)
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+    def get_stats(self):
+        return {'frames': self.frame_count,
+                'raw_bytes': self.raw_bytes,
+                'bytes_written': self.bytes_written}
+
+
+class FrameReader():
+    """ Iterates over the (inputs, frame bytes) pairs of a recording """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as recording_file:
+            self.data = recording_file.read()
+
+        magic, version, header_length = RECORDING_PREAMBLE.unpack_from(self.data, 0)
+        if magic != RECORDING_MAGIC or version != RECORDING_VERSION:
+            raise ValueError('Unsupported recording: {}'.format(path))
+
+        header_start = RECORDING_PREAMBLE.size
+        header = json.loads(self.data[header_start:header_start + header_length].decode('utf-8'))
+        self.width = header['width']
+        self.height = header['height']
+        self.records_offset = header_start + header_length
+
+    def __iter__(self):
+        """ Yields the frames up to the end of the recording. A truncated last
+        record, left by a recorder that did not close its file, ends the iteration """
+        offset = self.records_offset
+        previous_frame = None
+        inputs = {}
+        while offset < len(self.data):
+            if offset + RECORD_HEADER.size > len(self.data):
+                return
+            flags, inputs_length, payload_length = RECORD_HEADER.unpack_from(self.data, offset)
+            offset += RECORD_HEADER.size
+            if offset + inputs_length + payload_length > len(self.data):
+                return
+            try:
+                changed_inputs = json.loads(self.data[offset:offset + inputs_length].decode('utf-8'))
+            except ValueError:
+                # Includes UnicodeDecodeError, the record was not written completely
+                return
+            offset += inputs_length
+            frame = self.data[offset:offset + payload_length]
+            offset += payload_length
+
+            if not flags & RECORD_RAW:
+                frame = rle_decode(frame)
+
+            if flags & RECORD_KEYFRAME:
+                inputs = changed_inputs
+            else:
+                frame = xor_bytes(frame, previous_frame)
+                inputs = dict(inputs, **changed_inputs)
+
+            previous_frame = frame
+            yield inputs, frame
+
+    def frame_image(self, frame):
+        return Image.frombytes('1', (self.width, self.height), frame)
+
+
+class ReplayStatGrabber():
+    """ Serves the stats of the recorded frame that is replayed """
+
+    def __init__(self):
+        self.inputs = {}
+
+    def get_cpu_load(self):
+        return self.inputs['cpu_load']
+
+    def get_memory_percentage(self):
+        return self.inputs['memory_percentage']
+
+
+def replay_recording(path, display=None, diff_directory=None, config=None):
+    """ Renders the recorded inputs again and returns the frames that differ
+    as list of dicts (index, mode, state, pixels). Diff images (XOR of both
+    frames) are written to diff_directory if given. config is passed to the
+    display created if none is given """
+    reader = FrameReader(path)
+
+    if display is None:
+        from led_display import Display
+        from display_backend import VirtualBackend
+        display = Display(backend=VirtualBackend(reader.width, reader.height),
+                          stat_grabber=ReplayStatGrabber(),
+                          config=config)
+
+    mismatches = []
+    for index, (inputs, frame) in enumerate(reader):
+        display.stat_grabber.inputs = inputs
+        tick, progress = display.apply_render_inputs(inputs)
+        display.render_frame(tick, progress)
+
+        rendered = display.image.tobytes()
+        if rendered == frame:
+            continue
+
+        difference = xor_bytes(rendered, frame)
+        pixels = int(np.unpackbits(np.frombuffer(difference, dtype=np.uint8)).sum())
+        mismatches.append({'index': index,
+                           'mode': inputs['mode'],
+                           'state': inputs['current_state'],
+                           'pixels': pixels})
+
+        if diff_directory is not None:
+            os.makedirs(diff_directory, exist_ok=True)
+            reader.frame_image(difference).save(os.path.join(diff_directory, '{:06d}.png'.format(index)))
+
+    return mismatches
+
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] not in ('info', 'replay'):
+        print('Usage: frame_recorder.py info|replay <recording> [diff directory]')
+        sys.exit(2)
+
+    path = sys.argv[2]
+    if sys.argv[1] == 'info':
+        reader = FrameReader(path)
+        modes = {}
+        for inputs, _ in reader:
+            modes[inputs['mode']] = modes.get(inputs['mode'], 0) + 1
+        print('{}x{}, {} frame(s): {}'.format(reader.width, reader.height, sum(modes.values()),
+                                              ', '.join('{} {}'.format(count, mode) for mode, count in sorted(modes.items()))))
+        return
+
+    diff_directory = sys.argv[3] if len(sys.argv) > 3 else None
+    mismatches = replay_recording(path, diff_directory=diff_directory)
+    for mismatch in mismatches:
+        print('Frame {index} ({mode}, state {state}): {pixels} pixel(s) differ'.format(**mismatch))
+    print('{} frame(s) differ'.format(len(mismatches)))
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#
+#  frame_scheduler.py
+#  pihole-display
+#
+#  Paces the render loop to absolute frame deadlines. Render and transfer time
+#  are part of the frame budget, frames that miss their deadline are dropped
+#  instead of being caught up.
+#
+
+import time
+import threading
+
+
+class FrameScheduler():
+    """ Deadline based frame pacing with wake-up on external events """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.wake_event = threading.Event()
+
+        self.next_deadline = None
+        self.current_fps = None
+
+        # Statistics
+        self.frame_count = 0
+        self.missed_deadlines = 0
+        self.dropped_frames = 0
+        self.wake_count = 0
+
+        # Deadlines missed before the last wait and how late it returned (seconds)
+        self.last_missed_periods = 0
+        self.last_overshoot = 0.0
+
+    def wake(self):
+        """ Ends the current wait immediately, e.g. after a mode change """
+        self.wake_event.set()
+
+    def reset(self):
+        """ Starts pacing from the current time on the next frame """
+        self.next_deadline = None
+
+    def wait_for_next_frame(self, target_fps):
+        """ Blocks until the next frame is due. A target_fps of 0 idles until
+        wake() is called. Returns True if the wait was ended by wake() """
+        self.frame_count += 1
+        self.last_missed_periods = 0
+        self.last_overshoot = 0.0
+
+        if target_fps <= 0:
+            self.reset()
+            return self.wait(None)
+
+        period = 1.0 / target_fps
+        now = self.clock()
+
+        if self.next_deadline is None or target_fps != self.current_fps:
+            self.current_fps = target_fps
+            self.next_deadline = now + period
+        else:
+            self.next_deadline += period
+
+        if self.next_deadline <= now:
+            ##
+            # Over budget: skip the deadlines that already passed
+            missed_periods = int((now - self.next_deadline) / period) + 1
+            self.missed_deadlines += 1
+            self.dropped_frames += missed_periods - 1
+            self.next_deadline += missed_periods * period
+            self.last_missed_periods = missed_periods
+
+        woken = self.wait(self.next_deadline - now)
+        if not woken:
+            self.last_overshoot = max(0.0, self.clock() - self.next_deadline)
+        return woken
+
+    def wait(self, timeout):
+        """ Waits for timeout seconds (forever if None) or until woken """
+        woken = self.wake_event.wait(timeout)
+        if woken:
+            self.wake_event.clear()
+            self.wake_count += 1
+            self.reset()
+        return woken
+
+    def get_stats(self):
+        """ Returns frame and deadline counters """
+        return {'frames': self.frame_count,
+                'missed_deadlines': self.missed_deadlines,
+                'dropped_frames': self.dropped_frames,
+                'wakes': self.wake_count,
+                'target_fps': self.current_fps}
@@ -0,0 +1,170 @@
+#
+#  ftl_client.py
+#  pihole-display
+#
+#  Client of the local pihole-FTL API (telnet port 4711 or Unix socket). The
+#  connection is kept open between requests and re-established once when FTL
+#  restarted in between. Replies are text lines terminated by ---EOM---.
+#
+
+import os
+import socket
+import threading
+
+FTL_PORT = 4711
+FTL_SOCKET_PATHS = ['/run/pihole/FTL.sock', '/var/run/pihole/FTL.sock']
+
+END_OF_MESSAGE = '---EOM---'
+
+##
+# Counters of the stats reply read by stat_grabber, the optional ones have defaults there
+STATS_COUNTERS = ['dns_queries_today', 'ads_blocked_today']
+OPTIONAL_STATS_COUNTERS = ['ads_percentage_today', 'domains_being_blocked']
+
+
+class FTLError(Exception):
+    """ FTL is not reachable or replied something unexpected """
+    pass
+
+
+def parse_value(value):
+    """ Returns value as int or float if it is a number, unchanged otherwise """
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+class FTLClient():
+    """ Persistent connection to pihole-FTL """
+
+    def __init__(self, host='127.0.0.1', port=FTL_PORT, socket_path=None, timeout=2.0):
+        self.host = host
+        self.port = port
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.encoding = 'utf-8'
+
+        self.sock = None
+        self.buffer = b''
+
+        # Collectors of several displays may share the client
+        self.lock = threading.Lock()
+
+        # Statistics
+        self.connect_count = 0
+        self.request_count = 0
+
+    def connect(self):
+        if self.socket_path is not None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            address = self.socket_path
+        else:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            address = (self.host, self.port)
+
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(address)
+        except OSError:
+            sock.close()
+            raise
+
+        self.sock = sock
+        self.buffer = b''
+        self.connect_count += 1
+
+    def close(self):
+        if self.sock is not None:
+            try:
+                self.sock.sendall(b'>quit\n')
+            except OSError:
+                pass
+            self.sock.close()
+            self.sock = None
+
+    def read_line(self):
+        while b'\n' not in self.buffer:
+            data = self.sock.recv(4096)
+            if not data:
+                raise ConnectionError('FTL closed the connection')
+            self.buffer += data
+        line, self.buffer = self.buffer.split(b'\n', 1)
+        return line.decode(self.encoding).rstrip('\r')
+
+    def exchange(self, command):
+        self.sock.sendall('>{}\n'.format(command).encode(self.encoding))
+        lines = []
+        while True:
+            line = self.read_line()
+            if line == END_OF_MESSAGE:
+                return lines
+            # FTL separates replies by empty lines
+            if line or lines:
+                lines.append(line)
+
+    def request(self, command):
+        """ Sends command (without the leading >) and returns the reply lines.
+        Reconnects once if the connection was lost, e.g. because FTL restarted """
+        with self.lock:
+            self.request_count += 1
+            for attempt in range(2):
+                try:
+                    if self.sock is None:
+                        self.connect()
+                    return self.exchange(command)
+                except OSError as exc:
+                    # Includes timeouts, a partial reply must not be read as the next one
+                    if self.sock is not None:
+                        self.sock.close()
+                        self.sock = None
+                    if attempt == 1:
+                        raise FTLError('{}: {}'.format(command, exc))
+
+    def request_pairs(self, command):
+        """ Returns a reply of "key value" lines as dict with typed values """
+        pairs = {}
+        for line in self.request(command):
+            key, _, value = line.partition(' ')
+            pairs[key.rstrip(':')] = parse_value(value.strip())
+        return pairs
+
+    def stats(self):
+        """ Returns today's query counters and the blocking status """
+        stats = self.request_pairs('stats')
+        for key in STATS_COUNTERS + [key for key in OPTIONAL_STATS_COUNTERS if key in stats]:
+            if not isinstance(stats.get(key), (int, float)):
+                raise FTLError('stats: unexpected reply, {} is {!r}'.format(key, stats.get(key)))
+        return stats
+
+    def version(self):
+        """ Returns version, tag, branch, hash and date of FTL """
+        return self.request_pairs('version')
+
+    def cacheinfo(self):
+        """ Returns the DNS cache counters """
+        return self.request_pairs('cacheinfo')
+
+    def top_clients(self, count=10):
+        """ Returns the clients with most queries today as list of dicts (count, ip, name) """
+        clients = []
+        for line in self.request('top-clients ({})'.format(count)):
+            fields = line.split()
+            if len(fields) < 3:
+                continue
+            clients.append({'count': int(fields[1]),
+                            'ip': fields[2],
+                            'name': fields[3] if len(fields) > 3 else ''})
+        return clients
+
+
+def default_client():
+    """ Returns a client of the FTL Unix socket if there is one, of port 4711 otherwise """
+    for path in FTL_SOCKET_PATHS:
+        if os.path.exists(path):
+            return FTLClient(socket_path=path)
+    return FTLClient()
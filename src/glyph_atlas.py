@@ -0,0 +1,267 @@
+#
+#  glyph_atlas.py
+#  pihole-display
+#
+#  Bitmap glyph atlases for the pixel fonts. Every glyph of a font size is
+#  rasterized by FreeType once, packed into a 1-bit atlas and cached on disk,
+#  keyed by font hash and size. Strings are rendered by blitting glyphs.
+#  Glyphs the font lacks (e.g. the arrows of the weather service) are
+#  substituted when the atlas is built. Glyphs added at runtime are kept in
+#  memory and only written on shutdown, never by the render thread.
+#
+
+import os
+import json
+import atexit
+import struct
+import tempfile
+import threading
+from PIL import Image, ImageDraw, ImageFont
+
+from asset_pack import file_hash
+
+##
+# File layout: magic, version, header length, JSON header, atlas bitmap
+ATLAS_MAGIC = b'PHDG'
+ATLAS_VERSION = 1
+ATLAS_PREAMBLE = struct.Struct('<4sHI')
+
+##
+# Glyphs rasterized when an atlas is built, others are added on first use
+BASE_CHARSET = (''.join(chr(code) for code in range(0x20, 0x7F)) +
+                ''.join(chr(code) for code in range(0xA0, 0x100)) +
+                bytes(range(0x80, 0xA0)).decode('cp1252', errors='ignore') +
+                '\u2190\u2191\u2192\u2193\u2196\u2197\u2198\u2199')
+
+##
+# Replacements for glyphs missing in a font, applied recursively. PressStart2P
+# lacks the diagonal arrows wttr.in uses for the wind direction
+GLYPH_SUBSTITUTIONS = {'\u2190': '<',              # leftwards arrow
+                       '\u2191': '^',              # upwards arrow
+                       '\u2192': '>',              # rightwards arrow
+                       '\u2193': 'v',              # downwards arrow
+                       '\u2196': '\u2191\u2190',   # north west arrow
+                       '\u2197': '\u2191\u2192',   # north east arrow
+                       '\u2198': '\u2193\u2192',   # south east arrow
+                       '\u2199': '\u2193\u2190'}   # south west arrow
+
+# Noncharacter, renders as the "missing glyph" box of a font
+MISSING_GLYPH_PROBE = '\uffff'
+
+
+def resolve_substitution(char, font_has_glyph):
+    """ Returns the string drawn for char, replacing glyphs the font lacks """
+    if font_has_glyph(char) or char not in GLYPH_SUBSTITUTIONS:
+        return char
+    return ''.join(resolve_substitution(replacement, font_has_glyph)
+                   for replacement in GLYPH_SUBSTITUTIONS[char])
+
+
+class GlyphAtlas():
+    """ Pixel font at one size, drawn from pre-rasterized glyphs. Implements the
+    parts of the ImageFont interface the text cache uses (getbbox, getlength) """
+
+    def __init__(self, font_path, size, cache_directory=None, charset=BASE_CHARSET):
+        self.font_path = font_path
+        self.size = size
+        self.font_hash = file_hash(font_path)
+        self.cache_path = None
+        if cache_directory is not None:
+            self.cache_path = os.path.join(cache_directory,
+                                           '{}-{}.atlas'.format(self.font_hash[:16], size))
+
+        # FreeType font, only loaded to build the atlas or add glyphs
+        self._font = None
+
+        ##
+        # {char: (image, (left, top, right, bottom), advance)}
+        self.glyphs = {}
+        # Glyphs were added since the atlas was loaded or saved
+        self.dirty = False
+        # Displays of a group render with the same atlas from their own threads
+        self.lock = threading.Lock()
+
+        if not self.load():
+            for char in charset:
+                self.add_glyph(char)
+            self.save()
+
+    @property
+    def font(self):
+        if self._font is None:
+            self._font = ImageFont.truetype(self.font_path, self.size)
+        return self._font
+
+    def font_has_glyph(self, char):
+        """ Returns False if FreeType draws the missing glyph box for char """
+        if char == MISSING_GLYPH_PROBE:
+            return False
+        return (self.font.getbbox(char) != self.font.getbbox(MISSING_GLYPH_PROBE) or
+                bytes(self.font.getmask(char)) != bytes(self.font.getmask(MISSING_GLYPH_PROBE)))
+
+    def add_glyph(self, char):
+        """ Rasterizes char (or its substitution) and adds it to the atlas """
+        text = resolve_substitution(char, self.font_has_glyph)
+        left, top, right, bottom = self.font.getbbox(text)
+
+        image = Image.new('1', (max(right - left, 1), max(bottom - top, 1)))
+        ImageDraw.Draw(image).text((-left, -top), text, font=self.font, fill=255)
+
+        glyph = (image, (left, top, right, bottom), self.font.getlength(text))
+        self.glyphs[char] = glyph
+        return glyph
+
+    def glyph(self, char):
+        glyph = self.glyphs.get(char)
+        if glyph is None:
+            with self.lock:
+                glyph = self.glyphs.get(char)
+                if glyph is None:
+                    glyph = self.add_glyph(char)
+                    # Persisted by save_if_dirty(), not in the middle of a frame
+                    self.dirty = True
+        return glyph
+
+    ##
+    # ImageFont interface
+    def getlength(self, text):
+        return sum(self.glyph(char)[2] for char in text)
+
+    def getbbox(self, text):
+        """ Returns the bounding box of text like FreeTypeFont.getbbox: the
+        ink extent, horizontally extended to the advance of the string """
+        pen = 0
+        left = 0
+        top = None
+        right = 0
+        bottom = None
+        for char in text:
+            _, (g_left, g_top, g_right, g_bottom), advance = self.glyph(char)
+            left = min(left, pen + g_left)
+            right = max(right, pen + g_right)
+            top = g_top if top is None else min(top, g_top)
+            bottom = g_bottom if bottom is None else max(bottom, g_bottom)
+            pen += advance
+
+        if top is None:
+            return (0, 0, 0, 0)
+        return (left, top, int(max(right, pen)), bottom)
+
+    def render_text(self, text):
+        """ Returns (bitmap, (left, top)) of text, like TextCache.render """
+        left, top, right, bottom = self.getbbox(text)
+        bitmap = Image.new('1', (max(right - left, 1), max(bottom - top, 1)))
+        draw = ImageDraw.Draw(bitmap)
+
+        pen = 0
+        for char in text:
+            image, (g_left, g_top, _, _), advance = self.glyph(char)
+            draw.bitmap((int(round(pen)) + g_left - left, g_top - top), image, fill=255)
+            pen += advance
+
+        return (bitmap, (left, top))
+
+    ##
+    # Disk cache
+    def load(self):
+        """ Loads the atlas from the disk cache. Returns False if it is missing or outdated """
+        if self.cache_path is None or not os.path.exists(self.cache_path):
+            return False
+
+        try:
+            with open(self.cache_path, 'rb') as atlas_file:
+                data = atlas_file.read()
+
+            magic, version, header_length = ATLAS_PREAMBLE.unpack_from(data, 0)
+            if magic != ATLAS_MAGIC or version != ATLAS_VERSION:
+                return False
+
+            header_start = ATLAS_PREAMBLE.size
+            header = json.loads(data[header_start:header_start + header_length].decode('utf-8'))
+            if (header['font_hash'] != self.font_hash or header['size'] != self.size or
+                    header['substitutions'] != GLYPH_SUBSTITUTIONS):
+                return False
+
+            atlas = Image.frombytes('1', tuple(header['atlas_size']), data[header_start + header_length:])
+        except (OSError, ValueError, KeyError, struct.error) as exc:
+            print(exc)
+            return False
+
+        for char, (x, bbox, advance) in header['glyphs'].items():
+            width = max(bbox[2] - bbox[0], 1)
+            height = max(bbox[3] - bbox[1], 1)
+            self.glyphs[char] = (atlas.crop((x, 0, x + width, height)), tuple(bbox), advance)
+        return True
+
+    def save_if_dirty(self):
+        """ Writes the atlas if glyphs were added at runtime """
+        if self.dirty:
+            self.save()
+
+    def save(self):
+        """ Packs all glyphs side by side into one bitmap and writes it to the disk cache """
+        if self.cache_path is None:
+            return
+
+        with self.lock:
+            items = list(self.glyphs.items())
+            self.dirty = False
+
+        atlas_width = sum(image.size[0] for _, (image, _, _) in items)
+        atlas_height = max([image.size[1] for _, (image, _, _) in items] + [1])
+        atlas = Image.new('1', (max(atlas_width, 1), atlas_height))
+
+        glyphs = {}
+        x = 0
+        for char, (image, bbox, advance) in items:
+            atlas.paste(image, (x, 0))
+            glyphs[char] = [x, list(bbox), advance]
+            x += image.size[0]
+
+        header = {'font_hash': self.font_hash,
+                  'size': self.size,
+                  'substitutions': GLYPH_SUBSTITUTIONS,
+                  'atlas_size': list(atlas.size),
+                  'glyphs': glyphs}
+        header_bytes = json.dumps(header, sort_keys=True).encode('utf-8')
+
+        # Write atomically, displays of a group share the cache
+        try:
+            directory = os.path.dirname(self.cache_path)
+            os.makedirs(directory, exist_ok=True)
+            file_descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(file_descriptor, 'wb') as atlas_file:
+                atlas_file.write(ATLAS_PREAMBLE.pack(ATLAS_MAGIC, ATLAS_VERSION, len(header_bytes)))
+                atlas_file.write(header_bytes)
+                atlas_file.write(atlas.tobytes())
+            os.replace(temporary_path, self.cache_path)
+        except OSError as exc:
+            print(exc)
+
+
+##
+# Atlases shared by all displays of the process, keyed by font, size and cache
+_shared_atlases = {}
+_shared_atlases_lock = threading.Lock()
+
+
+def shared_atlas(font_path, size, cache_directory=None):
+    """ Returns the atlas of font_path at size, built or loaded only once per process """
+    key = (os.path.abspath(font_path), size, cache_directory)
+    with _shared_atlases_lock:
+        atlas = _shared_atlases.get(key)
+        if atlas is None:
+            atlas = GlyphAtlas(font_path, size, cache_directory)
+            _shared_atlases[key] = atlas
+    return atlas
+
+
+def save_shared_atlases():
+    """ Persists glyphs added at runtime to the shared atlases, called on shutdown """
+    with _shared_atlases_lock:
+        atlases = list(_shared_atlases.values())
+    for atlas in atlases:
+        atlas.save_if_dirty()
+
+
+atexit.register(save_shared_atlases)
@@ -10,15 +10,74 @@
 import time
 import threading
 import os.path
-import random
 from enum import Enum
-from PIL import Image, ImageDraw, ImageFont
-from board import SCL, SDA
-import busio
-import adafruit_ssd1306
+import numpy as np
+from PIL import Image
 
 from stat_grabber import StatGrabber
+from text_cache import TextCache
+from glyph_atlas import shared_atlas
+from frame_scheduler import FrameScheduler
+from frame_metrics import FrameMetrics
+from asset_pack import load_asset_pack, convert_frames
+from marquee import Marquee, MARQUEE_PAUSE
+from chip_animation import ChipAnimation
+from metric_history import column_heights, bar_graph
 from observer import Observer, Subject
+from config import ConfigWatcher, read_config
+from display_backend import DisplayBackend, backend_for_name
+from page_canvas import PageCanvas
+
+##
+# Repository root, fonts and assets are located relative to it
+BASE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+##
+# Cycle screens by name, the index is the state of the run() loop
+SCREENS = ['system', 'weather', 'blocked', 'clients', 'history', 'queries']
+
+##
+# Metrics of the history screen and their labels, one graph per half of the screen
+HISTORY_GRAPHS = [('cpu', 'CPU'), ('blocked_percentage', 'ADS')]
+
+##
+# Hourly counts of the queries screen and their labels, laid out like the history graphs
+QUERY_GRAPHS = [('queries', 'ALL'), ('blocked', 'ADS')]
+
+##
+# Display attributes a frame is rendered from, stored by the frame recorder
+RENDER_INPUT_ATTRIBUTES = ['current_state',
+                           'current_message_dict',
+                           'ph_q_blocked',
+                           'ph_q_total',
+                           'ph_q_perc',
+                           'ph_top_client',
+                           'ph_active_device_count',
+                           'ph_known_client_count',
+                           'time_string',
+                           'weather_line_1',
+                           'weather_line_2',
+                           'weather_icon',
+                           'cpu_load',
+                           'memory_percentage',
+                           'history_columns',
+                           'history_values',
+                           'query_columns',
+                           'query_values',
+                           'chip_frame',
+                           'animation_tick',
+                           'frame_time',
+                           'screen_started_at']
+
+
+def short_count(count):
+    """ Returns count in at most four characters, e.g. 987, 18k or 2M """
+    count = int(count)
+    if count < 1000:
+        return '{}'.format(count)
+    if count < 1000000:
+        return '{}k'.format(count // 1000)
+    return '{}M'.format(count // 1000000)
 
 
 class MODE(Enum):
@@ -38,21 +97,45 @@ class Display(Observer, threading.Thread):
     # Observer Interface
     def update(self, subject: Subject) -> None:
         """ React to subject updates """
+        if isinstance(subject, ConfigWatcher):
+            self.apply_config(subject.config)
+            self.scheduler.wake()
+            return
+
         self.current_mode = subject.mode
         self.current_message_dict = subject.current_message_dict
 
-    def __init__(self):
+        # Render the new mode right away
+        self.scheduler.wake()
+
+    def __init__(self, backend='ssd1306', stat_grabber=None, playlist=None, assets=None, name=None, config=None):
+        ##
+        # Frame rate cap, screen durations and paths, see config.py
+        if config is None:
+            config = read_config()
+        self.config = config
+
         ##
         # Initializes hardware and drawing interface
-        self.init_display()
+        self.init_display(backend)
 
         ##
-        # Seed random
-        random.seed('denali')
+        # Cycle screens shown by this display, in order. See SCREENS
+        if playlist is None:
+            playlist = SCREENS
+        self.playlist = [SCREENS.index(screen) for screen in playlist]
+        if not self.playlist:
+            raise ValueError('Display playlist is empty')
+
+        ##
+        # Chip graphic of the progress view, data lines are seeded with 'denali'
+        self.chip_animations = {}
+        self.chip_frame = 0
 
         ##
         # Condition for main loop
         self.should_run = False
+        self.scheduler = FrameScheduler()
 
         ##
         # Instance Variables
@@ -61,55 +144,90 @@ class Display(Observer, threading.Thread):
         self.current_mode = MODE.CLEAR
         self.current_message_dict = {}
 
-        self.current_state = 0
+        self.current_state = self.playlist[0]
         self.pihole_stats = {}
 
+        # Weather view
+        self.time_string = ''
+        self.weather_line_1 = ''
+        self.weather_line_2 = ''
+        self.weather_icon = ''
+
+        # History view, bar heights per metric, newest last
+        self.history_columns = {}
+        self.history_values = {}
+
+        # Queries view, bar heights per hour of the last day, newest last
+        self.query_columns = {}
+        self.query_values = {}
+
+        ##
+        # Pre-converted animations and icons, displays of a group share one pack
+        if assets is None:
+            assets = load_asset_pack(BASE_PATH, os.path.join(config.cache_path, 'assets.pack'))
+        self.assets = assets
+
         ##
         # Load gif animations into this list
         self.animation = []
         self.animation_tick = 0
         self.load_intro()
 
+        self.text_cache = TextCache()
+        self.static_layers = {}
+        self.marquees = {}
+        self.marquee_mode = MARQUEE_PAUSE
+
+        ##
+        # Monotonic time of the current frame and of the last screen swap.
+        # Time based animations only depend on these, see render_inputs()
+        self.frame_time = time.monotonic()
+        self.screen_started_at = self.frame_time
+
+        # Optional FrameRecorder receiving every rendered frame
+        self.recorder = None
+
+        # Phase timing of the render loop, see frame_metrics.py
+        self.metrics = FrameMetrics()
         self.init_fonts()
         self.init_pihole_stats()
 
-        self.stat_grabber = StatGrabber()
+        if stat_grabber is None:
+            stat_grabber = StatGrabber()
+        self.stat_grabber = stat_grabber
 
         self.special_mode = 0
 
         # Super Init
-        super(Display, self).__init__()
+        super(Display, self).__init__(name=name)
 
-    def init_display(self):
+    def init_display(self, backend):
         """ Display Configuration """
         ##
         # Instantiate actors
-        # Create the I2C interface.
-        self.i2c = busio.I2C(SCL, SDA)
-
-        ##
-        # Create the SSD1306 OLED class.
-        # The first two parameters are the pixel width and pixel height. Change these
-        # to the right size for your display!
-        self.display = adafruit_ssd1306.SSD1306_I2C(128, 32, self.i2c)
-
-        # LED display can render 30fps max
-        self.max_fps = 30
-
-        # Create blank image for drawing.
-        # Make sure to create image with mode '1' for 1-bit color.
-        self.width = self.display.width
-        self.height = self.display.height
-        self.image = Image.new('1', (self.width, self.height))
+        # backend is either a name ('ssd1306', 'virtual') or a DisplayBackend
+        if isinstance(backend, DisplayBackend):
+            self.backend = backend
+        else:
+            self.backend = backend_for_name(backend)
 
-        # Get drawing object to draw on image.
-        self.draw = ImageDraw.Draw(self.image)
+        # Frame rate cap, the LED display can render 30fps max
+        self.max_fps = self.config.max_fps
 
-        # Draw a black filled box to clear the image.
-        # self.draw.rectangle((0, 0, self.width, self.height), outline=0, fill=0)
+        # Frames are drawn onto a packed canvas in the page layout of the
+        # SSD1306, the backend transfers its bytes without conversion.
+        # PIL only rasterizes glyphs and pre-rendered graphics
+        self.width = self.backend.width
+        self.height = self.backend.height
+        self.canvas = PageCanvas(self.width, self.height)
 
         self.clear_display(refresh=True)
 
+    @property
+    def image(self):
+        """ The current frame as mode '1' image, e.g. for recordings and tests """
+        return self.canvas.to_image()
+
     def init_pihole_stats(self):
         """ Initializes Pi-Hole stats """
         self.ph_q_blocked = 0
@@ -120,30 +238,39 @@ class Display(Observer, threading.Thread):
         self.ph_active_device_count = ''
         self.ph_known_client_count = ''
 
+        # System stats as last drawn
+        self.cpu_load = 0.0
+        self.memory_percentage = 0.0
+
     def init_fonts(self):
         """ Font Configuration """
 
         # Kept for reference
         # self.small_font = ImageFont.load_default()
 
-        ##
-        # REFACTOR
-        HARD_CODED_BASE_PATH = '/home/pi/pihole-display'
+        # Cached bitmaps and layers belong to the previous font objects
+        self.text_cache.clear()
+        self.invalidate_static_layers()
+        self.marquees.clear()
 
-        font_path = '{}/fonts/PressStart2P.ttf'.format(HARD_CODED_BASE_PATH)
-        icon_font_path = '{}/fonts/pixel_dingbats-7.ttf'.format(HARD_CODED_BASE_PATH)
+        font_path = os.path.join(BASE_PATH, 'fonts', 'PressStart2P.ttf')
+        icon_font_path = os.path.join(BASE_PATH, 'fonts', 'pixel_dingbats-7.ttf')
+
+        # Both are pixel fonts, glyphs are rasterized once into atlases cached on
+        # disk. Displays of the process share the atlas of a font and size
+        atlas_path = os.path.join(self.config.cache_path, 'glyphs')
 
         self.small_font_size = 8
-        self.small_font = ImageFont.truetype(font_path, self.small_font_size)
-        self.small_icon_font = ImageFont.truetype(icon_font_path, self.small_font_size)
+        self.small_font = shared_atlas(font_path, self.small_font_size, atlas_path)
+        self.small_icon_font = shared_atlas(icon_font_path, self.small_font_size, atlas_path)
 
         self.full_font_size = 32
-        self.full_font = ImageFont.truetype(font_path, self.full_font_size)
-        self.full_icon_font = ImageFont.truetype(icon_font_path, self.full_font_size)
+        self.full_font = shared_atlas(font_path, self.full_font_size, atlas_path)
+        self.full_icon_font = shared_atlas(icon_font_path, self.full_font_size, atlas_path)
 
         self.half_font_size = 16
-        self.half_font = ImageFont.truetype(font_path, self.half_font_size)
-        self.half_icon_font = ImageFont.truetype(icon_font_path, self.half_font_size)
+        self.half_font = shared_atlas(font_path, self.half_font_size, atlas_path)
+        self.half_icon_font = shared_atlas(icon_font_path, self.half_font_size, atlas_path)
 
         ##
         # Some fonts to not align properly, therefore we specify offsets here
@@ -157,260 +284,179 @@ class Display(Observer, threading.Thread):
     def update_pihole_stats(self):
         """ Updates global pihole variables """
 
-        self.stat_grabber.refresh_pihole_stats()
+        # Stats are refreshed by the background collectors of stat_grabber
         self.pihole_stats = self.stat_grabber.get_pihole_stats()
-
-        self.ph_q_blocked = self.pihole_stats['ratio'][0]
-        self.ph_q_total = self.pihole_stats['ratio'][1]
-        self.ph_q_perc = int(self.pihole_stats['today_percentage'])/100.0
+        if not self.pihole_stats:
+            # No completed refresh yet
+            return
+
+        # Stats are typed, counts are drawn with thousands separators
+        self.ph_q_blocked = '{:,}'.format(self.pihole_stats['ratio'][0])
+        self.ph_q_total = '{:,}'.format(self.pihole_stats['ratio'][1])
+        self.ph_q_perc = self.pihole_stats['today_percentage']/100.0
         self.ph_top_client = self.pihole_stats['topclient'].replace('.lan', '')
         self.ph_uptime = self.pihole_stats['uptime']
         self.ph_active_device_count = self.pihole_stats['active_device_count']
         self.ph_known_client_count = self.pihole_stats['known_client_count']
 
-    def config_for_mode(self, mode: MODE):
-        config = {}
-        if MODE.INTRO:
-            pass
-        elif MODE.CLEAR:
-            pass
-        elif MODE.CYCLE:
-            config = {'should_cycle' : True,
-                      'state_count': 4,
-                      'durations_for_state': [10, 15, 10, 10]}
-        elif MODE.PROGRESS:
-            pass
-        elif MODE.WARNING:
-            pass
-        return config
+    def apply_config(self, config):
+        """ Switches to a reloaded config, the render loop reads it once per frame """
+        self.config = config
+        self.max_fps = config.max_fps
 
     def draw_bar_horizontal(self, origin, size, percentage):
         """ Use draw to draw progress bars within provided dimensions """
-        border_stroke = 1
+        self.draw_bar_border(origin, size)
+        self.draw_bar_fill(origin, size, percentage)
 
-        norm_percentage = max(min(1, percentage), 0)
+    def draw_bar_border(self, origin, size):
+        """ Draws the static frame of a progress bar """
+        border_stroke = 1
 
         # print('Origin: {}    Size: {}'.format(origin, size))
         x_1 = origin[0]
         y_1 = origin[1]
 
-        width = size[0]
-        height = size[1]
+        x_2 = x_1 + size[0]
+        y_2 = y_1 + size[1]
 
-        x_2 = x_1 + width
-        y_2 = y_1 + height
+        self.canvas.fill_rect(x_1,
+                              y_1,
+                              x_2,
+                              y_2)
 
-        self.draw.rectangle((x_1,
-                             y_1,
-                             x_2,
-                             y_2), fill=255)
+        self.canvas.fill_rect(x_1 + border_stroke,
+                              y_1 + border_stroke,
+                              x_2 - border_stroke,
+                              y_2 - border_stroke, color=0)
 
-        self.draw.rectangle((x_1 + border_stroke,
-                             y_1 + border_stroke,
-                             x_2 - border_stroke,
-                             y_2 - border_stroke), fill=0)
+    def draw_bar_fill(self, origin, size, percentage):
+        """ Draws the filled part of a progress bar into its border """
+        border_stroke = 1
 
-        self.draw.rectangle((x_1 + 2 * border_stroke,
-                             y_1 + 2 * border_stroke,
-                             x_1 + norm_percentage * (width - 2 * border_stroke),
-                             y_2 - 2 * border_stroke), fill=255)
+        norm_percentage = max(min(1, percentage), 0)
 
-    def get_horizontal_offset(self, text, font, tick):
-        """ Takes a text, a font and the current frame count (tick) to
-        generate an horizontal scrolling offset """
+        x_1 = origin[0]
+        y_1 = origin[1]
 
-        text_width = self.draw.textsize(text=text, font=font)[0]
+        width = size[0]
+        height = size[1]
 
-        if (text_width > self.width - 3):
-            # should scroll
+        fill_x_1 = x_1 + 2 * border_stroke
+        fill_x_2 = x_1 + norm_percentage * (width - 2 * border_stroke)
 
-            delta = text_width - self.width
-            step_size = delta / self.max_fps
+        if fill_x_2 < fill_x_1:
+            # Nothing to fill
+            return
 
-            half_fps = self.max_fps / 2
-            # return (half_fps - tick) * step_size - half_fps
-            return -tick * step_size
+        self.canvas.fill_rect(fill_x_1,
+                              y_1 + 2 * border_stroke,
+                              fill_x_2,
+                              y_1 + height - 2 * border_stroke)
 
-        return 0
+    def draw_text(self, position, text, font):
+        """ Draws text by blitting its cached, pre-packed bitmap instead of rasterizing it again """
+        y = int(position[1])
+        pages, offset = self.text_cache.render_pages(text, font, y)
+        self.canvas.blit_pages(pages, int(position[0]) + offset[0], (y + offset[1]) >> 3)
+
+    def draw_marquee(self, slot, position, text, font):
+        """ Draws a line of text that scrolls if it is too wide. slot names the
+        line on its screen, its strip is only rendered again when the text changes """
+        marquee = self.marquees.get(slot)
+        if marquee is None or marquee.text != text or marquee.font is not font:
+            marquee = Marquee(text, font, self.width - int(position[0]), self.text_cache,
+                              mode=self.marquee_mode)
+            self.marquees[slot] = marquee
+
+        # Lines scroll from their start whenever a screen is shown
+        marquee.draw(self.canvas, position, now=marquee.started_at + self.frame_time - self.screen_started_at)
 
     def load_icon_with_name(self, name, size=(32, 32)):
-        """ Loads bitmap / png icons by name from the 'icons' folder """
-        img = Image.open(os.path.join('icons', name), mode='r').resize(size).convert('1')
-        return img
+        """ Loads bitmap / png icons by name from the asset pack or the 'icons' folder """
+        if self.assets is not None:
+            icon = self.assets.icon(name, size)
+            if icon is not None:
+                return icon
 
-    def iter_frames_of_gif(self, gif):
-        try:
-            i= 0
-            while True:
-                gif.seek(i)
-                imframe = gif.copy()
-                if i == 0:
-                    palette = imframe.getpalette()
-                else:
-                    imframe.putpalette(palette)
-                yield imframe
-                i += 1
-        except EOFError as exc:
-            pass
+        img = Image.open(os.path.join(BASE_PATH, 'icons', name), mode='r').resize(size).convert('1')
+        return img
 
     def load_gif_animation(self, name, size=None):
-        gifs_directory = 'anim'
+        """ Loads the frames of an animation from the asset pack. Frames are
+        decoded lazily when they are drawn """
         self.animation = []
-        try:
-            for frame in self.iter_frames_of_gif(Image.open(os.path.join(gifs_directory, name), mode='r')):
-                if size is None:
-                    # load without resizing
-                    self.animation.append(frame.convert('1'))
-                else:
-                    self.animation.append(frame.resize(size).convert('1'))
 
+        if self.assets is not None:
+            frames = self.assets.animation(name, size)
+            if frames is not None:
+                self.animation = frames
+                return
+
+        # Not packed (e.g. unusual size), convert at runtime
+        try:
+            self.animation = convert_frames(os.path.join(BASE_PATH, 'anim', name), 'animation', size)
         except FileNotFoundError as exc:
             print(exc)
 
     def clear_display(self, fill=0, refresh=False):
         """  Clear display """
-        self.draw.rectangle((0, 0, self.width, self.height), outline=0, fill=fill)
+        self.canvas.clear(fill)
         # self.display.fill(fill)
 
         if refresh:
-            self.display.show()
+            self.backend.show(self.canvas)
+
+    ##
+    # Static layers
+    # Labels, borders and outlines of a screen are composed once into a static
+    # layer. Frames start from a copy of that layer and only draw dynamic content.
+    def start_from_static_layer(self, name, compose):
+        """ Starts the frame with the static layer of screen name. compose() draws
+        the static content and is only called if the layer does not exist yet """
+        layer = self.static_layers.get(name)
+        if layer is None:
+            self.clear_display()
+            compose()
+            layer = self.canvas.copy_pages()
+            self.static_layers[name] = layer
+        else:
+            self.canvas.restore_pages(layer)
+
+    def invalidate_static_layers(self, name=None):
+        """ Drops the static layer of screen name or all layers, e.g. after font or layout changes """
+        if name is None:
+            self.static_layers.clear()
+        else:
+            self.static_layers.pop(name, None)
+
+    ##
+    # Chip
+    # The chip graphic is pre-rendered by ChipAnimation, see chip_animation.py
+    def chip_animation_at(self, pos):
+        """ Returns the (lazily created) chip animation drawn at pos """
+        animation = self.chip_animations.get(pos)
+        if animation is None:
+            animation = ChipAnimation(self.width, self.height, pos=pos)
+            self.chip_animations[pos] = animation
+        return animation
 
     def draw_chip(self, pos=(0, 0), percentage=None, tick=0):
-        outer_chip_size = 26
-        inner_chip_size = 12
-        # pin_offset = 3
-        # pin_count = 5
-        pin_offset = 5
-        pin_count = 8
-        pin_length = 3
-        pin_distance = (outer_chip_size - 2*pin_offset)/pin_count
-
-        # debug
-        # self.draw.rectangle((pos[0], pos[1], pos[0]+outer_chip_size+2*pin_length, pos[1]+outer_chip_size+2*pin_length),
-        #                     fill=0,
-        #                     outline=1)
-        # self.draw.line((1, 0, 1, self.height), fill=255, width=1)
-
-
-        outer_square_x = pos[0] + pin_length
-        outer_square_y = pos[1] + pin_length
-        self.draw.rectangle((outer_square_x, outer_square_y, outer_square_x + outer_chip_size, outer_square_y + outer_chip_size),
-                            fill=0,
-                            outline=1)
-
-        square_delta = (outer_chip_size - inner_chip_size)/2
-        inner_square_x = outer_square_x + square_delta
-        inner_square_y = outer_square_y + square_delta
-
-        if percentage is not None:
-            vertical_percentage_offset = outer_square_y + outer_chip_size - percentage*outer_chip_size
-            self.draw.rectangle((outer_square_x, vertical_percentage_offset, outer_square_x + outer_chip_size, outer_square_y + outer_chip_size),
-                                fill=1,
-                                outline=1)
-
-
-        # self.draw.rectangle((outer_square_x, outer_square_y, outer_chip_size, outer_chip_size),
-        #                     fill=0,
-        #                     outline=1)
-
-        self.draw.rectangle((inner_square_x, inner_square_y, inner_square_x + inner_chip_size, inner_square_y + inner_chip_size),
-                            fill=0,
-                            outline=1)
-
-        if vertical_percentage_offset <= inner_square_y + inner_chip_size + 1:
-            self.draw.line((inner_square_x,
-                            max(vertical_percentage_offset, inner_square_y),
-                            inner_square_x,
-                            inner_square_y + inner_chip_size),
-                           fill=0, width=1)
-
-            self.draw.line((inner_square_x + inner_chip_size,
-                            max(vertical_percentage_offset, inner_square_y),
-                            inner_square_x + inner_chip_size,
-                            inner_square_y + inner_chip_size), fill=0, width=1)
-
-            self.draw.rectangle((inner_square_x + 1,
-                                 vertical_percentage_offset,
-                                 inner_square_x + inner_chip_size - 1,
-                                 inner_square_y + inner_chip_size - 1),
-                                fill=1,
-                                outline=1)
-
-            self.draw.line((inner_square_x,
-                            inner_square_y + inner_chip_size,
-                            inner_square_x + inner_chip_size,
-                            inner_square_y + inner_chip_size), fill=0, width=1)
-
-            if vertical_percentage_offset <= inner_square_y + 1:
-                self.draw.line((inner_square_x,
-                                inner_square_y,
-                                inner_square_x + inner_chip_size,
-                                inner_square_y), fill=0, width=1)
-
-        # self.draw.rectangle((inner_square_x, inner_square_y, inner_chip_size, inner_chip_size),
-        #                     fill=0,
-        #                     outline=1)
-
-        for pin_idx in range(0, pin_count):
-            # + 1 seems hacky. I probably messed something up
-            pin_pos_x = outer_square_x + pin_offset + pin_idx*pin_distance + 1
-            pin_pos_y = outer_square_y + pin_offset + pin_idx*pin_distance + 1
-            v_x = pos[0]
-            v_y = pos[1]
-
-            # vertical
-            self.draw.line((pin_pos_x,
-                            v_y,
-                            pin_pos_x,
-                            outer_square_y),
-                           fill=255,
-                           width=1)
-
-            self.draw.line((pin_pos_x,
-                            outer_square_y + outer_chip_size,
-                            pin_pos_x,
-                            1 + outer_square_y + outer_chip_size + pin_length),
-                           fill=255,
-                           width=1)
-
-            # horizontal
-            self.draw.line((v_x,
-                            pin_pos_y,
-                            outer_square_x,
-                            pin_pos_y),
-                           fill=255,
-                           width=1)
-
-            right_outer_border = outer_square_x + outer_chip_size + pin_length
-            self.draw.line((outer_square_x +  outer_chip_size,
-                            pin_pos_y,
-                            right_outer_border,
-                            pin_pos_y),
-                           fill=255,
-                           width=1)
-
-            if percentage is not None and percentage < 1.0:
-            # Animate input...
-            # if tick % 3 == 0:
-                data_pos = right_outer_border + 1
-                line_delta = self.width-data_pos
-                r = random.randint(0,5)
-                if r<=1:
-                    # data_pos = right_outer_border + (self.max_fps-tick)
-
-                    self.draw.line((data_pos,
-                                    pin_pos_y,
-                                    data_pos + random.randint(5, line_delta),
-                                    pin_pos_y),
-                                fill=255,
-                                width=1)
-
-                    # self.draw.line((data_pos,
-                    #                 pin_pos_y,
-                    #                 self.width,
-                    #                 pin_pos_y),
-                    #             fill=255,
-                    #             width=1)
+        self.draw_chip_static(pos=pos)
+        self.draw_chip_dynamic(pos=pos, percentage=percentage, tick=tick)
+
+    def draw_chip_static(self, pos=(0, 0)):
+        """ Draws chip outline and pins """
+        self.chip_animation_at(pos).draw_outline(self.canvas)
+
+    def draw_chip_dynamic(self, pos=(0, 0), percentage=None, tick=0):
+        """ Draws fill level and data lines on top of the static chip """
+        animation = self.chip_animation_at(pos)
+        animation.draw_body(self.canvas, percentage)
+
+        if percentage is not None and percentage < 1.0:
+            animation.draw_data_lines(self.canvas, self.chip_frame)
+            self.chip_frame += 1
 
     def draw_progress_view(self, tick=0):
         name = self.current_message_dict['activity_name']
@@ -424,6 +470,8 @@ class Display(Observer, threading.Thread):
         progress_label_1 = name
         progress_label_2 = detail
 
+        self.start_from_static_layer('progress', lambda: self.draw_chip_static(pos=(0, 0)))
+
         if (percentage is not None) and (percentage >= 1.0):
             if (name_finished is not None):
                 progress_label_1 = name_finished
@@ -432,20 +480,18 @@ class Display(Observer, threading.Thread):
                 progress_label_2 = detail_finished
 
         if (progress_label_1 is not None):
-            self.draw.text((offset, self.font_offset),
+            self.draw_text((offset, self.font_offset),
                            '{}'.format(progress_label_1),
-                           font=self.small_font,
-                           fill=255)
+                           font=self.small_font)
 
         if (progress_label_2 is not None):
             # 1+ to put gap between chip animation
-            self.draw.text((offset, 1 + self.font_offset+3*self.small_font_size),
+            self.draw_text((offset, 1 + self.font_offset+3*self.small_font_size),
                            '{}'.format(progress_label_2),
-                           font=self.small_font,
-                           fill=255)
+                           font=self.small_font)
 
 
-        self.draw_chip(pos=(0, 0), percentage=percentage, tick=tick)
+        self.draw_chip_dynamic(pos=(0, 0), percentage=percentage, tick=tick)
             # square_width = 5
             # origin_x = 10*tick
             # origin_y = 10
@@ -470,7 +516,7 @@ class Display(Observer, threading.Thread):
         #                      position[1] + frame_size[1]),
         #                     outline=0, fill=1)
 
-        self.draw.bitmap(position, self.animation[self.animation_tick], fill=1)
+        self.canvas.blit(self.animation[self.animation_tick], *position)
         self.animation_tick = (self.animation_tick + 1) % frame_count
 
     def draw_connection_view(self, tick=0):
@@ -482,100 +528,256 @@ class Display(Observer, threading.Thread):
         m3 = messages[2]
         m4 = '{}'.format(connection_attempts)
 
-        self.draw.text((0, self.font_offset),
+        self.draw_text((0, self.font_offset),
                         '{}'.format(m1),
-                        font=self.small_font,
-                        fill=255)
+                        font=self.small_font)
 
-        self.draw.text((0, self.font_offset + self.small_font_size),
+        self.draw_text((0, self.font_offset + self.small_font_size),
                         '{}'.format(m2),
-                        font=self.small_font,
-                        fill=255)
+                        font=self.small_font)
 
-        self.draw.text((0, self.font_offset + self.small_font_size*2),
+        self.draw_text((0, self.font_offset + self.small_font_size*2),
                         '{}'.format(m3),
-                        font=self.small_font,
-                        fill=255)
+                        font=self.small_font)
 
-        self.draw.text((0, self.font_offset + self.small_font_size*3),
+        self.draw_text((0, self.font_offset + self.small_font_size*3),
                         '{}'.format(m4),
-                        font=self.small_font,
-                        fill=255)
+                        font=self.small_font)
 
     def draw_blocked_stats(self, tick=0):
         """ Generates frame of blocked state for provided tick """
 
         progressbar_width = 1
         blocked_today_header_string = 'Blocked today:'
-        blocked_h_offset = self.get_horizontal_offset(text=blocked_today_header_string,
-                                                        font=self.small_font,
-                                                        tick=tick)
-        self.draw.text((blocked_h_offset, self.font_offset),
-                        '{}'.format(blocked_today_header_string),
-                        font=self.small_font,
-                        fill=255)
+        header_is_static = not self.is_scrolling(blocked_today_header_string, self.small_font)
 
         origin = (0, self.small_font_size)
         size = (self.width - progressbar_width - 2, self.half_font_size - 2)
-        self.draw_bar_horizontal(origin, size, self.ph_q_perc)
+
+        def compose():
+            if header_is_static:
+                self.draw_text((0, self.font_offset),
+                               blocked_today_header_string,
+                               font=self.small_font)
+            self.draw_bar_border(origin, size)
+
+        self.start_from_static_layer('blocked', compose)
+
+        if not header_is_static:
+            self.draw_marquee('blocked_header',
+                              (0, self.font_offset),
+                              blocked_today_header_string,
+                              font=self.small_font)
+
+        self.draw_bar_fill(origin, size, self.ph_q_perc)
 
         block_ratio_string = '({}/{}'.format(self.ph_q_blocked, self.ph_q_total)
-        block_ratio_h_offset = self.get_horizontal_offset(text=block_ratio_string, font=self.small_font, tick=tick)
-        self.draw.text((block_ratio_h_offset,
-                        self.font_offset + self.half_font_size + self.small_font_size),
-                       block_ratio_string,
-                       font=self.small_font,
-                       fill=255)
+        self.draw_marquee('blocked_ratio',
+                          (0, self.font_offset + self.half_font_size + self.small_font_size),
+                          block_ratio_string,
+                          font=self.small_font)
 
     def draw_client_stats(self, tick=0):
         """ Generates frame of client state for provided tick """
-        self.draw.text((0, self.font_offset),
-                        'Top Client:',
-                        font=self.small_font,
-                        fill=255)
+        def compose():
+            self.draw_text((0, self.font_offset),
+                           'Top Client:',
+                           font=self.small_font)
+            self.draw_text((0, self.font_offset + self.half_font_size + self.small_font_size),
+                           'Clients:',
+                           font=self.small_font)
+
+        self.start_from_static_layer('client', compose)
+
         # draw.text((x, self.font_offset + self.small_font_size), '{0:>15}'.format(self.ph_top_client), font=self.half_font, fill=255)
-        offset = self.get_horizontal_offset(text=self.ph_top_client,
-                                            font=self.half_font,
-                                            tick=tick)
-        self.draw.text((offset, self.font_offset + self.small_font_size),
-                        '{}'.format(self.ph_top_client),
-                        font=self.half_font,
-                        fill=255)
-
-        self.draw.text((0, self.font_offset + self.half_font_size + self.small_font_size),
-                        'Clients:',
-                        font=self.small_font,
-                        fill=255)
-        self.draw.text((0, self.font_offset + self.half_font_size + self.small_font_size),
+        self.draw_marquee('top_client',
+                          (0, self.font_offset + self.small_font_size),
+                          '{}'.format(self.ph_top_client),
+                          font=self.half_font)
+
+        self.draw_text((0, self.font_offset + self.half_font_size + self.small_font_size),
                         '{0:>15}'.format('{}/{}'.format(self.ph_active_device_count,
                                                         self.ph_known_client_count)),
-                        font=self.small_font,
-                        fill=255)
+                        font=self.small_font)
         # draw.text((0, self.font_offset + self.half_font_size), 'Uptime:', font=self.small_font, fill=255)
         # draw.text((0, self.font_offset + self.half_font_size + self.small_font_size), '{0:>15}'.format(self.ph_uptime[:-3]), font=self.small_font, fill=255)
 
     def draw_system_stats(self):
         """ Generates frame of system-stats state for provided tick """
         progressbar_width = 1
-        cpu_percentage = float(self.stat_grabber.get_cpu_load())/100.0
-        ram_percentage = float(self.stat_grabber.get_memory_percentage())/100.0 # cut off percentage sign
-
-        self.draw.text((0, self.font_offset),
-                        'CPU: ',
-                        font=self.half_font,
-                        fill=255)
-        self.draw.text((0, self.font_offset + self.half_font_size),
-                        'RAM: ',
-                        font=self.half_font,
-                        fill=255)
+        self.cpu_load = float(self.stat_grabber.get_cpu_load())
+        self.memory_percentage = float(self.stat_grabber.get_memory_percentage())
+        cpu_percentage = self.cpu_load/100.0
+        ram_percentage = self.memory_percentage/100.0 # cut off percentage sign
 
         cpu_bar_origin = (self.width/2, 1)
         ram_bar_origin = (self.width/2, self.half_font_size + 1)
 
         bar_size = (self.width/2 - progressbar_width - 2, self.half_font_size-2)
 
-        self.draw_bar_horizontal(cpu_bar_origin, bar_size, cpu_percentage)
-        self.draw_bar_horizontal(ram_bar_origin, bar_size, ram_percentage)
+        def compose():
+            self.draw_text((0, self.font_offset),
+                           'CPU: ',
+                           font=self.half_font)
+            self.draw_text((0, self.font_offset + self.half_font_size),
+                           'RAM: ',
+                           font=self.half_font)
+            self.draw_bar_border(cpu_bar_origin, bar_size)
+            self.draw_bar_border(ram_bar_origin, bar_size)
+
+        self.start_from_static_layer('system', compose)
+
+        self.draw_bar_fill(cpu_bar_origin, bar_size, cpu_percentage)
+        self.draw_bar_fill(ram_bar_origin, bar_size, ram_percentage)
+
+    def update_weather_view(self):
+        """ Loads time and weather and prepares the lines of the weather view """
+        self.time_string = self.stat_grabber.get_time()
+        weather = self.stat_grabber.get_weather()
+        if (weather['connection'] is not True):
+            self.weather_line_1 = 'Weather service'
+            self.weather_line_2 = 'unreachable'
+            condition = 'error'
+
+        else:
+            condition = weather['weatherDesc'][0]['value']
+            # Round precipitation
+            precipitation = round(float(weather['precipMM'][:-2]))
+            wind = '{} {}km/h'.format(weather['winddir16Point'], weather['windspeedKmph'])
+            pressure = '{}hPa'.format(weather['pressure'])
+            # probability = '' if (weather['probability'] == '-') else '{}% '.format(weather['probability'])
+            self.weather_line_1 = '{} {}°C RH:{}%'.format(condition, weather['temp_C'], weather['humidity'])
+            self.weather_line_2 = '{} {}mm'.format(wind, precipitation)
+
+        self.weather_icon = self.weather_icon_for_condition(condition)
+
+        # Time and icon are part of the static layer
+        self.invalidate_static_layers('weather')
+
+    def draw_weather_view(self, tick=0):
+        """ Generates frame of time and weather state for provided tick """
+        # if (tick % 2 == 0):
+        #     time_string = '{}'.format(time)
+        # else:
+        #     time_string = '{}'.format(time).replace(':',' ')
+
+        def compose():
+            self.draw_text((30, self.font_offset),
+                           self.time_string,
+                           font=self.half_font)
+            self.draw_text((0, self.icon_font_offset), '{}'.format(self.weather_icon),
+                           font=self.half_icon_font)
+
+        self.start_from_static_layer('weather', compose)
+
+        self.draw_marquee('weather_line_1',
+                          (0, self.font_offset + self.half_font_size),
+                          self.weather_line_1,
+                          font=self.small_font)
+        self.draw_marquee('weather_line_2',
+                          (0, self.font_offset + self.half_font_size + self.small_font_size),
+                          self.weather_line_2,
+                          font=self.small_font)
+
+    def history_graph_box(self, row):
+        """ Returns (x, y, columns, height) of the graph in half row, right of its label """
+        progressbar_width = 1
+        x = 3 * self.small_font_size + 2
+        return (x, row * self.half_font_size, self.width - progressbar_width - 2 - x, self.half_font_size - 1)
+
+    def update_history_view(self):
+        """ Reduces the per-minute history to the bar heights of the graphs """
+        metric_history = self.stat_grabber.get_metric_history()
+        self.history_columns = {}
+        self.history_values = {}
+        for row, (metric, label) in enumerate(HISTORY_GRAPHS):
+            values = metric_history.values(metric)
+            x, y, columns, height = self.history_graph_box(row)
+            self.history_columns[metric] = column_heights(values, columns, height).tolist()
+            self.history_values[metric] = '{:.0f}'.format(values[-1]) if len(values) else '--'
+
+    def draw_history_view(self):
+        """ Generates frame of the metric history, graphs are drawn as one mask """
+        def compose():
+            for row, (metric, label) in enumerate(HISTORY_GRAPHS):
+                self.draw_text((0, self.font_offset + row * self.half_font_size),
+                               label,
+                               font=self.small_font)
+
+        self.start_from_static_layer('history', compose)
+
+        mask = np.zeros((self.height, self.width), dtype=bool)
+        for row, (metric, label) in enumerate(HISTORY_GRAPHS):
+            self.draw_text((0, self.font_offset + row * self.half_font_size + self.small_font_size),
+                           self.history_values.get(metric, '--'),
+                           font=self.small_font)
+
+            heights = self.history_columns.get(metric, [])
+            x, y, columns, height = self.history_graph_box(row)
+            # Newest column at the right edge of the graph
+            x += columns - len(heights)
+            mask[y:y + height, x:x + len(heights)] = bar_graph(heights, height)
+
+        self.canvas.blit(mask, 0, 0)
+
+    def update_query_view(self):
+        """ Reduces the hourly query counts to the bar heights of the graphs, both
+        scaled to the busiest hour """
+        query_history = self.stat_grabber.get_query_history()
+        self.query_columns = {}
+        self.query_values = {}
+        if not query_history:
+            return
+
+        counts = {'blocked': np.array([blocked for _, blocked, _ in query_history], dtype=np.float32),
+                  'queries': np.array([blocked + allowed for _, blocked, allowed in query_history], dtype=np.float32)}
+        maximum = max(1.0, float(counts['queries'].max()))
+        for row, (name, label) in enumerate(QUERY_GRAPHS):
+            x, y, columns, height = self.history_graph_box(row)
+            self.query_columns[name] = column_heights(counts[name], len(query_history), height, maximum).tolist()
+            self.query_values[name] = short_count(counts[name].sum())
+
+    def draw_query_view(self):
+        """ Generates frame of the hourly queries of the last day, one bar per hour """
+        def compose():
+            for row, (name, label) in enumerate(QUERY_GRAPHS):
+                self.draw_text((0, self.font_offset + row * self.half_font_size),
+                               label,
+                               font=self.small_font)
+
+        self.start_from_static_layer('queries', compose)
+
+        mask = np.zeros((self.height, self.width), dtype=bool)
+        for row, (name, label) in enumerate(QUERY_GRAPHS):
+            self.draw_text((0, self.font_offset + row * self.half_font_size + self.small_font_size),
+                           self.query_values.get(name, '--'),
+                           font=self.small_font)
+
+            heights = self.query_columns.get(name, [])
+            if not heights:
+                continue
+            x, y, columns, height = self.history_graph_box(row)
+            # Hours as bars of equal width with a blank column between them, newest at the right edge
+            bar_width = max(1, columns // len(heights))
+            bars = np.repeat(bar_graph(heights, height), bar_width, axis=1)
+            if bar_width > 1:
+                bars[:, bar_width - 1::bar_width] = False
+            x += columns - bars.shape[1]
+            mask[y:y + height, x:x + bars.shape[1]] = bars
+
+        self.canvas.blit(mask, 0, 0)
+
+    def draw_state_progress(self, progress):
+        """ Draws the vertical bar indicating the time until the next state swap """
+        progressbar_width = 1
+        # size = self.width*progress
+        v_size = self.height*progress
+        # self.draw.rectangle((0, 0, size, progressbar_width), outline=1, fill=255)
+        # self.draw.rectangle((0, self.height-progressbar_width, size, self.height), outline=1, fill=255)
+        self.canvas.fill_rect(self.width-progressbar_width,
+                              self.height-v_size,
+                              self.width,
+                              self.height)
 
     def weather_icon_for_condition(self, condition):
         """ Returns weather icon for condition """
@@ -619,53 +821,174 @@ class Display(Observer, threading.Thread):
 
     def change_mode(self, mode: MODE):
         self.current_mode = mode
+        self.scheduler.wake()
 
-    def run(self):
-        """ Display main loop with config and state machine """
+    def stop(self):
+        """ Ends the main loop, even if it currently idles """
+        self.should_run = False
+        self.scheduler.wake()
+
+    def screen_name(self):
+        """ Returns the name of the screen currently shown, used to group frame metrics """
+        if self.current_mode is MODE.CYCLE:
+            return SCREENS[self.current_state]
+        return self.current_mode.name.lower()
+
+    def is_scrolling(self, text, font):
+        """ Returns True if text is too wide and gets scrolled by its marquee """
+        return self.text_cache.text_width(text, font) > self.width - 3
+
+    def target_fps(self, swap_threshold):
+        """ Returns the frame rate the current screen needs. Scrolling and
+        animated screens run at max_fps, static cycle screens only as often as
+        the swap progress bar grows by a pixel and CLEAR does not render at all """
+        if self.current_mode is MODE.CYCLE:
+            if self.current_state == 1:
+                scrolling = (self.is_scrolling(self.weather_line_1, self.small_font) or
+                             self.is_scrolling(self.weather_line_2, self.small_font))
+            elif self.current_state == 2:
+                scrolling = (self.is_scrolling('Blocked today:', self.small_font) or
+                             self.is_scrolling('({}/{}'.format(self.ph_q_blocked, self.ph_q_total), self.small_font))
+            elif self.current_state == 3:
+                scrolling = self.is_scrolling(self.ph_top_client, self.half_font)
+            else:
+                scrolling = False
+
+            if scrolling:
+                return self.max_fps
+            return min(self.max_fps, max(1, self.height / swap_threshold))
+
+        elif self.current_mode in (MODE.INTRO, MODE.PROGRESS):
+            return self.max_fps
+        elif self.current_mode is MODE.CONNECTION:
+            # Messages are updated in place every few seconds
+            return 2
+        elif self.current_mode in (MODE.WARNING, MODE.MESSAGE):
+            return 1
+
+        # MODE.CLEAR
+        return 0
 
-        self.should_run = True
+    def enter_screen(self, state):
+        """ Read the latest collector results _once_ when the state is swapped.
+        Heavy load tasks belong into the collectors of stat_grabber """
+        self.screen_started_at = self.frame_time
 
-        # Delay inbetween loop calls
-        delay = 1.0/self.max_fps
+        if state == 1:
+            # time state
+            self.update_weather_view()
 
-        # Config
+        elif state == 2:
+            # pihole stats
+            self.update_pihole_stats()
 
-        # time in seconds after which the next screen will be shown
-        swap_threshold = 10
-        screen_count = 4
-        progressbar_width = 1
+        elif state == 4:
+            # metric history
+            self.update_history_view()
+
+        elif state == 5:
+            # hourly queries
+            self.update_query_view()
+
+    def render_frame(self, tick, progress):
+        """ Draws the frame of the current mode onto self.canvas. progress is
+        the fraction of the swap threshold the current cycle screen was shown """
+        # Clear Screen. Cycle screens start from their static layer instead
+        if self.current_mode is not MODE.CYCLE:
+            self.clear_display()
+
+        if self.current_mode is MODE.CYCLE:
+            # State handling
+            if self.current_state == 1:
+                self.draw_weather_view(tick=tick)
+
+            elif self.current_state == 2:
+                # Blocked Stats
+                self.draw_blocked_stats(tick=tick)
 
-        # Calculated configuration
-        step_size = self.width/self.max_fps/swap_threshold
+            elif self.current_state == 3:
+                # Client Stats
+                self.draw_client_stats(tick=tick)
+
+            elif self.current_state == 4:
+                # Metric History
+                self.draw_history_view()
+
+            elif self.current_state == 5:
+                # Hourly Queries
+                self.draw_query_view()
+
+            else:
+                # System Stats
+                self.draw_system_stats()
+
+            # Draw State Progress
+            self.draw_state_progress(progress)
+
+        elif self.current_mode is MODE.INTRO:
+            self.draw_intro_view(tick=tick)
+        elif self.current_mode is MODE.CLEAR:
+            pass
+        elif self.current_mode is MODE.PROGRESS:
+            self.draw_progress_view(tick=tick)
+        elif self.current_mode is MODE.WARNING:
+            pass
+        elif self.current_mode is MODE.CONNECTION:
+            self.draw_connection_view(tick=tick)
+
+    ##
+    # Recording
+    # Everything render_frame() depends on, besides fonts and assets
+    def render_inputs(self, tick, progress):
+        """ Returns the inputs of the next render_frame() call as JSON compatible dict """
+        inputs = {'mode': self.current_mode.name,
+                  'tick': tick,
+                  'progress': progress}
+        for attribute in RENDER_INPUT_ATTRIBUTES:
+            inputs[attribute] = getattr(self, attribute)
+        return inputs
+
+    def apply_render_inputs(self, inputs):
+        """ Restores recorded inputs, see render_inputs(). Returns (tick, progress) """
+        if (inputs['time_string'] != self.time_string or
+                inputs['weather_icon'] != self.weather_icon):
+            # Time and icon are part of the static layer
+            self.invalidate_static_layers('weather')
+
+        self.current_mode = MODE[inputs['mode']]
+        for attribute in RENDER_INPUT_ATTRIBUTES:
+            setattr(self, attribute, inputs[attribute])
+        return (inputs['tick'], inputs['progress'])
+
+    def run(self):
+        """ Display main loop with config and state machine """
+
+        self.should_run = True
+        self.stat_grabber.start_collectors()
 
         self.update_pihole_stats()
 
         ##
         # State 1
-        time_string = self.stat_grabber.get_time()
-        weather_line_1 = ''
-        weather_line_2 = ''
-        weather_icon = ''
+        self.time_string = self.stat_grabber.get_time()
 
         ##
         # Helper
         last_swap_time = time.time()
-        self.current_state = 0
+        self.frame_time = time.monotonic()
+        playlist_position = 0
+        self.current_state = self.playlist[playlist_position]
+        self.enter_screen(self.current_state)
         tick = 0
 
         while self.should_run:
             ##
             # House Keeping
 
-            # load config
-            # config = self.config_for_mode(self.current_mode)
-
             # time in seconds after which the next screen will be shown
-            # swap_threshold = config['durations_for_state'][self.current_state]
-
-            # Clear Screen
-            self.clear_display()
+            swap_threshold = self.config.screen_duration(SCREENS[self.current_state])
 
+            self.frame_time = time.monotonic()
             now = time.time()
             time_delta = now - last_swap_time
 
@@ -681,112 +1004,44 @@ class Display(Observer, threading.Thread):
                 ##
                 # State cycle
                 if should_swap:
-                    self.current_state = (self.current_state + 1) % screen_count
-
-                    ##
-                    # Put heavy load tasks here. These get executed _once_ when the state is swapped
-                    if self.current_state == 0:
-                        # pihole stats state
-                        self.stat_grabber.refresh_pihole_stats()
-
-                    elif self.current_state == 1:
-                        # time state
-
-                        time_string = self.stat_grabber.get_time()
-                        weather = self.stat_grabber.get_weather()
-                        if (weather['connection'] is not True):
-                            weather_line_1 = 'Weather service'
-                            weather_line_2 = 'unreachable'
-                            condition = 'error'
-
-                        else:
-                            condition = weather['weatherDesc'][0]['value']
-                            # Round precipitation
-                            precipitation = round(float(weather['precipMM'][:-2]))
-                            wind = '{} {}km/h'.format(weather['winddir16Point'], weather['windspeedKmph'])
-                            pressure = '{}hPa'.format(weather['pressure'])
-                            # probability = '' if (weather['probability'] == '-') else '{}% '.format(weather['probability'])
-                            weather_line_1 = '{} {}°C RH:{}%'.format(condition, weather['temp_C'], weather['humidity'])
-                            weather_line_2 = '{} {}mm'.format(wind, precipitation)
-
-                        weather_icon = self.weather_icon_for_condition(condition)
-
-                    elif self.current_state == 2:
-                        # pihole stats
-                        self.update_pihole_stats()
-
-                # State handling
-                if self.current_state == 1:
-                    # if (tick % 2 == 0):
-                    #     time_string = '{}'.format(time)
-                    # else:
-                    #     time_string = '{}'.format(time).replace(':',' ')
-
-                    wl1_h_offset = self.get_horizontal_offset(text=weather_line_1,
-                                                              font=self.small_font,
-                                                              tick=tick)
-                    wl2_h_offset = self.get_horizontal_offset(text=weather_line_2,
-                                                              font=self.small_font,
-                                                              tick=tick)
-
-                    self.draw.text((30, self.font_offset),
-                                   time_string,
-                                   font=self.half_font,
-                                   fill=255)
-                    self.draw.text((0, self.icon_font_offset), '{}'.format(weather_icon),
-                                   font=self.half_icon_font,
-                                   fill=255)
-                    self.draw.text((wl1_h_offset, self.font_offset + self.half_font_size),
-                                   weather_line_1,
-                                   font=self.small_font,
-                                   fill=255)
-                    self.draw.text((wl2_h_offset, self.font_offset + self.half_font_size + self.small_font_size),
-                                   weather_line_2,
-                                   font=self.small_font,
-                                   fill=255)
-
-                elif self.current_state == 2:
-                    # Blocked Stats
-                    self.draw_blocked_stats(tick=tick)
-
-                elif self.current_state == 3:
-                    # Client Stats
-                    self.draw_client_stats(tick=tick)
-
-                else:
-                    # System Stats
-                    self.draw_system_stats()
-
-                # Draw State Progress
-                progress = time_delta / swap_threshold
-                # size = self.width*progress
-                v_size = self.height*progress
-                # self.draw.rectangle((0, 0, size, progressbar_width), outline=1, fill=255)
-                # self.draw.rectangle((0, self.height-progressbar_width, size, self.height), outline=1, fill=255)
-                self.draw.rectangle((self.width-progressbar_width,
-                                        self.height-v_size,
-                                        self.width,
-                                        self.height),
-                                    outline=1,
-                                    fill=255)
-
-            elif self.current_mode is MODE.INTRO:
-                self.draw_intro_view(tick=tick)
-            elif self.current_mode is MODE.CLEAR:
-                pass
-            elif self.current_mode is MODE.PROGRESS:
-                self.draw_progress_view(tick=tick)
-            elif self.current_mode is MODE.WARNING:
-                pass
-            elif self.current_mode is MODE.CONNECTION:
-                self.draw_connection_view(tick=tick)
-
-            # Display image.
-            self.display.image(self.image)
-            self.display.show()
-            time.sleep(delay)
+                    playlist_position = (playlist_position + 1) % len(self.playlist)
+                    self.current_state = self.playlist[playlist_position]
+                    collect_started = time.perf_counter()
+                    self.enter_screen(self.current_state)
+                    self.metrics.add('collect', time.perf_counter() - collect_started)
+
+            progress = time_delta / swap_threshold
+            inputs = None
+            if self.recorder is not None:
+                inputs = self.render_inputs(tick, progress)
+
+            draw_started = time.perf_counter()
+            self.render_frame(tick, progress)
+            self.metrics.add('draw', time.perf_counter() - draw_started)
+
+            if inputs is not None:
+                # System stats are read while drawing
+                inputs['cpu_load'] = self.cpu_load
+                inputs['memory_percentage'] = self.memory_percentage
+                self.recorder.record(self.image, inputs)
+
+            # Display frame, the canvas already is in page layout
+            self.backend.show(self.canvas)
+            self.metrics.add('convert', self.backend.last_convert_time)
+            self.metrics.add('transfer', self.backend.last_transfer_time)
+
+            screen = self.screen_name()
+            target_fps = self.target_fps(swap_threshold)
+            self.scheduler.wait_for_next_frame(target_fps)
+            if target_fps > 0:
+                self.metrics.add('overshoot', self.scheduler.last_overshoot)
+            self.metrics.add_frame(screen, self.scheduler.last_missed_periods)
 
             ##
             # Post Loop House Keeping
             tick = (tick + 1) % self.max_fps
 
+        self.stat_grabber.stop_collectors()
+        if self.recorder is not None:
+            self.recorder.close()
+
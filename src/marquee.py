@@ -0,0 +1,103 @@
+#
+#  marquee.py
+#  pihole-display
+#
+#  Scrolling text lines. The text is rendered once into an over-wide strip
+#  and every frame blits a viewport window of it onto the PageCanvas. The
+#  scroll position depends on the elapsed time only, not on the frame count.
+#
+
+import time
+import numpy as np
+from PIL import Image
+
+##
+# Scroll modes
+# MARQUEE_PAUSE: Pause at the start, scroll to the end, pause, start over
+# MARQUEE_WRAP: Scroll continuously, the text follows itself after a gap
+MARQUEE_PAUSE = 'pause'
+MARQUEE_WRAP = 'wrap'
+
+
+class Marquee():
+    """ A line of text that scrolls through a viewport if it does not fit """
+
+    def __init__(self, text, font, viewport_width, text_cache,
+                 mode=MARQUEE_PAUSE, speed=24, pause=1.5, gap=24, clock=time.monotonic):
+        self.text = text
+        self.font = font
+        self.viewport_width = viewport_width
+        self.mode = mode
+        # Pixels per second
+        self.speed = speed
+        # Seconds spent at each end in MARQUEE_PAUSE mode
+        self.pause = pause
+        # Pixels between the end of the text and its next repetition in MARQUEE_WRAP mode
+        self.gap = gap
+        self.clock = clock
+        self.started_at = clock()
+
+        bitmap, (left, top) = text_cache.render(text, font)
+        self.text_width = text_cache.text_width(text, font)
+        self.top = top
+
+        # Same threshold the layouts used before, some glyphs end in empty columns
+        self.scrolling = self.text_width > viewport_width - 3
+
+        ##
+        # Render the strip once per text
+        if not self.scrolling:
+            self.strip = Image.new('1', (max(left + bitmap.size[0], 1), bitmap.size[1]))
+            self.strip.paste(bitmap, (left, 0))
+        elif mode == MARQUEE_WRAP:
+            self.period = self.text_width + gap
+            self.strip = Image.new('1', (self.period + viewport_width, bitmap.size[1]))
+            x = 0
+            while x < self.strip.size[0]:
+                self.strip.paste(bitmap, (x + left, 0))
+                x += self.period
+        elif mode == MARQUEE_PAUSE:
+            self.travel = max(0, self.text_width - viewport_width)
+            self.strip = Image.new('1', (max(self.text_width, left + bitmap.size[0]), bitmap.size[1]))
+            self.strip.paste(bitmap, (left, 0))
+        else:
+            raise ValueError('Unknown marquee mode: {}'.format(mode))
+
+        # Viewports are slices of the strip pixels, no copy per frame
+        self.pixels = np.asarray(self.strip, dtype=bool)
+
+    def restart(self):
+        """ Scrolls back to the start of the text """
+        self.started_at = self.clock()
+
+    def offset(self, now=None):
+        """ Returns the horizontal strip position of the viewport at time now """
+        if not self.scrolling:
+            return 0
+
+        if now is None:
+            now = self.clock()
+        elapsed = max(0, now - self.started_at)
+
+        if self.mode == MARQUEE_WRAP:
+            return int(elapsed * self.speed) % self.period
+
+        scroll_time = self.travel / self.speed
+        phase = elapsed % (2 * self.pause + scroll_time)
+        if phase < self.pause:
+            return 0
+        if phase < self.pause + scroll_time:
+            return int((phase - self.pause) * self.speed)
+        return self.travel
+
+    def viewport(self, now=None):
+        """ Returns the pixels of the strip that are visible at time now """
+        if not self.scrolling:
+            return self.pixels
+
+        offset = self.offset(now)
+        return self.pixels[:, offset:offset + self.viewport_width]
+
+    def draw(self, canvas, position, now=None):
+        """ ORs the visible part of the text into canvas at position (text origin) """
+        canvas.blit(self.viewport(now), int(position[0]), int(position[1]) + self.top)
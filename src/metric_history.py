@@ -0,0 +1,129 @@
+#
+#  metric_history.py
+#  pihole-display
+#
+#  Trends of the system and Pi-hole stats in fixed-capacity ring buffers.
+#  Samples are stored as float32 in preallocated arrays at several
+#  resolutions (minutes, 10 minutes, hours), so memory is allocated once
+#  and does not grow with the uptime.
+#
+
+import math
+import time
+import array
+import threading
+import numpy as np
+
+##
+# (seconds per sample, capacity): 24 hours per minute, 7 days per 10 minutes, 30 days per hour
+RESOLUTIONS = [(60, 24 * 60), (600, 7 * 24 * 6), (3600, 30 * 24)]
+
+# Percentages and the count of DNS queries today
+METRICS = ['cpu', 'memory', 'blocked_percentage', 'queries']
+
+
+class RingBuffer():
+    """ Fixed-capacity float32 ring buffer on a preallocated array """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.samples = array.array('f', bytes(4 * capacity))
+        self.head = 0
+        self.count = 0
+
+    def append(self, value):
+        self.samples[self.head] = value
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def values(self):
+        """ Returns the samples as numpy array, oldest first (a copy) """
+        samples = np.frombuffer(self.samples, dtype=np.float32)
+        if self.count < self.capacity:
+            return samples[:self.count].copy()
+        return np.concatenate((samples[self.head:], samples[:self.head]))
+
+    def nbytes(self):
+        return self.samples.itemsize * self.capacity
+
+
+class Downsampler():
+    """ Averages the values added during a step into one sample of a ring buffer """
+
+    def __init__(self, step, capacity):
+        self.step = step
+        self.buffer = RingBuffer(capacity)
+        self.bucket = None
+        self.total = 0.0
+        self.count = 0
+
+    def add(self, value, now):
+        bucket = int(now // self.step)
+        if self.bucket is not None and bucket != self.bucket:
+            self.flush()
+        self.bucket = bucket
+        self.total += value
+        self.count += 1
+
+    def flush(self):
+        if self.count:
+            self.buffer.append(self.total / self.count)
+        self.total = 0.0
+        self.count = 0
+
+
+class MetricHistory():
+    """ Ring buffers of every metric at every resolution """
+
+    def __init__(self, metrics=METRICS, resolutions=RESOLUTIONS, clock=time.time):
+        self.clock = clock
+        self.resolutions = resolutions
+        self.series = {metric: [Downsampler(step, capacity) for step, capacity in resolutions]
+                       for metric in metrics}
+
+        # Fed by a collector thread, read on screen swaps
+        self.lock = threading.Lock()
+
+    def add(self, values, now=None):
+        """ Adds a sample of every metric in values (metric: number), None or NaN is skipped """
+        if now is None:
+            now = self.clock()
+        with self.lock:
+            for metric, value in values.items():
+                if value is None or math.isnan(value):
+                    continue
+                for downsampler in self.series[metric]:
+                    downsampler.add(float(value), now)
+
+    def values(self, metric, resolution=0):
+        """ Returns the completed samples of metric at resolution (index into RESOLUTIONS), oldest first """
+        with self.lock:
+            return self.series[metric][resolution].buffer.values()
+
+    def nbytes(self):
+        """ Returns the memory of all sample arrays, fixed at construction """
+        return sum(downsampler.buffer.nbytes() for downsamplers in self.series.values()
+                   for downsampler in downsamplers)
+
+
+def column_heights(values, columns, height, maximum=100.0):
+    """ Reduces values to at most columns bar heights (0 - height) in one
+    vectorized pass, newest column last. Each column shows the maximum of the
+    samples it covers, so short spikes stay visible """
+    if len(values) == 0 or columns <= 0:
+        return np.zeros(0, dtype=np.int32)
+
+    per_column = max(1, math.ceil(len(values) / columns))
+    # Pad at the front, the newest sample ends the last column
+    padding = (-len(values)) % per_column
+    padded = np.concatenate((np.zeros(padding, dtype=np.float32), values))
+    peaks = padded.reshape(-1, per_column).max(axis=1)
+
+    scaled = np.clip(peaks / maximum, 0.0, 1.0) * height
+    return np.ceil(scaled).astype(np.int32)
+
+
+def bar_graph(heights, height):
+    """ Returns a (height, len(heights)) bool mask of bars growing from the bottom """
+    rows = np.arange(height, 0, -1, dtype=np.int32)[:, None]
+    return rows <= np.asarray(heights, dtype=np.int32)[None, :]
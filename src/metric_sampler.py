@@ -0,0 +1,89 @@
+#
+#  metric_sampler.py
+#  pihole-display
+#
+#  Caches cheap, frequently drawn system readings (CPU, memory). Every metric
+#  is read at most once per its own interval and optionally smoothed with an
+#  exponentially weighted moving average, so renderers drawing at 30 fps read
+#  a cached value instead of issuing syscalls per frame.
+#
+
+import time
+import threading
+import psutil
+
+
+class SampledMetric():
+    """ A reading function, its sampling interval and the latest (smoothed) value """
+
+    def __init__(self, name, read, interval, alpha, default):
+        self.name = name
+        self.read = read
+        self.interval = interval
+        # Weight of a new sample, 1.0 keeps the raw reading
+        self.alpha = alpha
+
+        # Served until the first reading succeeds
+        self.value = default
+        self.sampled_at = None
+
+        # Statistics
+        self.sample_count = 0
+        self.error_count = 0
+
+    def is_due(self, now):
+        return self.sampled_at is None or now - self.sampled_at >= self.interval
+
+    def sample(self, now):
+        try:
+            reading = float(self.read())
+        except (OSError, ValueError, psutil.Error) as exc:
+            # Keep serving the last value, retry after the interval
+            print('Metric {} failed: {}'.format(self.name, exc))
+            self.error_count += 1
+            self.sampled_at = now
+            return
+
+        if self.sample_count == 0:
+            self.value = reading
+        else:
+            self.value += self.alpha * (reading - self.value)
+        self.sampled_at = now
+        self.sample_count += 1
+
+
+class MetricSampler():
+    """ Samples registered metrics lazily on read, each at its own rate """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.metrics = {}
+        # Read by the render threads of all displays and by the collectors
+        self.lock = threading.Lock()
+
+    def register(self, name, read, interval, alpha=1.0, default=0.0):
+        with self.lock:
+            self.metrics[name] = SampledMetric(name, read, interval, alpha, default)
+
+    def get(self, name):
+        """ Returns the value of metric name, sampled again if its interval passed """
+        now = self.clock()
+        with self.lock:
+            metric = self.metrics[name]
+            if metric.is_due(now):
+                metric.sample(now)
+            return metric.value
+
+    def get_status(self):
+        """ Returns value, age and counters of every metric """
+        now = self.clock()
+        status = {}
+        with self.lock:
+            for name, metric in self.metrics.items():
+                age = None if metric.sampled_at is None else now - metric.sampled_at
+                status[name] = {'value': metric.value,
+                                'age': age,
+                                'interval': metric.interval,
+                                'samples': metric.sample_count,
+                                'errors': metric.error_count}
+        return status
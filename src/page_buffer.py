@@ -0,0 +1,117 @@
+#
+#  page_buffer.py
+#  pihole-display
+#
+#  Helpers for the SSD1306 page buffer: Every page is a horizontal stripe of
+#  8 pixel rows, stored as one byte per column (LSB = top row).
+#
+
+import numpy as np
+
+##
+# SSD1306 commands used to restrict a transfer to a window
+SET_COL_ADDR = 0x21
+SET_PAGE_ADDR = 0x22
+
+##
+# I2C control byte preceding display data (Co=0, D/C#=1)
+DATA_CONTROL_BYTE = 0x40
+
+##
+# Setting a column and page window costs six commands with two bytes each,
+# the data transfer adds one control byte
+WINDOW_OVERHEAD_BYTES = 6 * 2 + 1
+
+
+def changed_columns_for_page(previous, current, page, width):
+    """ Returns (first, last) changed column of page or None if it is unchanged """
+    start = page * width
+    end = start + width
+
+    if previous[start:end] == current[start:end]:
+        return None
+
+    first = 0
+    while previous[start + first] == current[start + first]:
+        first += 1
+
+    last = width - 1
+    while previous[start + last] == current[start + last]:
+        last -= 1
+
+    return (first, last)
+
+
+def window_cost(windows):
+    """ Returns the number of bytes needed to transfer the provided windows """
+    cost = 0
+    for page_start, page_end, col_start, col_end in windows:
+        data_bytes = (page_end - page_start + 1) * (col_end - col_start + 1)
+        cost += WINDOW_OVERHEAD_BYTES + data_bytes
+    return cost
+
+
+def dirty_windows(previous, current, width, pages):
+    """ Compares two page buffers and returns the windows that have to be sent
+    as list of (page_start, page_end, col_start, col_end) tuples.
+
+    Returns a single full-screen window if there is no previous buffer and an
+    empty list if nothing changed. Changed pages are either sent as individual
+    windows or merged into one bounding window, whichever is cheaper on the bus. """
+
+    if previous is None or len(previous) != len(current):
+        return [(0, pages - 1, 0, width - 1)]
+
+    page_windows = []
+    for page in range(pages):
+        columns = changed_columns_for_page(previous, current, page, width)
+        if columns is not None:
+            page_windows.append((page, page, columns[0], columns[1]))
+
+    if len(page_windows) <= 1:
+        return page_windows
+
+    bounding_window = [(page_windows[0][0],
+                        page_windows[-1][1],
+                        min(window[2] for window in page_windows),
+                        max(window[3] for window in page_windows))]
+
+    if window_cost(bounding_window) <= window_cost(page_windows):
+        return bounding_window
+
+    return page_windows
+
+
+def window_payload(buffer, window, width):
+    """ Returns the bytes of the page buffer covered by window in the order the
+    controller expects them in horizontal addressing mode """
+    page_start, page_end, col_start, col_end = window
+    payload = bytearray()
+    for page in range(page_start, page_end + 1):
+        offset = page * width
+        payload += buffer[offset + col_start:offset + col_end + 1]
+    return bytes(payload)
+
+
+def pixels_to_pages(pixels, y_shift=0):
+    """ Packs a boolean (height, width) pixel array into page bytes. The pixels
+    are moved down by y_shift rows (0-7) first, as needed for unaligned blits """
+    height, width = pixels.shape
+    page_count = (y_shift + height + 7) // 8
+
+    padded = np.zeros((page_count * 8, width), dtype=np.uint8)
+    padded[y_shift:y_shift + height] = pixels
+    return np.packbits(padded.reshape(page_count, 8, width), axis=1, bitorder='little')[:, 0, :]
+
+
+def pages_to_pixels(pages):
+    """ Unpacks page bytes into a boolean (height, width) pixel array """
+    page_count, width = pages.shape
+    bits = np.unpackbits(pages[:, np.newaxis, :], axis=1, bitorder='little')
+    return bits.reshape(page_count * 8, width).astype(bool)
+
+
+def image_to_page_buffer(image, width, pages):
+    """ Converts a mode '1' image into the SSD1306 page layout """
+    packed = pixels_to_pages(np.asarray(image, dtype=bool))
+    return packed[:pages, :width].tobytes()
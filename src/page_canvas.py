@@ -0,0 +1,172 @@
+#
+#  page_canvas.py
+#  pihole-display
+#
+#  1-bit canvas stored in SSD1306 page layout: one byte per column and page,
+#  LSB = top row of the page. All primitives are vectorized with NumPy, the
+#  canvas bytes can be handed to the display driver without conversion.
+#  PIL only rasterizes glyphs and pre-rendered graphics, which are blitted.
+#
+
+import numpy as np
+from PIL import Image
+
+from page_buffer import pixels_to_pages, pages_to_pixels
+
+
+class PageCanvas():
+    """ Packed 1-bit canvas in SSD1306 page layout """
+
+    def __init__(self, width=128, height=32):
+        self.width = width
+        self.height = height
+        self.page_count = height // 8
+        self.pages = np.zeros((self.page_count, width), dtype=np.uint8)
+        # (y_0, y_1) -> per-page bit masks, see row_masks()
+        self.masks = {}
+
+    @classmethod
+    def from_image(cls, image):
+        """ Returns a canvas containing the mode '1' image """
+        canvas = cls(image.size[0], image.size[1])
+        canvas.load_image(image)
+        return canvas
+
+    def clear(self, fill=0):
+        self.pages.fill(0xFF if fill else 0)
+
+    def load_image(self, image):
+        """ Replaces the canvas content with a mode '1' image of the same size """
+        self.pages[:] = pixels_to_pages(np.asarray(image, dtype=bool))
+
+    def to_image(self):
+        """ Returns the canvas content as mode '1' image """
+        return Image.fromarray(pages_to_pixels(self.pages))
+
+    def tobytes(self):
+        """ Returns the canvas in the byte order of the SSD1306 RAM """
+        return self.pages.tobytes()
+
+    def row_masks(self, y_0, y_1):
+        """ Returns the first page and a column vector of per-page bit masks
+        covering the rows y_0 to y_1 (inclusive) """
+        masks = self.masks.get((y_0, y_1))
+        if masks is None:
+            first_page = y_0 >> 3
+            last_page = y_1 >> 3
+            masks = np.full((last_page - first_page + 1, 1), 0xFF, dtype=np.uint8)
+            masks[0] &= (0xFF << (y_0 & 7)) & 0xFF
+            masks[-1] &= 0xFF >> (7 - (y_1 & 7))
+            # Views fill the same rows every frame
+            self.masks[(y_0, y_1)] = masks
+        return y_0 >> 3, masks
+
+    def clip(self, x_0, y_0, x_1, y_1):
+        """ Orders and clips a rectangle to the canvas. Returns None if it is outside """
+        x_0, x_1 = sorted((int(x_0), int(x_1)))
+        y_0, y_1 = sorted((int(y_0), int(y_1)))
+        x_0 = max(x_0, 0)
+        y_0 = max(y_0, 0)
+        x_1 = min(x_1, self.width - 1)
+        y_1 = min(y_1, self.height - 1)
+
+        if x_0 > x_1 or y_0 > y_1:
+            return None
+        return (x_0, y_0, x_1, y_1)
+
+    def fill_rect(self, x_0, y_0, x_1, y_1, color=1):
+        """ Fills the rectangle between both corners (inclusive) """
+        rect = self.clip(x_0, y_0, x_1, y_1)
+        if rect is None:
+            return
+        x_0, y_0, x_1, y_1 = rect
+
+        first_page, masks = self.row_masks(y_0, y_1)
+        window = self.pages[first_page:first_page + len(masks), x_0:x_1 + 1]
+        if color:
+            window |= masks
+        else:
+            window &= ~masks
+
+    def hline(self, x_0, x_1, y, color=1):
+        self.fill_rect(x_0, y, x_1, y, color)
+
+    def vline(self, x, y_0, y_1, color=1):
+        self.fill_rect(x, y_0, x, y_1, color)
+
+    def rect(self, x_0, y_0, x_1, y_1, color=1):
+        """ Draws the outline of a rectangle """
+        self.hline(x_0, x_1, y_0, color)
+        self.hline(x_0, x_1, y_1, color)
+        self.vline(x_0, y_0, y_1, color)
+        self.vline(x_1, y_0, y_1, color)
+
+    def blit(self, bitmap, x, y):
+        """ ORs a bitmap (mode '1' image or boolean array) into the canvas at x, y.
+        Parts outside of the canvas are clipped """
+        pixels = np.asarray(bitmap, dtype=bool)
+        x = int(x)
+        y = int(y)
+        if x >= self.width or y >= self.height:
+            return
+
+        # Clip source against the canvas
+        source_x = max(0, -x)
+        source_y = max(0, -y)
+        pixels = pixels[source_y:self.height - y, source_x:self.width - x]
+        x += source_x
+        y += source_y
+        if pixels.size == 0:
+            return
+
+        packed = pixels_to_pages(pixels, y_shift=y & 7)
+        first_page = y >> 3
+        page_count = min(len(packed), self.page_count - first_page)
+        self.pages[first_page:first_page + page_count, x:x + packed.shape[1]] |= packed[:page_count]
+
+    def copy_pages(self):
+        """ Returns a copy of the canvas content, see restore_pages() """
+        return self.pages.copy()
+
+    def restore_pages(self, pages):
+        """ Replaces the canvas content with pages of copy_pages() """
+        np.copyto(self.pages, pages)
+
+    def clip_pages(self, pages, x, page):
+        """ Clips pre-packed page bytes placed at column x and page row page to
+        the canvas. Returns the visible part and its target window """
+        pages = pages[max(0, -page):max(0, self.page_count - page), max(0, -x):max(0, self.width - x)]
+        return pages, (max(0, page), max(0, x))
+
+    def paste_pages(self, pages, x, page):
+        """ Replaces the canvas bytes at column x and page row page with
+        pre-packed page bytes. Parts outside of the canvas are clipped """
+        pages, (page, x) = self.clip_pages(pages, x, page)
+        if pages.size:
+            self.pages[page:page + pages.shape[0], x:x + pages.shape[1]] = pages
+
+    def blit_pages(self, pages, x, page):
+        """ ORs pre-packed page bytes into the canvas at column x and page row page.
+        Parts outside of the canvas are clipped """
+        pages, (page, x) = self.clip_pages(pages, x, page)
+        if pages.size:
+            self.pages[page:page + pages.shape[0], x:x + pages.shape[1]] |= pages
+
+    def shift_window(self, x_0, y_0, x_1, y_1, dx):
+        """ Moves the content of a window horizontally by dx pixels. Columns
+        that scroll in are cleared """
+        rect = self.clip(x_0, y_0, x_1, y_1)
+        if rect is None:
+            return
+        x_0, y_0, x_1, y_1 = rect
+
+        first_page, masks = self.row_masks(y_0, y_1)
+        window = self.pages[first_page:first_page + len(masks), x_0:x_1 + 1]
+
+        shifted = np.zeros_like(window)
+        if 0 <= dx < window.shape[1]:
+            shifted[:, dx:] = window[:, :window.shape[1] - dx]
+        elif -window.shape[1] < dx < 0:
+            shifted[:, :dx] = window[:, -dx:]
+
+        window[:] = (window & ~masks) | (shifted & masks)
@@ -0,0 +1,134 @@
+#
+#  proc_metrics.py
+#  pihole-display
+#
+#  System metrics read directly from /proc and syscalls instead of shell
+#  pipelines. Every call is a file read or an ioctl, nothing is spawned.
+#  Linux only, on other platforms the readers raise OSError.
+#
+
+import os
+import math
+import fcntl
+import socket
+import struct
+
+##
+# ioctl returning the IPv4 address of an interface (see linux/sockios.h)
+SIOCGIFADDR = 0x8915
+
+GIB = 1024 ** 3
+
+
+def human_gigabytes(byte_count):
+    """ Rounds like df -h does for values in the GB range: up to one decimal
+    below 10, up to an integer from 10 on """
+    gigabytes = byte_count / GIB
+    if gigabytes < 10:
+        return math.ceil(gigabytes * 10) / 10
+    return math.ceil(gigabytes)
+
+
+class ProcMetrics():
+    """ Reads load, memory, uptime, neighbours, disk usage and interface addresses """
+
+    def __init__(self, proc_root='/proc'):
+        self.proc_root = proc_root
+
+    def read(self, name):
+        with open(os.path.join(self.proc_root, name), 'r', encoding='utf-8') as proc_file:
+            return proc_file.read()
+
+    def arp_entries(self):
+        """ Returns the neighbour table as list of dicts (ip, mac, flags, device) """
+        entries = []
+        # First line is the column header
+        for line in self.read('net/arp').splitlines()[1:]:
+            fields = line.split()
+            if len(fields) < 6:
+                continue
+            entries.append({'ip': fields[0],
+                            'flags': int(fields[2], 16),
+                            'mac': fields[3],
+                            'device': fields[5]})
+        return entries
+
+    def load_average(self):
+        """ Returns the 1, 5 and 15 minute load averages """
+        fields = self.read('loadavg').split()
+        return (float(fields[0]), float(fields[1]), float(fields[2]))
+
+    def uptime(self):
+        """ Returns the seconds since boot """
+        return float(self.read('uptime').split()[0])
+
+    def memory_info(self):
+        """ Returns /proc/meminfo in bytes, keyed by field name """
+        info = {}
+        for line in self.read('meminfo').splitlines():
+            name, _, value = line.partition(':')
+            fields = value.split()
+            if not fields:
+                continue
+            amount = int(fields[0])
+            if len(fields) > 1 and fields[1] == 'kB':
+                amount *= 1024
+            info[name] = amount
+        return info
+
+    def memory_usage(self):
+        """ Returns used and total memory in bytes, used being everything that
+        is not available (same as psutil) """
+        info = self.memory_info()
+        total = info['MemTotal']
+        if 'MemAvailable' in info:
+            available = info['MemAvailable']
+        else:
+            # Kernels before 3.14
+            available = info['MemFree'] + info.get('Buffers', 0) + info.get('Cached', 0)
+        return (total - available, total)
+
+    def memory_percentage(self):
+        used, total = self.memory_usage()
+        return round(used / total * 100, 1)
+
+    def disk_usage(self, path='/'):
+        """ Returns used, total and available bytes of the file system at path,
+        available being the space left to unprivileged users """
+        stat = os.statvfs(path)
+        total = stat.f_blocks * stat.f_frsize
+        used = (stat.f_blocks - stat.f_bfree) * stat.f_frsize
+        available = stat.f_bavail * stat.f_frsize
+        return (used, total, available)
+
+    def disk_percentage(self, path='/'):
+        """ Returns the use percentage as df reports it: relative to used and
+        available space, rounded up """
+        used, _, available = self.disk_usage(path)
+        if used + available == 0:
+            return 0
+        return math.ceil(used * 100 / (used + available))
+
+    def interface_addresses(self):
+        """ Returns the IPv4 addresses of all configured interfaces, keyed by name """
+        addresses = {}
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            for _, name in socket.if_nameindex():
+                request = struct.pack('256s', name.encode('utf-8')[:15])
+                try:
+                    response = fcntl.ioctl(sock.fileno(), SIOCGIFADDR, request)
+                except OSError:
+                    # Interface without IPv4 address
+                    continue
+                addresses[name] = socket.inet_ntoa(response[20:24])
+        finally:
+            sock.close()
+        return addresses
+
+    def local_ip(self):
+        """ Returns the first non-loopback IPv4 address or None """
+        for address in self.interface_addresses().values():
+            if not address.startswith('127.'):
+                return address
+        return None
@@ -0,0 +1,139 @@
+#
+#  query_history.py
+#  pihole-display
+#
+#  Hourly blocked/allowed query counts from the long-term database of
+#  pihole-FTL. The database is opened read-only and every refresh only reads
+#  the rows added since the previous one (by query id). Counts are rolled up
+#  per hour and only the most recent hours are kept, so memory does not grow
+#  with the database.
+#
+
+import time
+import sqlite3
+import threading
+
+from urllib.request import pathname2url
+
+FTL_DATABASE = '/etc/pihole/pihole-FTL.db'
+
+##
+# Query status codes of blocked queries (gravity, regex, blacklist, blocked
+# upstream, blocked during CNAME inspection, database busy, special domain)
+BLOCKED_STATUSES = (1, 4, 5, 6, 7, 8, 9, 10, 11, 15, 16)
+
+HOUR = 3600
+
+
+class QueryHistory():
+    """ Incremental hourly rollups of the FTL query log """
+
+    def __init__(self, database_path=FTL_DATABASE, hours=24, immutable=False, clock=time.time):
+        self.database_path = database_path
+        self.hours = hours
+        # immutable skips all locking, only safe for database copies FTL does not write to
+        self.immutable = immutable
+        self.clock = clock
+
+        self.connection = None
+        self.last_id = None
+
+        # Hour start timestamp -> [blocked, allowed]
+        self.rollups = {}
+        self.lock = threading.Lock()
+
+        # Statistics
+        self.refresh_count = 0
+        self.rows_read = 0
+
+    def connect(self):
+        uri = 'file:{}?mode=ro'.format(pathname2url(self.database_path))
+        if self.immutable:
+            uri += '&immutable=1'
+        self.connection = sqlite3.connect(uri, uri=True, check_same_thread=False)
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def first_id(self, since):
+        """ Returns the id before the first query at or after since, uses the timestamp index """
+        row = self.connection.execute('SELECT MIN(id) FROM queries WHERE timestamp >= ?', (since,)).fetchone()
+        if row[0] is None:
+            row = self.connection.execute('SELECT MAX(id) FROM queries').fetchone()
+            return row[0] or 0
+        return row[0] - 1
+
+    def refresh(self):
+        """ Adds the queries logged since the last refresh and returns the history """
+        try:
+            if self.connection is None:
+                self.connect()
+            rows = self.read_new_rows()
+        except sqlite3.Error:
+            # FTL may have replaced the file, reopen on the next refresh
+            self.close()
+            raise
+
+        with self.lock:
+            for hour, blocked, count in rows:
+                counts = self.rollups.setdefault(hour, [0, 0])
+                counts[0 if blocked else 1] += count
+            self.prune()
+            self.refresh_count += 1
+
+        return self.get_history()
+
+    def read_new_rows(self):
+        """ Returns (hour, blocked, count) groups of the rows after the cursor and advances it """
+        oldest_hour = self.current_hour() - (self.hours - 1) * HOUR
+        if self.last_id is None:
+            self.last_id = self.first_id(oldest_hour)
+
+        # Upper bound first, rows FTL inserts meanwhile are read by the next refresh
+        last_id = self.connection.execute('SELECT MAX(id) FROM queries').fetchone()[0]
+        if last_id is None or last_id <= self.last_id:
+            if last_id is None or last_id < self.last_id:
+                # Database was flushed or replaced, start over on the next refresh
+                self.last_id = None
+                self.rollups = {}
+            return []
+
+        placeholders = ','.join('?' * len(BLOCKED_STATUSES))
+        query = ('SELECT timestamp / {hour} * {hour} AS hour, status IN ({statuses}) AS blocked, COUNT(*) '
+                 'FROM queries WHERE id > ? AND id <= ? AND timestamp >= ? '
+                 'GROUP BY hour, blocked').format(hour=HOUR, statuses=placeholders)
+        rows = self.connection.execute(query, BLOCKED_STATUSES + (self.last_id, last_id, oldest_hour)).fetchall()
+
+        # Rows outside the window are skipped, but the cursor moves past them
+        self.last_id = last_id
+        self.rows_read += sum(count for _, _, count in rows)
+        return rows
+
+    def current_hour(self):
+        return int(self.clock()) // HOUR * HOUR
+
+    def prune(self):
+        oldest_hour = self.current_hour() - (self.hours - 1) * HOUR
+        for hour in [hour for hour in self.rollups if hour < oldest_hour]:
+            del self.rollups[hour]
+
+    def get_history(self):
+        """ Returns (hour start, blocked, allowed) of the last hours, oldest first,
+        hours without queries included """
+        current_hour = self.current_hour()
+        with self.lock:
+            history = []
+            for index in range(self.hours - 1, -1, -1):
+                hour = current_hour - index * HOUR
+                blocked, allowed = self.rollups.get(hour, (0, 0))
+                history.append((hour, blocked, allowed))
+        return history
+
+    def get_stats(self):
+        with self.lock:
+            return {'refreshes': self.refresh_count,
+                    'rows_read': self.rows_read,
+                    'last_id': self.last_id,
+                    'hours': len(self.rollups)}
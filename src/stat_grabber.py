@@ -7,67 +7,248 @@
 #
 
 
+import os
 import time
+import threading
 import subprocess
-import requests
 import psutil
 import json
+import socket
 
 from datetime import datetime
 
 from network import NetworkManager
-
-class StatGrabber():
-
-    def __init__(self):
+from observer import Observer, Subject
+from config import read_config
+from collector_pool import CollectorPool
+from metric_sampler import MetricSampler
+from proc_metrics import ProcMetrics, human_gigabytes
+from ftl_client import FTLError, default_client
+from query_history import QueryHistory
+from metric_history import MetricHistory
+from client_index import ClientIndex
+from chronometer_parser import parse_chronometer, MISSING
+from weather_cache import WeatherCache
+from weather_client import WeatherClient, WeatherError
+
+##
+# Installed pihole versions (core, web, FTL), written by the pihole updater
+PIHOLE_LOCAL_VERSIONS = '/etc/pihole/localversions'
+
+##
+# Collector deadlines in seconds, see CollectorPool
+PIHOLE_DEADLINE = 20
+WEATHER_DEADLINE = 30
+QUERY_HISTORY_DEADLINE = 60
+METRIC_HISTORY_DEADLINE = 10
+
+##
+# Shell command timeouts. The pihole collector may run pihole -c -e and arp -a
+# in a row, both together give up before its deadline
+PIHOLE_COMMAND_TIMEOUT = PIHOLE_DEADLINE / 2
+COMMAND_TIMEOUT = PIHOLE_DEADLINE / 4
+
+class StatGrabber(Observer):
+
+    def __init__(self, config=None):
         self.encoding = 'utf-8'
         self.stats = {}
+        # Fields of the stats holding a fallback value (field: 'missing' or 'invalid')
+        self.stats_report = {}
 
-        self.weather = {'connection': False}
-        self.last_weather_check = time.time() - 9999
-        self.load_weather()
+        # Replaced as a whole when the config file changes, see update()
+        if config is None:
+            config = read_config()
+        self.config = config
 
         self.network_manager = NetworkManager.get_instance()
+        self.proc_metrics = ProcMetrics()
+        self.ftl_client = default_client()
+        self.query_history = QueryHistory()
+        self.client_index = ClientIndex(config.known_clients_path)
+        self.metric_history = MetricHistory()
+
+        ##
+        # The last good weather survives restarts, it is served until it needs revalidation
+        self.weather_cache = WeatherCache(os.path.join(config.cache_path, 'weather.json'))
+        self.weather_cache.load()
+        self.weather = self.weather_cache.get() or {'connection': False}
+        self.weather_client = WeatherClient()
+        self.last_weather_check = time.time() - 9999
 
-    # Shell scripts for system monitoring from here:
+        ##
+        # Slow collectors run in the background, see start_collectors()
+        self.collector_pool = CollectorPool()
+        intervals = config.collector_intervals
+        self.collector_pool.register('pihole', self.refresh_pihole_stats,
+                                     interval=intervals['pihole'], deadline=PIHOLE_DEADLINE)
+        self.collector_pool.register('weather', self.load_weather,
+                                     interval=intervals['weather'], deadline=WEATHER_DEADLINE)
+        self.collector_pool.register('query_history', self.query_history.refresh,
+                                     interval=intervals['query_history'], deadline=QUERY_HISTORY_DEADLINE)
+        self.collector_pool.register('metric_history', self.sample_metric_history,
+                                     interval=intervals['metric_history'], deadline=METRIC_HISTORY_DEADLINE)
+
+        ##
+        # Cheap readings drawn every frame are sampled at their own rate, see get_cpu_load()
+        self.metric_sampler = MetricSampler()
+        # CPU load over one second windows, smoothed over a few seconds
+        self.metric_sampler.register('cpu', self.read_cpu_load, interval=1, alpha=0.3)
+        self.metric_sampler.register('memory', self.read_memory_percentage, interval=2)
+        # psutil measures the CPU load since its previous call, this starts the first window
+        psutil.cpu_percent()
+
+        # Displays sharing this grabber, the collectors run while any of them does
+        self.collector_users = 0
+        self.collector_users_lock = threading.Lock()
+
+    ##
+    # Observer Interface
+    def update(self, subject: Subject) -> None:
+        """ Applies the reloaded config of a ConfigWatcher. Paths other than
+        the location take effect after a restart """
+        config = subject.config
+        for name, interval in config.collector_intervals.items():
+            if interval != self.config.collector_intervals[name]:
+                self.collector_pool.set_interval(name, interval)
+
+        location_changed = config.location != self.config.location
+        self.config = config
+        if location_changed:
+            # Cached weather belongs to the previous location
+            self.weather_cache.fetched_at = None
+            self.collector_pool.refresh('weather')
+
+    def start_collectors(self):
+        """ Starts refreshing pihole stats and weather in the background """
+        with self.collector_users_lock:
+            self.collector_users += 1
+            if self.collector_users == 1:
+                self.collector_pool.start()
+
+    def stop_collectors(self):
+        """ Stops the collectors once the last display sharing them stopped """
+        with self.collector_users_lock:
+            self.collector_users = max(0, self.collector_users - 1)
+            if self.collector_users == 0:
+                self.collector_pool.stop()
+
+    def is_stale(self, collector_name):
+        """ Returns True if the collector has no recent result, e.g. because it hangs """
+        return self.collector_pool.is_stale(collector_name)
+
+    def get_collector_status(self):
+        return self.collector_pool.get_status()
+
+    def get_metric_status(self):
+        """ Returns value, age and sample count of the sampled metrics """
+        return self.metric_sampler.get_status()
+
+    def run_command(self, cmd, timeout=COMMAND_TIMEOUT):
+        """ Returns the decoded output of a shell command. Raises
+        subprocess.TimeoutExpired if it takes longer than timeout seconds and
+        subprocess.CalledProcessError if it fails """
+        return subprocess.check_output(cmd, shell=True, timeout=timeout).decode(self.encoding)
+
+    ##
+    # System metrics are read from /proc and syscalls (see proc_metrics.py).
+    # Where those are not available (e.g. macOS), the shell scripts from here are used:
     # https://unix.stackexchange.com/questions/119126/command-to-display-memory-usage-disk-usage-and-cpu-load
     def get_local_ip(self):
-        cmd = "hostname -I | cut -d' ' -f1"
-        return subprocess.check_output(cmd, shell=True).decode(self.encoding)
+        try:
+            local_ip = self.proc_metrics.local_ip()
+        except OSError:
+            local_ip = None
+
+        if local_ip is None:
+            cmd = "hostname -I | cut -d' ' -f1"
+            try:
+                local_ip = self.run_command(cmd).strip()
+            except (subprocess.TimeoutExpired, subprocess.CalledProcessError) as exc:
+                print(exc)
+                local_ip = None
+        return local_ip
 
     def get_active_network_device_count(self):
         # TODO: If the arp table is not flushed from time to time, this implementation
         # will yield inaccurate results
         # ip -s -s neigh flush all
         # A different solution is probably the way to go
-        cmd = "sudo arp -a | wc -l"
-        active_device_count_string = subprocess.check_output(cmd, shell=True).decode(self.encoding)
-
         try:
-            active_device_count = int(active_device_count_string)-1
+            # Same count as the shell script, one line of arp -a per table entry minus one
+            active_device_count = max(0, len(self.proc_metrics.arp_entries()) - 1)
+        except OSError:
+            cmd = "sudo arp -a | wc -l"
+            try:
+                active_device_count = int(self.run_command(cmd))-1
 
-        except ValueError:
-            active_device_count = 0
+            except (subprocess.TimeoutExpired, subprocess.CalledProcessError) as exc:
+                print(exc)
+                active_device_count = 0
+
+            except ValueError:
+                active_device_count = 0
 
         self.stats['active_device_count'] = active_device_count
         return active_device_count
 
-    def get_cpu_load(self):
+    def read_cpu_load(self):
         return psutil.cpu_percent()
 
+    def get_cpu_load(self):
+        """ Returns the smoothed CPU load in percent, sampled once per second """
+        return self.metric_sampler.get('cpu')
+
+    def get_load_average(self):
+        """ Returns the 1, 5 and 15 minute load averages """
+        try:
+            return self.proc_metrics.load_average()
+        except OSError:
+            return os.getloadavg()
+
+    def get_uptime(self):
+        """ Returns the seconds since boot """
+        try:
+            return self.proc_metrics.uptime()
+        except OSError:
+            return time.time() - psutil.boot_time()
+
+    def read_memory_percentage(self):
+        try:
+            return self.proc_metrics.memory_percentage()
+        except OSError:
+            return psutil.virtual_memory().percent
+
     def get_memory_percentage(self):
-        return psutil.virtual_memory().percent
+        """ Returns the used memory in percent, sampled every two seconds """
+        return self.metric_sampler.get('memory')
 
     def get_memory_ratio(self):
         # REFACTOR: Rename since ratio implies factor
-        mem_dict = dict(psutil.virtual_memory()._asdict())
-        used = mem_dict['used']/1024/1024        # used memory in MB
-        total = mem_dict['total']/1024/1024      # total memory in MB
+        try:
+            used, total = self.proc_metrics.memory_usage()
+        except OSError:
+            mem_dict = dict(psutil.virtual_memory()._asdict())
+            used, total = mem_dict['used'], mem_dict['total']
+        used = used/1024/1024                    # used memory in MB
+        total = total/1024/1024                  # total memory in MB
         return (round(used, 1), round(total, 1)) # tuple rounded to first decimal
 
     def get_disk_space(self):
-        cmd = 'df -h | awk \'$NF=="/"{printf "%d/%d GB  %s", $3,$2,$5}\''
-        return subprocess.check_output(cmd, shell=True).decode(self.encoding)
+        try:
+            used, total, _ = self.proc_metrics.disk_usage('/')
+        except OSError:
+            cmd = 'df -h | awk \'$NF=="/"{printf "%d/%d GB  %s", $3,$2,$5}\''
+            try:
+                return self.run_command(cmd)
+            except (subprocess.TimeoutExpired, subprocess.CalledProcessError) as exc:
+                print(exc)
+                return ''
+
+        # Formatted like the df -h output printed with %d
+        return '%d/%d GB  %d%%' % (human_gigabytes(used),
+                                   human_gigabytes(total),
+                                   self.proc_metrics.disk_percentage('/'))
 
     def get_time(self):
         now = datetime.now()
@@ -76,18 +257,17 @@ class StatGrabber():
         return current_time
 
     def check_replace_known_client(self, client_id):
-        try:
-            with open('./known_clients', 'r', encoding='utf-8') as known_clients_file:
-                for line in known_clients_file:
-                    client_list = line.split()
-                    if (client_id == client_list[0]):
-                        return ' '.join(client_list[1:])
-        except IOError as e:
-            print(e)
-
-        return client_id
+        """ Returns the name of the client from known_clients or Pi-hole's host
+        files, client_id if there is none """
+        return self.client_index.resolve(client_id)
 
     def refresh_pihole_stats(self):
+        """ Refreshes and returns pihole stats. Blocks for the duration of the
+        FTL requests (or shell commands, if FTL is not reachable), therefore
+        run as background collector """
+        # Names and leases are only parsed again if one of their files changed
+        self.client_index.reload_if_changed()
+
         # if self.network_manager.api_available:
         ##
         # TODO:
@@ -168,217 +348,150 @@ class StatGrabber():
             # self.stats = stats
             pass
         else:
-            self.refresh_pihole_stats_no_api_access()
-
-
-
-    def refresh_pihole_stats_no_api_access(self):
-        stats = {'api': True}
-        cmd = "pihole -c -e"
-        stat_string = subprocess.check_output(cmd, shell=True).decode(self.encoding)
-        # print(stat_string)
-        raw_stat_list = stat_string.split()
-
-        try:
-            stats['version_core'] = raw_stat_list[raw_stat_list.index('Core:')+1]
-        except (ValueError, IndexError) as exc:
-            print(exc)
-            stats['version_core'] = ''
-
-        try:
-            stats['version_web'] = raw_stat_list[raw_stat_list.index('Web:')+1]
-        except (ValueError, IndexError) as exc:
-            print(exc)
-            stats['version_web'] = ''
-
-        try:
-            stats['version_ftl'] = raw_stat_list[raw_stat_list.index('FTL:')+1]
-        except (ValueError, IndexError) as exc:
-            print(exc)
-            stats['version_ftl'] = ''
+            try:
+                self.refresh_pihole_stats_from_ftl()
+            except FTLError as exc:
+                # FTL not running or too old for its API, ask the pihole script
+                print(exc)
+                self.refresh_pihole_stats_no_api_access()
+        return self.stats
 
+    def read_pihole_versions(self):
+        """ Returns the installed core and web versions, as listed by pihole -v """
         try:
-            stats['hostname'] = raw_stat_list[raw_stat_list.index('Hostname:')+1]
-        except (ValueError, IndexError) as exc:
+            with open(PIHOLE_LOCAL_VERSIONS, 'r', encoding='utf-8') as versions_file:
+                versions = versions_file.read().split()
+        except IOError as exc:
             print(exc)
-            stats['hostname'] = ''
+            versions = []
+        return (versions + ['', ''])[:2]
 
-        try:
-            stats['uptime'] = raw_stat_list[raw_stat_list.index('Uptime:')+1]
-        except (ValueError, IndexError) as exc:
-            print(exc)
-            stats['uptime'] = ''
+    def refresh_pihole_stats_from_ftl(self):
+        """ Reads the stats from the pihole-FTL API, one round trip per command
+        over a connection that stays open """
+        ftl_stats = self.ftl_client.stats()
+        ftl_version = self.ftl_client.version()
+        top_clients = self.ftl_client.top_clients(1)
 
-        try:
-            stats['status'] = raw_stat_list[raw_stat_list.index('Pi-hole:')+1]
-        except (ValueError, IndexError) as exc:
-            print(exc)
-            stats['status'] = ''
+        stats = {'api': True}
+        stats['version_core'], stats['version_web'] = self.read_pihole_versions()
+        stats['version_ftl'] = str(ftl_version.get('version', ''))
+        stats['hostname'] = socket.gethostname()
+
+        stats['uptime'] = int(self.get_uptime())
+
+        # Same fields and types as parsed from pihole -c -e
+        stats['status'] = 'Active' if ftl_stats.get('status') == 'enabled' else 'Offline'
+        stats['known_client_count'] = self.client_index.get_lease_count()
+        stats['today_percentage'] = float(ftl_stats.get('ads_percentage_today', 0))
+        report = {}
+        if 'ads_percentage_today' not in ftl_stats:
+            report['today_percentage'] = MISSING
+        stats['blocking'] = int(ftl_stats.get('domains_being_blocked', 0))
+        stats['ratio'] = (int(ftl_stats['ads_blocked_today']), int(ftl_stats['dns_queries_today']))
+
+        if top_clients:
+            top_client = top_clients[0]['name'] or top_clients[0]['ip']
+            stats['topclient'] = self.check_replace_known_client(top_client)
+        else:
+            stats['topclient'] = ''
 
-        try:
-            stats['known_client_count'] = raw_stat_list[raw_stat_list.index('(Leased:')+1]
-        except (ValueError, IndexError) as exc:
-            print(exc)
-            stats['known_client_count'] = ''
+        stats['active_device_count'] = self.get_active_network_device_count()
 
-        try:
-            stats['today_percentage'] = raw_stat_list[raw_stat_list.index('Today:')+1][:-1]
-        except (ValueError, IndexError) as exc:
-            print(exc)
-            stats['today_percentage'] = ''
+        # Publish complete stats at once, the render thread may read them any time.
+        # The report first, the metric history checks it for the published stats
+        self.stats_report = report
+        self.stats = stats
 
-        try:
-            stats['blocking'] = raw_stat_list[raw_stat_list.index('(Blocking:')+1]
-        except (ValueError, IndexError) as exc:
-            stats['blocking'] = ''
-            print(exc)
 
-        try:
-            stats['ratio'] = (raw_stat_list[raw_stat_list.index('(Total:')+1],
-                              raw_stat_list[raw_stat_list.index('(Total:')+3])
-        except (ValueError, IndexError) as exc:
-            stats['ratio'] = ''
-            print(exc)
 
+    def refresh_pihole_stats_no_api_access(self):
+        cmd = "pihole -c -e"
         try:
-            stats['topclient'] = self.check_replace_known_client(raw_stat_list[raw_stat_list.index('Client:')+1])
-        except (ValueError, IndexError) as exc:
-            stats['topclient'] = ''
+            stat_string = self.run_command(cmd, timeout=PIHOLE_COMMAND_TIMEOUT)
+        except (subprocess.TimeoutExpired, subprocess.CalledProcessError) as exc:
+            # Keep the last stats, the collector retries on its next run
             print(exc)
+            return
 
+        stats, report = parse_chronometer(stat_string)
+        if report:
+            print('pihole -c -e: {}'.format(', '.join('{} {}'.format(field, problem)
+                                                      for field, problem in sorted(report.items()))))
+
+        stats['api'] = True
+        stats['topclient'] = self.check_replace_known_client(stats['topclient'])
+        # Count of the "(Leased:" token. It is missing (0) if Pi-hole's DHCP
+        # server is off, then the leases file is counted instead
+        stats['known_client_count'] = (stats.pop('leased_client_count') or
+                                       self.client_index.get_lease_count())
+        stats['active_device_count'] = self.get_active_network_device_count()
+
+        # Publish complete stats at once, the render thread may read them any time.
+        # The report first, the metric history checks it for the published stats
+        self.stats_report = report
         self.stats = stats
-        self.get_active_network_device_count()
 
     def get_pihole_stats(self):
         return self.stats
 
+    def get_query_history(self):
+        """ Returns (hour start, blocked, allowed) of the last 24 hours, refreshed by the query_history collector """
+        return self.collector_pool.get_result('query_history') or []
+
+    def sample_metric_history(self):
+        """ Adds the current cpu and memory percentages and the Pi-hole stats of
+        today to the metric history. Stats holding a fallback value are skipped """
+        stats = self.stats
+        report = self.stats_report
+        ratio = stats.get('ratio')
+
+        self.metric_history.add({'cpu': self.get_cpu_load(),
+                                 'memory': self.get_memory_percentage(),
+                                 'blocked_percentage': (None if 'today_percentage' in report
+                                                        else stats.get('today_percentage')),
+                                 'queries': None if ratio is None or 'ratio' in report else ratio[1]})
+
+    def get_metric_history(self):
+        return self.metric_history
+
     def get_weather(self):
-        # every 5 minutes, or whenever last query was unsuccessful
-        if (time.time() - self.last_weather_check >= 300) or not self.weather['connection']:
-            self.load_weather()
+        """ Returns the most recently loaded weather, refreshed by the weather collector """
         return self.weather
 
     def load_weather_for_location(self, location):
-        """ Loads complete weather data as json input """
-
-        url = 'https://wttr.in/{}?format={}'.format(location, 'j1')
-
+        """ Loads the current weather in the lean wttr.in format """
         try:
-            response = requests.get(url)
-        except ConnectionError as exc:
+            weather = self.weather_client.load(location)
+        except WeatherError as exc:
             print(exc)
-            response = None
-            self.weather['connection'] = False
+            self.use_cached_weather()
+            return
 
-        ##
-        # TODO: Inelegant solution. This is a hotfix
-        if response is not None:
-            try:
-                ##
-                # Note to myself: response.text is not a function, while response.json() is
-                complete_weather_dict = response.json()
-                current_condition = complete_weather_dict['current_condition']
-                # nearest_area = complete_weather_dict['nearest_area']
-                # request =  complete_weather_dict['request']
-
-                # weather =  complete_weather_dict['weather']
-                # hourly = weather[0]['hourly']
-
-                ##
-                # current_condition
-                # 'FeelsLikeC': '19',
-                # 'FeelsLikeF': '66',
-                # 'cloudcover': '0',
-                # 'humidity': '100',
-                # 'localObsDateTime': '2020-09-01 08:47 PM',
-                # 'observation_time': '01:47 AM',
-                # 'precipMM': '1.2',
-                # 'pressure': '998',
-                # 'temp_C': '19',
-                # 'temp_F': '66',
-                # 'uvIndex': '4',
-                # 'visibility': '16',
-                # 'weatherCode': '113',
-                # 'weatherDesc': [{'value': 'Sunny'}],
-                # 'weatherIconUrl': [{'value': ''}],
-                # 'winddir16Point': 'W',
-                # 'winddirDegree': '280',
-                # 'windspeedKmph': '17',
-                # 'windspeedMiles': '11'
-
-                self.weather = current_condition[0]
-            except ValueError as exc:
-                # JSONDecodeError, which is used by simplejson, is a subclass of ValueError
-                print(exc)
-                self.weather['connection'] = False
-            else:
-                # if no exception
-                self.weather['connection'] = True
+        self.weather_cache.store(weather)
+        weather['connection'] = True
+
+        # Publish complete weather at once, the render thread may read it any time
+        self.weather = weather
+
+    def use_cached_weather(self):
+        """ Falls back to the last good weather after a failed refresh """
+        self.weather = self.weather_cache.get() or {'connection': False}
 
     def load_weather(self):
-        ##
-        # TODO: Temporary workaround for uncaught weather exception
-        # if the connection is down. Line 267 requests.exceptions.ConnectionError:
-        # max retries exceeded caused by NewConnectionError
-        if not self.network_manager.check_internet_connection():
-            self.weather['connection'] = False
-            return
+        """ Loads and returns the weather for the configured location. Blocks
+        for the duration of the HTTP request, therefore run as background collector """
+        if self.weather_cache.is_fresh():
+            # Loaded from the cache at startup or by a recent refresh
+            return self.weather
+
+        if self.weather_client.is_backing_off():
+            # Offline, the client waits longer after every failed attempt
+            self.use_cached_weather()
+            return self.weather
 
         self.last_weather_check = time.time()
 
-        ##
-        # REFACTOR
-        HARD_CODED_BASE_PATH = '/home/pi/pihole-display'
-        location = ""
-        with open('{}/location'.format(HARD_CODED_BASE_PATH), 'r', encoding='utf-8') as location_file:
-            ##
-            # TODO: Fix this sh*t u lzy bstrd
-            for line in location_file:
-                location = line.replace('\n', '').replace(' ', '+')
-                break
-
-        self.load_weather_for_location(location)
-
-    def replace_arrows_in_string(self, s):
-        """ Fix missing arrow chars from weather service in font PressStart2P """
-
-        default_leftwards_arrow = b'\xE2\x86\x90'.decode()
-        default_upwards_arrow = b'\xE2\x86\x91'.decode()
-        default_downwards_arrow = b'\xE2\x86\x93'.decode()
-        default_rightwards_arrow = b'\xE2\x86\x92'.decode()
-        default_northwest_arrow = b'\xE2\x86\x96'.decode()
-        default_northeast_arrow = b'\xE2\x86\x97'.decode()
-        default_southwest_arrow = b'\xE2\x86\x99'.decode()
-        default_southeast_arrow = b'\xE2\x86\x98'.decode()
-
-        fixed_leftwards_arrow = b'\xE2\x86\x90'.decode()
-        fixed_upwards_arrow = b'\xE2\x86\x91'.decode()
-        fixed_downwards_arrow = b'\xE2\x86\x93'.decode()
-        fixed_rightwards_arrow = b'\xE2\x86\x92'.decode()
-        fixed_northwest_arrow = b'\xE2\x86\x91\xE2\x86\x90'.decode()
-        fixed_northeast_arrow = b'\xE2\x86\x91\xE2\x86\x92'.decode()
-        fixed_southwest_arrow = b'\xE2\x86\x93\xE2\x86\x90'.decode()
-        fixed_southeast_arrow = b'\xE2\x86\x93\xE2\x86\x92'.decode()
-
-        default_arrows = [default_leftwards_arrow,
-                          default_upwards_arrow,
-                          default_downwards_arrow,
-                          default_rightwards_arrow,
-                          default_northwest_arrow,
-                          default_northeast_arrow,
-                          default_southwest_arrow,
-                          default_southeast_arrow]
-
-        fixed_arrows = [fixed_leftwards_arrow,
-                        fixed_upwards_arrow,
-                        fixed_downwards_arrow,
-                        fixed_rightwards_arrow,
-                        fixed_northwest_arrow,
-                        fixed_northeast_arrow,
-                        fixed_southwest_arrow,
-                        fixed_southeast_arrow]
-
-        for idx, _ in enumerate(default_arrows):
-            s = s.replace(default_arrows[idx], fixed_arrows[idx])
-
-        return s
+        # Read once with the config, not on every load
+        self.load_weather_for_location(self.config.location)
+        return self.weather
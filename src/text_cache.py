@@ -0,0 +1,113 @@
+#
+#  text_cache.py
+#  pihole-display
+#
+#  Bounded LRU cache of pre-rendered 1-bit text bitmaps and text widths.
+#  Bitmaps are also kept packed in SSD1306 page layout for the PageCanvas.
+#
+
+from collections import OrderedDict
+import numpy as np
+from PIL import Image, ImageDraw
+
+from page_buffer import pixels_to_pages
+
+
+class TextCache():
+    """ Rasterizes (text, font) pairs once and hands out the cached bitmaps """
+
+    def __init__(self, capacity=128):
+        self.capacity = capacity
+        self.bitmaps = OrderedDict()
+        self.widths = OrderedDict()
+        self.pages = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def text_bbox(self, text, font):
+        """ Returns the bounding box (left, top, right, bottom) of text relative to the draw origin """
+        if hasattr(font, 'getbbox'):
+            return font.getbbox(text)
+
+        # Pillow < 8 only provides the size
+        width, height = font.getsize(text)
+        return (0, 0, width, height)
+
+    def lookup(self, cache, key):
+        """ Returns cached value for key and refreshes its position, None on miss """
+        value = cache.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        cache.move_to_end(key)
+        return value
+
+    def store(self, cache, key, value):
+        """ Inserts value and evicts the least recently used entries """
+        cache[key] = value
+        while len(cache) > self.capacity:
+            cache.popitem(last=False)
+
+    def render(self, text, font):
+        """ Returns (bitmap, offset) where offset is the position of the bitmap
+        relative to the point the text would have been drawn at """
+        key = (text, font)
+        entry = self.lookup(self.bitmaps, key)
+        if entry is not None:
+            return entry
+
+        if hasattr(font, 'render_text'):
+            # Glyph atlases blit pre-rasterized glyphs
+            entry = font.render_text(text)
+        else:
+            left, top, right, bottom = self.text_bbox(text, font)
+            bitmap = Image.new('1', (max(right - left, 1), max(bottom - top, 1)))
+            ImageDraw.Draw(bitmap).text((-left, -top), text, font=font, fill=255)
+            entry = (bitmap, (left, top))
+
+        self.store(self.bitmaps, key, entry)
+        return entry
+
+    def render_pages(self, text, font, y):
+        """ Returns (pages, offset) of text drawn at row y, packed into page
+        bytes. The first page holds the row y + offset[1], offset is the same
+        as of render() """
+        key = (text, font, y & 7)
+        entry = self.lookup(self.pages, key)
+        if entry is not None:
+            return entry
+
+        bitmap, offset = self.render(text, font)
+        pixels = np.asarray(bitmap, dtype=bool)
+        entry = (pixels_to_pages(pixels, y_shift=(y + offset[1]) & 7), offset)
+        self.store(self.pages, key, entry)
+        return entry
+
+    def text_width(self, text, font):
+        """ Returns the rendered width of text in pixels """
+        key = (text, font)
+        width = self.lookup(self.widths, key)
+        if width is not None:
+            return width
+
+        width = self.text_bbox(text, font)[2]
+        self.store(self.widths, key, width)
+        return width
+
+    def clear(self):
+        """ Drops all cached entries, e.g. after fonts changed """
+        self.bitmaps.clear()
+        self.widths.clear()
+        self.pages.clear()
+
+    def get_stats(self):
+        """ Returns hit/miss counters and current fill level """
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'bitmaps': len(self.bitmaps),
+                'widths': len(self.widths),
+                'pages': len(self.pages),
+                'capacity': self.capacity}
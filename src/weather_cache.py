@@ -0,0 +1,86 @@
+#
+#  weather_cache.py
+#  pihole-display
+#
+#  Keeps the last successfully loaded weather on disk together with the time
+#  it was fetched. After a restart the cached weather is shown right away and
+#  only fetched again once it is older than its TTL. While a refresh fails,
+#  the last good weather keeps being served until it is too old to be useful.
+#
+
+import os
+import json
+import time
+import tempfile
+
+WEATHER_TTL = 15 * 60
+WEATHER_MAX_AGE = 6 * 60 * 60
+
+
+class WeatherCache():
+    """ Last good weather, persisted as JSON """
+
+    def __init__(self, path, ttl=WEATHER_TTL, max_age=WEATHER_MAX_AGE, clock=time.time):
+        self.path = path
+        self.ttl = ttl
+        self.max_age = max_age
+        self.clock = clock
+
+        self.weather = None
+        self.fetched_at = None
+
+    def load(self):
+        """ Reads the cache file, returns True if it held weather """
+        try:
+            with open(self.path, 'r', encoding='utf-8') as cache_file:
+                cached = json.load(cache_file)
+            weather = cached['weather']
+            fetched_at = float(cached['fetched_at'])
+        except FileNotFoundError:
+            # Nothing cached yet
+            return False
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            print(exc)
+            return False
+
+        self.weather = weather
+        self.fetched_at = fetched_at
+        return True
+
+    def store(self, weather):
+        """ Remembers weather as fetched now and writes it atomically to disk """
+        self.weather = weather
+        self.fetched_at = self.clock()
+
+        directory = os.path.dirname(self.path)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            file_descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(file_descriptor, 'w', encoding='utf-8') as cache_file:
+                json.dump({'fetched_at': self.fetched_at, 'weather': weather}, cache_file)
+            os.replace(temporary_path, self.path)
+        except OSError as exc:
+            # Serving from memory still works
+            print(exc)
+
+    def age(self):
+        """ Returns the seconds since the cached weather was fetched, None if there is none """
+        if self.fetched_at is None:
+            return None
+        return max(0.0, self.clock() - self.fetched_at)
+
+    def is_fresh(self):
+        """ Fresh weather does not need to be fetched again """
+        age = self.age()
+        return age is not None and age < self.ttl
+
+    def is_usable(self):
+        """ Stale weather is still shown while it is not older than max_age """
+        age = self.age()
+        return age is not None and age < self.max_age
+
+    def get(self):
+        """ Returns the cached weather marked as connected, None if unusable """
+        if not self.is_usable():
+            return None
+        return dict(self.weather, connection=True)
@@ -0,0 +1,175 @@
+#
+#  weather_client.py
+#  pihole-display
+#
+#  Asynchronous wttr.in client. Requests go through one pooled keep-alive
+#  session with connect and read timeouts and ask for compressed responses
+#  in a one-line format that carries only what the weather view draws.
+#  While requests fail, further attempts back off exponentially with jitter.
+#
+
+import time
+import random
+import asyncio
+import threading
+import concurrent.futures
+import aiohttp
+
+from urllib.parse import quote
+
+WTTR_URL = 'https://wttr.in/{location}'
+
+##
+# Condition, temperature, humidity, wind, precipitation, pressure
+# e.g. "Partly cloudy|+19°C|81%|↙17km/h|1.2mm|998hPa"
+LEAN_FORMAT = '%C|%t|%h|%w|%p|%P'
+
+##
+# wttr.in draws the direction the wind blows to, keys are the direction it comes from
+WIND_ARROWS = {'↓': 'N', '↙': 'NE', '←': 'E', '↖': 'SE',
+               '↑': 'S', '↗': 'SW', '→': 'W', '↘': 'NW'}
+
+BACKOFF_BASE = 30
+BACKOFF_MAX = 30 * 60
+
+
+class WeatherError(Exception):
+    """ Weather could not be loaded """
+    pass
+
+
+def strip_unit(value, unit):
+    if not value.endswith(unit):
+        raise ValueError('Expected {} in {}'.format(unit, value))
+    return value[:-len(unit)]
+
+
+def parse_lean_weather(text):
+    """ Returns the lean format as dict with the keys of the wttr.in j1
+    current_condition the weather view uses """
+    fields = text.strip().split('|')
+    if len(fields) != 6:
+        raise ValueError('Unexpected weather: {}'.format(text[:80]))
+    condition, temperature, humidity, wind, precipitation, pressure = (field.strip() for field in fields)
+
+    wind_direction = WIND_ARROWS.get(wind[:1], '')
+    if wind_direction:
+        wind = wind[1:]
+
+    return {'weatherDesc': [{'value': condition}],
+            'temp_C': strip_unit(temperature, '°C').lstrip('+'),
+            'humidity': strip_unit(humidity, '%'),
+            'winddir16Point': wind_direction,
+            'windspeedKmph': strip_unit(wind, 'km/h'),
+            'precipMM': precipitation,
+            'pressure': strip_unit(pressure, 'hPa')}
+
+
+class WeatherClient():
+    """ Loads the current weather of a location from wttr.in """
+
+    def __init__(self, url=WTTR_URL, connect_timeout=5, read_timeout=10,
+                 backoff_base=BACKOFF_BASE, backoff_max=BACKOFF_MAX,
+                 clock=time.monotonic, rng=random):
+        self.url = url
+        self.timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout,
+                                             total=connect_timeout + read_timeout)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.clock = clock
+        self.rng = rng
+
+        self.session = None
+        self.failure_count = 0
+        self.next_attempt = 0
+
+        # Event loop of the sync interface, see load()
+        self.loop = None
+        self.loop_thread = None
+        self.loop_lock = threading.Lock()
+
+        # Statistics
+        self.request_count = 0
+
+    def is_backing_off(self):
+        """ Returns True while failed requests ask to wait before the next attempt """
+        return self.clock() < self.next_attempt
+
+    def record_failure(self):
+        """ Doubles the wait before the next attempt, randomized by half to not
+        retry in lock step with other clients """
+        self.failure_count += 1
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (self.failure_count - 1))
+        self.next_attempt = self.clock() + delay * self.rng.uniform(0.5, 1.0)
+
+    def record_success(self):
+        self.failure_count = 0
+        self.next_attempt = 0
+
+    async def get_session(self):
+        if self.session is None or self.session.closed:
+            # Keep-alive connections are reused by every request of the session
+            connector = aiohttp.TCPConnector(limit=2, keepalive_timeout=60)
+            self.session = aiohttp.ClientSession(connector=connector,
+                                                 timeout=self.timeout,
+                                                 headers={'Accept-Encoding': 'gzip, deflate'})
+        return self.session
+
+    async def fetch(self, location):
+        """ Returns the current weather of location, raises WeatherError """
+        if self.is_backing_off():
+            raise WeatherError('Backing off for {:.0f}s'.format(self.next_attempt - self.clock()))
+
+        url = self.url.format(location=quote(location.replace(' ', '+'), safe='+,'))
+        # m: metric units
+        params = {'format': LEAN_FORMAT, 'm': ''}
+
+        self.request_count += 1
+        try:
+            session = await self.get_session()
+            async with session.get(url, params=params) as response:
+                if response.status != 200:
+                    raise WeatherError('{} returned {}'.format(url, response.status))
+                text = await response.text(encoding='utf-8')
+            weather = parse_lean_weather(text)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError, WeatherError) as exc:
+            self.record_failure()
+            if isinstance(exc, WeatherError):
+                raise
+            raise WeatherError('{}: {!r}'.format(url, exc)) from exc
+
+        self.record_success()
+        return weather
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    ##
+    # Sync interface for the collector threads, the session lives on a
+    # private event loop
+    def run(self, coroutine, timeout):
+        with self.loop_lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                self.loop_thread = threading.Thread(target=self.loop.run_forever, name='weather-client', daemon=True)
+                self.loop_thread.start()
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(timeout)
+
+    def load(self, location):
+        """ Blocking fetch(), to be called from a background collector """
+        timeout = self.timeout.total + 1
+        try:
+            return self.run(self.fetch(location), timeout)
+        except concurrent.futures.TimeoutError as exc:
+            raise WeatherError('No weather after {}s'.format(timeout)) from exc
+
+    def shutdown(self):
+        """ Closes the session and stops the event loop of the sync interface """
+        with self.loop_lock:
+            loop = self.loop
+            self.loop = None
+        if loop is not None:
+            asyncio.run_coroutine_threadsafe(self.close(), loop).result(5)
+            loop.call_soon_threadsafe(loop.stop)
@@ -1,8 +1,48 @@
 # conftest.py
 
+import os
+import sys
 import pytest
 import requests
 
+##
+# Modules in src/ import each other by their plain module names
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+class FakeClock():
+    """ Monotonic clock advanced manually """
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    """ Fake clock for the clock argument of schedulers, caches and samplers """
+    return FakeClock()
+
+
+@pytest.fixture(scope='session')
+def cache_config(tmp_path_factory):
+    """ Config whose asset pack and glyph atlases are cached outside of the checkout """
+    from src.config import Config
+    return Config(cache_path=str(tmp_path_factory.mktemp('cache')))
+
+
+@pytest.fixture
+def create_display(cache_config):
+    """ Returns a function creating a display on the virtual backend that
+    renders the stats of the given stat grabber """
+    from src.led_display import Display
+
+    def create(stat_grabber):
+        return Display(backend='virtual', stat_grabber=stat_grabber, config=cache_config)
+    return create
+
+
 @pytest.fixture(autouse=False)
 def disable_network_calls(monkeypatch):
     def stunted_get():
@@ -0,0 +1,148 @@
+#
+#  baseline_draw_chip.py
+#  pihole-display
+#
+#  Display.draw_chip() of led_display.py as it was before the chip animation
+#  existed, kept verbatim (as plain function of the display) so that the
+#  golden frames can be regenerated. See generate.py.
+#
+
+import random
+
+
+def draw_chip(self, pos=(0, 0), percentage=None, tick=0):
+    outer_chip_size = 26
+    inner_chip_size = 12
+    # pin_offset = 3
+    # pin_count = 5
+    pin_offset = 5
+    pin_count = 8
+    pin_length = 3
+    pin_distance = (outer_chip_size - 2*pin_offset)/pin_count
+
+    # debug
+    # self.draw.rectangle((pos[0], pos[1], pos[0]+outer_chip_size+2*pin_length, pos[1]+outer_chip_size+2*pin_length),
+    #                     fill=0,
+    #                     outline=1)
+    # self.draw.line((1, 0, 1, self.height), fill=255, width=1)
+
+
+    outer_square_x = pos[0] + pin_length
+    outer_square_y = pos[1] + pin_length
+    self.draw.rectangle((outer_square_x, outer_square_y, outer_square_x + outer_chip_size, outer_square_y + outer_chip_size),
+                        fill=0,
+                        outline=1)
+
+    square_delta = (outer_chip_size - inner_chip_size)/2
+    inner_square_x = outer_square_x + square_delta
+    inner_square_y = outer_square_y + square_delta
+
+    if percentage is not None:
+        vertical_percentage_offset = outer_square_y + outer_chip_size - percentage*outer_chip_size
+        self.draw.rectangle((outer_square_x, vertical_percentage_offset, outer_square_x + outer_chip_size, outer_square_y + outer_chip_size),
+                            fill=1,
+                            outline=1)
+
+
+    # self.draw.rectangle((outer_square_x, outer_square_y, outer_chip_size, outer_chip_size),
+    #                     fill=0,
+    #                     outline=1)
+
+    self.draw.rectangle((inner_square_x, inner_square_y, inner_square_x + inner_chip_size, inner_square_y + inner_chip_size),
+                        fill=0,
+                        outline=1)
+
+    if vertical_percentage_offset <= inner_square_y + inner_chip_size + 1:
+        self.draw.line((inner_square_x,
+                        max(vertical_percentage_offset, inner_square_y),
+                        inner_square_x,
+                        inner_square_y + inner_chip_size),
+                       fill=0, width=1)
+
+        self.draw.line((inner_square_x + inner_chip_size,
+                        max(vertical_percentage_offset, inner_square_y),
+                        inner_square_x + inner_chip_size,
+                        inner_square_y + inner_chip_size), fill=0, width=1)
+
+        self.draw.rectangle((inner_square_x + 1,
+                             vertical_percentage_offset,
+                             inner_square_x + inner_chip_size - 1,
+                             inner_square_y + inner_chip_size - 1),
+                            fill=1,
+                            outline=1)
+
+        self.draw.line((inner_square_x,
+                        inner_square_y + inner_chip_size,
+                        inner_square_x + inner_chip_size,
+                        inner_square_y + inner_chip_size), fill=0, width=1)
+
+        if vertical_percentage_offset <= inner_square_y + 1:
+            self.draw.line((inner_square_x,
+                            inner_square_y,
+                            inner_square_x + inner_chip_size,
+                            inner_square_y), fill=0, width=1)
+
+    # self.draw.rectangle((inner_square_x, inner_square_y, inner_chip_size, inner_chip_size),
+    #                     fill=0,
+    #                     outline=1)
+
+    for pin_idx in range(0, pin_count):
+        # + 1 seems hacky. I probably messed something up
+        pin_pos_x = outer_square_x + pin_offset + pin_idx*pin_distance + 1
+        pin_pos_y = outer_square_y + pin_offset + pin_idx*pin_distance + 1
+        v_x = pos[0]
+        v_y = pos[1]
+
+        # vertical
+        self.draw.line((pin_pos_x,
+                        v_y,
+                        pin_pos_x,
+                        outer_square_y),
+                       fill=255,
+                       width=1)
+
+        self.draw.line((pin_pos_x,
+                        outer_square_y + outer_chip_size,
+                        pin_pos_x,
+                        1 + outer_square_y + outer_chip_size + pin_length),
+                       fill=255,
+                       width=1)
+
+        # horizontal
+        self.draw.line((v_x,
+                        pin_pos_y,
+                        outer_square_x,
+                        pin_pos_y),
+                       fill=255,
+                       width=1)
+
+        right_outer_border = outer_square_x + outer_chip_size + pin_length
+        self.draw.line((outer_square_x +  outer_chip_size,
+                        pin_pos_y,
+                        right_outer_border,
+                        pin_pos_y),
+                       fill=255,
+                       width=1)
+
+        if percentage is not None and percentage < 1.0:
+        # Animate input...
+        # if tick % 3 == 0:
+            data_pos = right_outer_border + 1
+            line_delta = self.width-data_pos
+            r = random.randint(0,5)
+            if r<=1:
+                # data_pos = right_outer_border + (self.max_fps-tick)
+
+                self.draw.line((data_pos,
+                                pin_pos_y,
+                                data_pos + random.randint(5, line_delta),
+                                pin_pos_y),
+                            fill=255,
+                            width=1)
+
+                # self.draw.line((data_pos,
+                #                 pin_pos_y,
+                #                 self.width,
+                #                 pin_pos_y),
+                #             fill=255,
+                #             width=1)
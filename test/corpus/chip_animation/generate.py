@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+#
+#  generate.py
+#  pihole-display
+#
+#  Renders the chip golden frames with Display.draw_chip() as it was before
+#  the chip animation existed, kept in baseline_draw_chip.py.
+#
+#  Usage: python test/corpus/chip_animation/generate.py
+#
+
+import os
+import json
+import random
+from PIL import Image, ImageDraw
+
+from baseline_draw_chip import draw_chip
+
+BASELINE_SOURCE = 'baseline_draw_chip.py'
+CORPUS_PATH = os.path.dirname(os.path.abspath(__file__))
+
+WIDTH = 128
+HEIGHT = 32
+
+##
+# Sweep name -> (chip position, percentages, start every frame from the seeded display)
+SWEEPS = {'fill-levels': ((0, 0), [step / 500 for step in range(-5, 506)], True),
+          'data-lines': ((0, 0), [step / 89 for step in range(90)], False),
+          'offset': ((2, 1), [step / 40 for step in range(41)], False)}
+
+
+class BaselineDisplay():
+    """ The display attributes draw_chip uses """
+
+    def __init__(self):
+        self.width = WIDTH
+        self.image = Image.new('1', (WIDTH, HEIGHT))
+        self.draw = ImageDraw.Draw(self.image)
+
+
+def render_sweep(draw_chip, pos, percentages, restart):
+    """ Returns the frames of the rendered percentages and the skipped ones.
+    Percentages the baseline cannot draw with the installed Pillow are skipped """
+    # Seeded like Display.__init__()
+    random.seed('denali')
+    frames = []
+    rendered = []
+    skipped = []
+    for percentage in percentages:
+        if restart:
+            random.seed('denali')
+        state = random.getstate()
+        display = BaselineDisplay()
+        try:
+            draw_chip(display, pos=pos, percentage=percentage)
+        except ValueError:
+            # Inverted rectangle, older Pillow versions drew it. The data lines
+            # of the frame are not drawn either
+            random.setstate(state)
+            skipped.append(percentage)
+            continue
+        frames.append(display.image)
+        rendered.append(percentage)
+    return frames, rendered, skipped
+
+
+def main():
+    for name, (pos, percentages, restart) in SWEEPS.items():
+        frames, rendered, skipped = render_sweep(draw_chip, pos, percentages, restart)
+
+        # Frames stacked top to bottom
+        strip = Image.new('1', (WIDTH, HEIGHT * len(frames)))
+        for index, frame in enumerate(frames):
+            strip.paste(frame, (0, index * HEIGHT))
+        strip.save(os.path.join(CORPUS_PATH, name + '.png'), optimize=True)
+
+        with open(os.path.join(CORPUS_PATH, name + '.json'), 'w', encoding='utf-8') as sweep_file:
+            json.dump({'source': BASELINE_SOURCE,
+                       'pos': list(pos),
+                       'restart': restart,
+                       'percentages': rendered,
+                       'skipped': skipped}, sweep_file, indent=4)
+            sweep_file.write('\n')
+
+
+if __name__ == "__main__":
+    main()
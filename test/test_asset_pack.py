@@ -0,0 +1,83 @@
+import os
+import pytest
+from PIL import Image, ImageDraw
+from src.asset_pack import (load_asset_pack, compile_asset_pack, source_assets,
+                            convert_frames, AssetPack)
+
+
+def create_sources(base_path, frame_count=3):
+    os.makedirs(os.path.join(base_path, 'anim'))
+    os.makedirs(os.path.join(base_path, 'icons'))
+
+    frames = []
+    for idx in range(frame_count):
+        frame = Image.new('L', (40, 20))
+        ImageDraw.Draw(frame).ellipse((idx * 5, 0, idx * 5 + 15, 19), fill=128 + idx * 40)
+        frames.append(frame.convert('P'))
+    frames[0].save(os.path.join(base_path, 'anim', 'intro.gif'), save_all=True, append_images=frames[1:])
+
+    icon = Image.new('L', (64, 64))
+    ImageDraw.Draw(icon).rectangle((8, 8, 56, 56), fill=200)
+    icon.save(os.path.join(base_path, 'icons', 'sun.png'))
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_pack_matches_runtime_conversion(tmp_path):
+    """ Packed frames equal the frames converted at runtime """
+    base_path = str(tmp_path)
+    create_sources(base_path)
+    pack = load_asset_pack(base_path, os.path.join(base_path, 'cache', 'assets.pack'))
+
+    expected = convert_frames(os.path.join(base_path, 'anim', 'intro.gif'), 'animation', None)
+    frames = pack.animation('intro.gif')
+    assert len(frames) == len(expected) == 3
+    for frame, expected_frame in zip(frames, expected):
+        assert frame.mode == '1'
+        assert frame.tobytes() == expected_frame.tobytes()
+
+    icon = pack.icon('sun.png')
+    assert icon.size == (32, 32)
+    assert icon.tobytes() == convert_frames(os.path.join(base_path, 'icons', 'sun.png'), 'icon', (32, 32))[0].tobytes()
+
+    assert pack.animation('missing.gif') is None
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_pack_rebuilds_on_source_change(tmp_path):
+    """ Changed sources are detected by their hash """
+    base_path = str(tmp_path)
+    pack_path = os.path.join(base_path, 'cache', 'assets.pack')
+    create_sources(base_path)
+    load_asset_pack(base_path, pack_path).close()
+    first_mtime = os.stat(pack_path).st_mtime_ns
+
+    # Unchanged sources reuse the pack
+    pack = load_asset_pack(base_path, pack_path)
+    assert os.stat(pack_path).st_mtime_ns == first_mtime
+    pack.close()
+
+    # Replace the animation with a longer one
+    os.remove(os.path.join(base_path, 'anim', 'intro.gif'))
+    os.rmdir(os.path.join(base_path, 'anim'))
+    os.remove(os.path.join(base_path, 'icons', 'sun.png'))
+    os.rmdir(os.path.join(base_path, 'icons'))
+    create_sources(base_path, frame_count=5)
+
+    pack = load_asset_pack(base_path, pack_path)
+    assert len(pack.animation('intro.gif')) == 5
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_corrupt_pack_is_replaced(tmp_path):
+    base_path = str(tmp_path)
+    pack_path = os.path.join(base_path, 'assets.pack')
+    create_sources(base_path)
+    with open(pack_path, 'wb') as pack_file:
+        pack_file.write(b'garbage-garbage-garbage')
+
+    pack = load_asset_pack(base_path, pack_path)
+    assert isinstance(pack, AssetPack)
+    assert len(pack.animation('intro.gif')) == 3
@@ -0,0 +1,93 @@
+import os
+import json
+import random
+import pytest
+from PIL import Image, ImageDraw
+from src.chip_animation import (ChipAnimation, draw_chip_outline, draw_chip_body,
+                                draw_data_lines, NOISE_FRAME_COUNT)
+from src.page_canvas import PageCanvas
+
+WIDTH = 128
+HEIGHT = 32
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus', 'chip_animation')
+
+
+def golden_sweep(name):
+    """ Returns the sweep description and frames drawn by the original Display.draw_chip(),
+    see corpus/chip_animation/generate.py """
+    with open(os.path.join(CORPUS_PATH, name + '.json'), 'r', encoding='utf-8') as sweep_file:
+        sweep = json.load(sweep_file)
+    strip = Image.open(os.path.join(CORPUS_PATH, name + '.png')).convert('1')
+    frames = [strip.crop((0, index * HEIGHT, WIDTH, (index + 1) * HEIGHT)).tobytes()
+              for index in range(len(sweep['percentages']))]
+    return sweep, frames
+
+
+def reference_frames(percentages, pos=(0, 0)):
+    """ Draws the chip directly, consuming random numbers like the live renderer did.
+    The noise table repeats after NOISE_FRAME_COUNT data line frames """
+    frame_index = 0
+    frames = []
+    for percentage in percentages:
+        image = Image.new('1', (WIDTH, HEIGHT))
+        draw = ImageDraw.Draw(image)
+        draw_chip_outline(draw, pos)
+        draw_chip_body(draw, pos, percentage)
+        if percentage is not None and percentage < 1.0:
+            if frame_index % NOISE_FRAME_COUNT == 0:
+                random.seed('denali')
+            draw_data_lines(draw, WIDTH, pos=pos)
+            frame_index += 1
+        frames.append(image.tobytes())
+    return frames
+
+
+def animation_frames(percentages, pos=(0, 0), restart=False):
+    """ Draws the chip onto a canvas from the pre-rendered tiles and noise
+    table. With restart every frame is the first one of a progress view """
+    animation = ChipAnimation(WIDTH, HEIGHT, pos=pos)
+    frame_index = 0
+    frames = []
+    for percentage in percentages:
+        if restart:
+            frame_index = 0
+        canvas = PageCanvas(WIDTH, HEIGHT)
+        animation.draw_outline(canvas)
+        animation.draw_body(canvas, percentage)
+        if percentage is not None and percentage < 1.0:
+            animation.draw_data_lines(canvas, frame_index)
+            frame_index += 1
+        frames.append(canvas.to_image().tobytes())
+    return frames
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+@pytest.mark.parametrize('name', ['fill-levels', 'data-lines', 'offset'])
+def test_golden_frames(name):
+    """ Fill levels, data lines and positions look exactly like the original draw_chip() frames """
+    sweep, frames = golden_sweep(name)
+    assert animation_frames(sweep['percentages'], tuple(sweep['pos']), sweep['restart']) == frames
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_levels_missing_in_golden_frames():
+    """ The original draw_chip() raises on current Pillow for levels with
+    inverted fill rectangles and without percentage. These are compared with
+    the chip drawn directly, with the rectangles ordered like older Pillow did """
+    sweep, _ = golden_sweep('fill-levels')
+    percentages = [None] + sweep['skipped']
+    assert len(percentages) > 1
+    assert animation_frames(percentages) == reference_frames(percentages)
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_body_tiles_are_shared():
+    """ Percentages that render the same pixels share one tile """
+    animation = ChipAnimation(WIDTH, HEIGHT)
+    for step in range(1001):
+        animation.body_tile(step / 1000)
+    assert len(animation.body_tiles) <= 2 * 27 + 2
@@ -0,0 +1,60 @@
+import os
+import glob
+import json
+import pytest
+from src.chronometer_parser import parse_chronometer, parse_uptime, parse_count, MISSING, INVALID
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus', 'chronometer')
+
+
+def corpus():
+    """ Returns (name, output, expected) of every pihole -c -e output of the corpus,
+    see corpus/chronometer/README.md """
+    samples = []
+    for path in sorted(glob.glob(os.path.join(CORPUS_PATH, '*.txt'))):
+        with open(path, 'r', encoding='utf-8') as output_file:
+            output = output_file.read()
+        with open(path[:-len('.txt')] + '.json', 'r', encoding='utf-8') as expected_file:
+            expected = json.load(expected_file)
+        samples.append((os.path.basename(path), output, expected))
+    return samples
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_values():
+    """ Counts, percentages and uptimes are converted once """
+    assert parse_count('1,234,567') == 1234567
+    assert parse_uptime('04:56:12') == 17772
+    assert parse_uptime('1 day, 00:00:05') == 86405
+    assert parse_uptime('3 days, 04:56:12 (Raspbian') == 3 * 86400 + 17772
+    with pytest.raises(ValueError):
+        parse_uptime('unknown')
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+@pytest.mark.parametrize('name, output, expected', corpus())
+def test_corpus(name, output, expected):
+    """ Every corpus output yields the expected stats and report """
+    stats, report = parse_chronometer(output)
+    # JSON has no tuples
+    stats['ratio'] = list(stats['ratio'])
+    assert stats == expected['stats']
+    assert report == expected['report']
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_report():
+    """ Missing and invalid fields are reported and hold their defaults """
+    stats, report = parse_chronometer('Pi-hole: Active (Blocking: many sites)\nAds Today: 12%')
+    assert stats['status'] == 'Active'
+    assert stats['today_percentage'] == 12.0
+    assert stats['blocking'] == 0
+    assert stats['ratio'] == (0, 0)
+
+    assert report['blocking'] == INVALID
+    assert report['ratio'] == MISSING
+    # DHCP is optional
+    assert 'leased_client_count' not in report
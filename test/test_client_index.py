@@ -0,0 +1,84 @@
+import os
+import pytest
+from src.client_index import ClientIndex, parse_dhcp_leases
+
+HOSTS = '''127.0.0.1       localhost
+192.168.1.2     pihole pihole.lan   # this device
+192.168.1.50    printer
+'''
+
+CUSTOM_LIST = '''192.168.1.50 laser-printer.lan
+192.168.1.60 nas.lan
+'''
+
+DHCP_LEASES = '''1600000000 00:11:22:33:44:55 192.168.1.23 living-room-tv 01:00:11:22:33:44:55
+1600000100 AA:BB:CC:DD:EE:FF 192.168.1.42 * *
+'''
+
+KNOWN_CLIENTS = '''192.168.1.60 Storage
+aa:bb:cc:dd:ee:ff Kitchen Radio
+living-room-tv Television
+'''
+
+
+def create_index(tmp_path):
+    for name, content in [('hosts', HOSTS), ('custom.list', CUSTOM_LIST),
+                          ('dhcp.leases', DHCP_LEASES), ('known_clients', KNOWN_CLIENTS)]:
+        (tmp_path / name).write_text(content)
+
+    index = ClientIndex(str(tmp_path / 'known_clients'),
+                        custom_list_path=str(tmp_path / 'custom.list'),
+                        dhcp_leases_path=str(tmp_path / 'dhcp.leases'),
+                        hosts_path=str(tmp_path / 'hosts'))
+    index.reload_if_changed()
+    return index
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_parse_dhcp_leases(tmp_path):
+    """ Leases without hostname are kept, MACs are lower case """
+    (tmp_path / 'dhcp.leases').write_text(DHCP_LEASES)
+    assert parse_dhcp_leases(str(tmp_path / 'dhcp.leases')) == [('00:11:22:33:44:55', '192.168.1.23', 'living-room-tv'),
+                                                                 ('aa:bb:cc:dd:ee:ff', '192.168.1.42', None)]
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_resolve(tmp_path):
+    """ IPs, MACs and hostnames resolve to the most specific name """
+    index = create_index(tmp_path)
+
+    # known_clients by IP, by MAC of the lease and by hostname of the lease
+    assert index.resolve('192.168.1.60') == 'Storage'
+    assert index.resolve('192.168.1.42') == 'Kitchen Radio'
+    assert index.resolve('AA:BB:CC:DD:EE:FF') == 'Kitchen Radio'
+    assert index.resolve('192.168.1.23') == 'Television'
+    assert index.resolve('00:11:22:33:44:55') == 'Television'
+
+    # custom.list overrides /etc/hosts
+    assert index.resolve('192.168.1.50') == 'laser-printer.lan'
+    assert index.resolve('192.168.1.2') == 'pihole'
+
+    assert index.resolve('192.168.1.99') == '192.168.1.99'
+    assert index.get_lease_count() == 2
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_reload_on_change_only(tmp_path):
+    """ Files are parsed again only after one of them changed """
+    index = create_index(tmp_path)
+    assert index.build_count == 1
+    assert not index.reload_if_changed()
+
+    leases_path = str(tmp_path / 'dhcp.leases')
+    with open(leases_path, 'a') as leases_file:
+        leases_file.write('1600000200 00:00:00:00:00:01 192.168.1.77 laptop *\n')
+    stat = os.stat(leases_path)
+    os.utime(leases_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000))
+
+    assert index.reload_if_changed()
+    assert index.build_count == 2
+    assert index.resolve('192.168.1.77') == 'laptop'
+    assert index.get_lease_count() == 3
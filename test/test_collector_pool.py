@@ -0,0 +1,77 @@
+import time
+import threading
+import pytest
+from src.collector_pool import CollectorPool
+
+
+def wait_for(condition, timeout=2.0):
+    started = time.monotonic()
+    while not condition():
+        if time.monotonic() - started > timeout:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_results_are_collected_in_background():
+    """ Collectors run on their own and publish their latest result """
+    pool = CollectorPool()
+    pool.register('answer', lambda: 42, interval=60, deadline=1)
+    assert pool.get_result('answer') is None
+    assert pool.is_stale('answer')
+
+    pool.start()
+    try:
+        assert wait_for(lambda: pool.get_result('answer') == 42)
+        assert not pool.is_stale('answer')
+    finally:
+        pool.stop()
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_hung_collector_is_stale_and_does_not_block():
+    """ A hung collector is reported as stale while others keep delivering """
+    release = threading.Event()
+    pool = CollectorPool()
+    pool.register('hung', release.wait, interval=60, deadline=0.05)
+    pool.register('fast', lambda: 'ok', interval=60, deadline=1)
+
+    pool.start()
+    try:
+        assert wait_for(lambda: pool.get_result('fast') == 'ok')
+        assert wait_for(lambda: pool.get_status()['hung']['timeouts'] == 1)
+
+        started = time.monotonic()
+        assert pool.get_result('hung') is None
+        assert pool.is_stale('hung')
+        assert time.monotonic() - started < 0.05
+    finally:
+        release.set()
+        pool.stop()
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_failing_collector_keeps_previous_result():
+    """ Exceptions are counted, the last good result stays available """
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) > 1:
+            raise RuntimeError('collector failed')
+        return 'good'
+
+    pool = CollectorPool()
+    pool.register('flaky', flaky, interval=60, deadline=1)
+    pool.start()
+    try:
+        assert wait_for(lambda: pool.get_result('flaky') == 'good')
+        pool.refresh('flaky')
+        assert wait_for(lambda: pool.get_status()['flaky']['errors'] == 1)
+        assert pool.get_result('flaky') == 'good'
+    finally:
+        pool.stop()
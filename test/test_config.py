@@ -0,0 +1,182 @@
+import os
+import time
+import pytest
+from src.config import Config, ConfigError, parse_config, SCREEN_DURATIONS, COLLECTOR_INTERVALS
+from src.stat_grabber import StatGrabber, Observer
+# The watcher class as imported by led_display, see Display.update()
+from src.led_display import Display, ConfigWatcher, SCREENS
+
+
+def wait_for(condition, timeout=5.0):
+    started = time.monotonic()
+    while not condition():
+        if time.monotonic() - started > timeout:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class RecordingObserver(Observer):
+
+    def __init__(self):
+        self.configs = []
+
+    def update(self, subject):
+        self.configs.append(subject.config)
+
+
+def write_config(path, text):
+    """ Replaces the file atomically, the way editors and deployment tools do """
+    temporary_path = str(path) + '.tmp'
+    with open(temporary_path, 'w', encoding='utf-8') as config_file:
+        config_file.write(text)
+    os.replace(temporary_path, str(path))
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_parse_config(tmp_path):
+    """ Options override the defaults, relative paths are resolved against the base path """
+    config = parse_config('[display]\n'
+                          'max_fps = 20\n'
+                          '[screens]\n'
+                          'weather = 15  ; longer\n'
+                          '[collectors]\n'
+                          'pihole = 10\n'
+                          '[weather]\n'
+                          'location = winkler manitoba\n'
+                          '[paths]\n'
+                          'cache = /var/cache/pihole-display\n', base_path=str(tmp_path))
+
+    assert config.max_fps == 20
+    assert config.screen_duration('weather') == 15
+    assert config.screen_duration('system') == 10
+    assert config.collector_intervals['pihole'] == 10
+    assert config.location == 'winkler manitoba'
+    assert config.cache_path == '/var/cache/pihole-display'
+    assert config.known_clients_path == os.path.join(str(tmp_path), 'known_clients')
+
+    # Immutable
+    with pytest.raises(AttributeError):
+        config.max_fps = 60
+    with pytest.raises(TypeError):
+        config.screen_durations['weather'] = 1
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_location_file_fallback(tmp_path):
+    """ Without a location option the first line of the location file is used """
+    (tmp_path / 'location').write_text('winkler manitoba\nignored\n')
+    assert parse_config('', base_path=str(tmp_path)).location == 'winkler manitoba'
+    assert parse_config('', base_path=str(tmp_path / 'empty')).location == ''
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_invalid_config():
+    """ Unknown screens and out of range values are rejected """
+    for text in ['[display]\nmax_fps = 0\n',
+                 '[display]\nmax_fps = 60\n',
+                 '[display]\nmax_fps = fast\n',
+                 '[screens]\nradio = 10\n',
+                 '[collectors]\npihole = -1\n',
+                 '[display\n']:
+        with pytest.raises(ConfigError):
+            parse_config(text)
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_defaults_cover_screens_and_collectors():
+    """ Every cycle screen and collector has a default """
+    assert list(SCREEN_DURATIONS) == SCREENS
+    assert set(COLLECTOR_INTERVALS) == set(StatGrabber(Config()).collector_pool.collectors)
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_reload_notifies_observers(tmp_path):
+    """ A changed file is parsed into a new config, a broken one keeps the last good config """
+    path = tmp_path / 'pihole-display.ini'
+    write_config(path, '[display]\nmax_fps = 20\n')
+    watcher = ConfigWatcher(str(path), base_path=str(tmp_path))
+    observer = RecordingObserver()
+    watcher.attach(observer)
+    assert watcher.config.max_fps == 20
+
+    # Unchanged
+    assert not watcher.check()
+
+    write_config(path, '[display]\nmax_fps = 10\n')
+    assert watcher.check()
+    assert [config.max_fps for config in observer.configs] == [10]
+
+    write_config(path, '[display]\nmax_fps = many\n')
+    assert not watcher.check()
+    assert watcher.config.max_fps == 10
+    assert watcher.error_count == 1
+
+
+@pytest.mark.linux
+def test_watcher_thread(tmp_path):
+    """ The background watcher picks up replaced files """
+    path = tmp_path / 'pihole-display.ini'
+    write_config(path, '')
+    watcher = ConfigWatcher(str(path), base_path=str(tmp_path), poll_interval=0.1)
+    observer = RecordingObserver()
+    watcher.attach(observer)
+    watcher.start()
+    try:
+        time.sleep(0.2)
+        write_config(path, '[screens]\nblocked = 5\n')
+        assert wait_for(lambda: observer.configs)
+        assert observer.configs[-1].screen_duration('blocked') == 5
+
+        (tmp_path / 'location').write_text('Berlin\n')
+        assert wait_for(lambda: observer.configs[-1].location == 'Berlin')
+    finally:
+        watcher.stop()
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_observers_apply_config(tmp_path):
+    """ Display and stat grabber switch to the reloaded settings """
+    path = tmp_path / 'pihole-display.ini'
+    write_config(path, '')
+    watcher = ConfigWatcher(str(path), base_path=str(tmp_path))
+
+    stat_grabber = StatGrabber(watcher.config)
+    display = Display(backend='virtual', stat_grabber=stat_grabber, config=watcher.config)
+    watcher.attach(stat_grabber)
+    watcher.attach(display)
+
+    write_config(path, '[display]\nmax_fps = 12\n[collectors]\nmetric_history = 30\n')
+    assert watcher.check()
+    assert display.max_fps == 12
+    assert stat_grabber.collector_pool.collectors['metric_history'].interval == 30
+    assert stat_grabber.config is display.config
+
+
+@pytest.mark.linux
+def test_watcher_follows_moved_files(tmp_path):
+    """ Files moved to another directory by a reloaded config are watched there """
+    path = tmp_path / 'pihole-display.ini'
+    write_config(path, '')
+    (tmp_path / 'weather').mkdir()
+    watcher = ConfigWatcher(str(path), base_path=str(tmp_path), poll_interval=0.1)
+    observer = RecordingObserver()
+    watcher.attach(observer)
+    watcher.start()
+    try:
+        time.sleep(0.2)
+        write_config(path, '[paths]\nlocation = weather/location\n')
+        assert wait_for(lambda: observer.configs)
+        assert wait_for(lambda: str(tmp_path / 'weather') in watcher.watched_directories())
+
+        time.sleep(0.2)
+        write_config(tmp_path / 'weather' / 'location', 'Berlin\n')
+        assert wait_for(lambda: observer.configs[-1].location == 'Berlin')
+    finally:
+        watcher.stop()
@@ -0,0 +1,92 @@
+import time
+import pytest
+import numpy as np
+from src.display_group import DisplayGroup, parse_display_spec
+from src.stat_grabber import StatGrabber
+
+
+def wait_for(condition, timeout=5.0):
+    started = time.monotonic()
+    while not condition():
+        if time.monotonic() - started > timeout:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def offline_stat_grabber():
+    """ StatGrabber whose collectors count their runs instead of fetching """
+    stat_grabber = StatGrabber()
+    stat_grabber.collector_pool.register('pihole', lambda: {}, interval=60, deadline=5)
+    stat_grabber.collector_pool.register('weather', lambda: {'connection': False}, interval=60, deadline=5)
+    return stat_grabber
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_parse_display_spec():
+    """ Address, size and playlist are read per display """
+    configs = parse_display_spec('0x3C:128x32; 0x3D:128x64:weather,blocked')
+
+    assert configs[0] == {'address': 0x3C, 'width': 128, 'height': 32,
+                          'playlist': ['system', 'weather', 'blocked', 'clients', 'history', 'queries']}
+    assert configs[1] == {'address': 0x3D, 'width': 128, 'height': 64,
+                          'playlist': ['weather', 'blocked']}
+
+    for spec in ['', '0x3C', '0x3C:96x16', '0x3C:128x32:radio']:
+        with pytest.raises(ValueError):
+            parse_display_spec(spec)
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_group_shares_pipeline(cache_config):
+    """ All displays read from one stat grabber and asset pack """
+    configs = parse_display_spec('0x3C:128x32:blocked;0x3D:128x64:weather,clients')
+    group = DisplayGroup(configs, backend='virtual', stat_grabber=offline_stat_grabber(), config=cache_config)
+
+    first, second = group.displays
+    assert first.stat_grabber is second.stat_grabber
+    assert first.assets is second.assets
+    assert (second.width, second.height) == (128, 64)
+    assert second.backend.address == 0x3D
+    assert first.playlist == [2]
+    assert second.playlist == [1, 3]
+
+    # Tall panels render the regular screens, the progress bar spans the full height
+    second.clear_display()
+    second.draw_client_stats()
+    second.draw_state_progress(0.5)
+    pixels = np.array(second.image)
+    assert pixels.shape == (64, 128)
+    assert pixels[:, :-1].any()
+    assert pixels[32:, -1].all()
+    assert not pixels[:32, -1].any()
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_collectors_run_once_for_all_displays(cache_config):
+    """ Collectors are started once and keep running until the last display stops """
+    stat_grabber = offline_stat_grabber()
+    group = DisplayGroup(parse_display_spec('0x3C:128x32;0x3D:128x32'),
+                         backend='virtual',
+                         stat_grabber=stat_grabber,
+                         config=cache_config)
+    pool = stat_grabber.collector_pool
+
+    group.start()
+    try:
+        assert wait_for(lambda: all(display.backend.frame_count > 1 for display in group.displays))
+        assert wait_for(lambda: pool.get_result('weather') is not None)
+        assert pool.collectors['pihole'].run_count == 1
+        assert pool.collectors['weather'].run_count == 1
+
+        group.displays[0].stop()
+        group.displays[0].join(5)
+        assert pool.should_run
+    finally:
+        group.stop()
+        group.join(5)
+
+    assert not pool.should_run
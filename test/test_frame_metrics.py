@@ -0,0 +1,98 @@
+import os
+import json
+import time
+import signal
+import pytest
+from src.frame_metrics import Histogram, FrameMetrics, install_dump_signal, format_report, PHASES
+from src.led_display import Display, MODE
+from src.stat_grabber import StatGrabber
+
+
+def wait_for(condition, timeout=5.0):
+    started = time.monotonic()
+    while not condition():
+        if time.monotonic() - started > timeout:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_histogram_buckets():
+    """ Values are counted into fixed buckets, percentiles report bucket bounds """
+    histogram = Histogram(bounds=[0.001, 0.01, 0.1])
+    for value in [0.0005] * 90 + [0.005] * 9 + [2.0]:
+        histogram.add(value)
+
+    assert histogram.counts == [90, 9, 0, 1]
+    assert histogram.percentile(0.5) == 0.001
+    assert histogram.percentile(0.95) == 0.01
+    assert histogram.percentile(1.0) == 2.0
+
+    stats = histogram.get_stats()
+    assert stats['count'] == 100
+    assert stats['max_ms'] == 2000.0
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_missed_frames_per_screen():
+    """ Frames and missed deadlines are counted per screen """
+    metrics = FrameMetrics()
+    metrics.add_frame('system')
+    metrics.add_frame('weather', missed_frames=2)
+    metrics.add_frame('weather')
+    metrics.add('draw', 0.002)
+
+    stats = metrics.get_stats()
+    assert stats['frames'] == {'system': 1, 'weather': 2}
+    assert stats['missed_frames'] == {'weather': 2}
+    assert stats['phases']['draw']['count'] == 1
+    assert 'weather' in format_report(stats)
+
+
+@pytest.mark.linux
+def test_signal_dump(tmp_path):
+    """ SIGUSR1 writes the stats of all displays to a file """
+    metrics = FrameMetrics()
+    metrics.add('transfer', 0.004)
+    path = str(tmp_path / 'metrics.json')
+
+    previous_handler = signal.getsignal(signal.SIGUSR1)
+    install_dump_signal({'display-0': metrics}, path)
+    try:
+        os.kill(os.getpid(), signal.SIGUSR1)
+        assert wait_for(lambda: os.path.exists(path))
+    finally:
+        signal.signal(signal.SIGUSR1, previous_handler)
+
+    with open(path) as dump_file:
+        dump = json.load(dump_file)
+    assert dump['display-0']['phases']['transfer']['count'] == 1
+    # The report command reads the dump
+    assert 'transfer' in format_report(dump['display-0'])
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_render_loop_is_timed(cache_config):
+    """ run() times every phase of a frame """
+    stat_grabber = StatGrabber()
+    stat_grabber.collector_pool.register('pihole', lambda: {}, interval=60, deadline=5)
+    stat_grabber.collector_pool.register('weather', lambda: {'connection': False}, interval=60, deadline=5)
+
+    display = Display(backend='virtual', stat_grabber=stat_grabber, playlist=['system'],
+                      config=cache_config)
+    display.current_mode = MODE.CYCLE
+    display.start()
+    try:
+        assert wait_for(lambda: display.metrics.get_stats()['frames'].get('system', 0) >= 3)
+    finally:
+        display.stop()
+        display.join(5)
+
+    phases = display.metrics.get_stats()['phases']
+    for phase in ['draw', 'convert', 'transfer', 'overshoot']:
+        assert phases[phase]['count'] >= 3
+    assert set(phases) == set(PHASES)
@@ -0,0 +1,143 @@
+import os
+import pytest
+from src.frame_recorder import (FrameRecorder, FrameReader, ReplayStatGrabber,
+                                replay_recording, rle_encode, rle_decode)
+from src.led_display import MODE
+
+
+def record_session(path, create_display):
+    """ Renders a scripted session like run() does and records it """
+    display = create_display(ReplayStatGrabber())
+    display.stat_grabber.inputs = {'cpu_load': 42.0, 'memory_percentage': 23.0}
+    display.ph_q_blocked = 4321
+    display.ph_q_total = 18765
+    display.ph_q_perc = 0.23
+    display.ph_top_client = 'living-room-television'
+    display.weather_line_1 = 'Partly cloudy 21°C RH:64%'
+    display.weather_line_2 = 'NNW 11km/h 0mm'
+    display.time_string = '12:34'
+
+    recorder = FrameRecorder(path, display.width, display.height, keyframe_interval=25)
+    display.current_mode = MODE.CYCLE
+    for index in range(60):
+        display.frame_time = 100.0 + index / 30
+        if index % 15 == 0:
+            # Screen swap, the stats above stand in for the collectors
+            display.current_state = (index // 15) % 4
+            display.screen_started_at = display.frame_time
+
+        tick = index % 30
+        progress = (index % 15) / 15
+        inputs = display.render_inputs(tick, progress)
+        display.render_frame(tick, progress)
+        inputs['cpu_load'] = display.cpu_load
+        inputs['memory_percentage'] = display.memory_percentage
+        recorder.record(display.image, inputs)
+
+    display.current_mode = MODE.PROGRESS
+    display.current_message_dict = {'activity_name': 'UPDATING',
+                                    'activity_detail': 'FIRMWARE',
+                                    'activity_name_finished': 'UPDATE',
+                                    'activity_detail_finished': 'FINISHED',
+                                    'percentage': None}
+    for index in range(40):
+        display.current_message_dict['percentage'] = index / 39
+        inputs = display.render_inputs(index % 30, 0)
+        display.render_frame(index % 30, 0)
+        recorder.record(display.image, inputs)
+
+    recorder.close()
+    return recorder
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_rle_round_trip():
+    """ Runs longer than 255 bytes are split """
+    data = bytes(600) + b'\x01\x02\x02' + b'\xff' * 3
+    encoded = rle_encode(data)
+    assert len(encoded) == 2 * 6
+    assert rle_decode(encoded) == data
+    assert rle_decode(rle_encode(b'')) == b''
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_recording_is_compact(tmp_path, create_display):
+    """ Delta frames of a mostly static screen cost a few bytes """
+    path = str(tmp_path / 'session.phdr')
+    recorder = record_session(path, create_display)
+
+    assert recorder.get_stats()['frames'] == 100
+    assert os.path.getsize(path) == recorder.bytes_written
+    assert recorder.bytes_written < recorder.raw_bytes
+
+    frames = list(FrameReader(path))
+    assert len(frames) == 100
+    assert frames[0][0]['mode'] == 'CYCLE'
+    assert frames[-1][0]['current_message_dict']['percentage'] == 1.0
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_replay_reproduces_recording(tmp_path, cache_config, create_display):
+    """ Rendering the recorded inputs again yields identical frames """
+    path = str(tmp_path / 'session.phdr')
+    record_session(path, create_display)
+    assert replay_recording(path, config=cache_config) == []
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_replay_reports_differences(tmp_path, create_display):
+    """ A changed rendering path is reported per frame with a diff image """
+    path = str(tmp_path / 'session.phdr')
+    record_session(path, create_display)
+
+    display = create_display(ReplayStatGrabber())
+    display.draw_bar_border = lambda origin, size: None
+    mismatches = replay_recording(path, display=display, diff_directory=str(tmp_path / 'diff'))
+
+    # System and blocked screens draw bar borders
+    assert {mismatch['state'] for mismatch in mismatches} == {0, 2}
+    assert all(mismatch['pixels'] > 0 for mismatch in mismatches)
+    assert len(os.listdir(str(tmp_path / 'diff'))) == len(mismatches)
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_truncated_recording(tmp_path, create_display):
+    """ A recording cut off within a record keeps all complete frames before it """
+    path = str(tmp_path / 'session.phdr')
+    record_session(path, create_display)
+    frames = list(FrameReader(path))
+    with open(path, 'rb') as recording_file:
+        data = recording_file.read()
+
+    truncated_path = str(tmp_path / 'truncated.phdr')
+    # Cuts through frame data, inputs and headers of the last records
+    for cut in range(1, 400, 3):
+        with open(truncated_path, 'wb') as truncated_file:
+            truncated_file.write(data[:-cut])
+        truncated = list(FrameReader(truncated_path))
+        assert 0 < len(truncated) < len(frames)
+        assert truncated == frames[:len(truncated)]
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_keyframes_are_flushed(tmp_path, create_display):
+    """ Frames up to the latest keyframe are on disk before the recorder is closed """
+    path = str(tmp_path / 'session.phdr')
+    display = create_display(ReplayStatGrabber())
+    display.current_mode = MODE.CLEAR
+    display.clear_display()
+
+    recorder = FrameRecorder(path, display.width, display.height, keyframe_interval=10)
+    for index in range(15):
+        recorder.record(display.image, {'mode': 'CLEAR', 'tick': index})
+
+    frames = list(FrameReader(path))
+    assert len(frames) >= 11
+    assert frames[10][0] == {'mode': 'CLEAR', 'tick': 10}
+    recorder.close()
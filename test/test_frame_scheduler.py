@@ -0,0 +1,57 @@
+import time
+import threading
+import pytest
+from src.frame_scheduler import FrameScheduler
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_deadlines_absorb_render_time():
+    """ Render time is subtracted from the frame period """
+    scheduler = FrameScheduler()
+    fps = 50
+    frames = 10
+
+    started = time.monotonic()
+    for _ in range(frames):
+        # simulated render work of half a frame
+        time.sleep(0.5 / fps)
+        scheduler.wait_for_next_frame(fps)
+    elapsed = time.monotonic() - started
+
+    # Fixed sleeps would take 1.5 periods per frame
+    assert elapsed < 1.3 * frames / fps
+    assert scheduler.get_stats()['missed_deadlines'] == 0
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_missed_deadlines_are_dropped(clock):
+    """ Frames over budget are reported and not caught up """
+    scheduler = FrameScheduler(clock=clock)
+
+    scheduler.wait_for_next_frame(10)
+    # woke up at the first deadline, render took 3.5 periods
+    clock.now = scheduler.next_deadline + 0.35
+    scheduler.wait_for_next_frame(10)
+
+    stats = scheduler.get_stats()
+    assert stats['missed_deadlines'] == 1
+    assert stats['dropped_frames'] == 2
+    # Next deadline lies in the future again
+    assert scheduler.next_deadline > clock.now
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_idle_until_woken():
+    """ A target rate of 0 idles until wake() is called """
+    scheduler = FrameScheduler()
+    threading.Timer(0.05, scheduler.wake).start()
+
+    started = time.monotonic()
+    woken = scheduler.wait_for_next_frame(0)
+
+    assert woken
+    assert time.monotonic() - started < 1.0
+    assert scheduler.get_stats()['wakes'] == 1
@@ -0,0 +1,203 @@
+import socket
+import threading
+import socketserver
+import pytest
+from src.ftl_client import FTLClient, FTLError, parse_value
+from src.stat_grabber import StatGrabber
+from src.client_index import ClientIndex
+
+##
+# Replies as sent by pihole-FTL v5
+REPLIES = {'>stats': ['domains_being_blocked 87234',
+                      'dns_queries_today 18765',
+                      'ads_blocked_today 4321',
+                      'ads_percentage_today 23.026913',
+                      'unique_domains 1234',
+                      'clients_ever_seen 17',
+                      'unique_clients 12',
+                      'privacy_level 0',
+                      'status enabled'],
+           '>version': ['version v5.3.4',
+                        'tag v5.3.4',
+                        'branch master',
+                        'hash 7e0baa46',
+                        'date 2021-01-09 15:02:23 +0000'],
+           '>cacheinfo': ['cache-size: 10000',
+                          'cache-live-freed: 0',
+                          'cache-inserted: 2345'],
+           '>top-clients (1)': ['0 9876 192.168.1.23 living-room-television.lan'],
+           '>top-clients (3)': ['0 9876 192.168.1.23 living-room-television.lan',
+                                '1 543 192.168.1.42']}
+
+
+class FTLHandler(socketserver.StreamRequestHandler):
+    """ Answers commands like pihole-FTL until >quit """
+
+    def handle(self):
+        for line in self.rfile:
+            command = line.decode('utf-8').strip()
+            if command == '>quit':
+                return
+            self.server.commands.append(command)
+            reply = REPLIES.get(command, [])
+            self.wfile.write(''.join(reply_line + '\n' for reply_line in reply).encode('utf-8'))
+            self.wfile.write(b'---EOM---\n\n')
+            if len(self.server.commands) == self.server.restart_after:
+                # Stands in for an FTL restart
+                return
+
+
+class FTLServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address=('127.0.0.1', 0)):
+        super(FTLServer, self).__init__(address, FTLHandler)
+        self.commands = []
+        self.restart_after = None
+
+
+class FTLUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path):
+        super(FTLUnixServer, self).__init__(path, FTLHandler)
+        self.commands = []
+        self.restart_after = None
+
+
+@pytest.fixture
+def ftl_server():
+    server = FTLServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def create_client(server):
+    return FTLClient(port=server.server_address[1], timeout=2.0)
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_parse_value():
+    """ Numbers are typed, everything else stays a string """
+    assert parse_value('17') == 17
+    assert parse_value('23.5') == 23.5
+    assert parse_value('enabled') == 'enabled'
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_structured_replies(ftl_server):
+    """ Replies are parsed into typed dicts and lists """
+    client = create_client(ftl_server)
+
+    stats = client.stats()
+    assert stats['dns_queries_today'] == 18765
+    assert stats['ads_percentage_today'] == 23.026913
+    assert stats['status'] == 'enabled'
+
+    assert client.version()['version'] == 'v5.3.4'
+    assert client.cacheinfo()['cache-inserted'] == 2345
+    assert client.top_clients(3) == [{'count': 9876, 'ip': '192.168.1.23', 'name': 'living-room-television.lan'},
+                                     {'count': 543, 'ip': '192.168.1.42', 'name': ''}]
+
+    # All requests were answered over the same connection
+    assert client.connect_count == 1
+    client.close()
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_reconnect_after_restart(ftl_server):
+    """ A closed connection is re-established transparently """
+    ftl_server.restart_after = 1
+    client = create_client(ftl_server)
+
+    assert client.version()['version'] == 'v5.3.4'
+    assert client.stats()['ads_blocked_today'] == 4321
+    assert client.connect_count == 2
+    client.close()
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_unreachable_ftl():
+    """ FTLError is raised if FTL does not accept connections """
+    probe = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    probe.bind(('127.0.0.1', 0))
+    port = probe.getsockname()[1]
+    probe.close()
+
+    client = FTLClient(port=port, timeout=0.5)
+    with pytest.raises(FTLError):
+        client.stats()
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+@pytest.mark.parametrize('stats_reply', [['dns_queries_today 18765', 'status enabled'],
+                                         ['dns_queries_today 18765', 'ads_blocked_today 4321',
+                                          'ads_percentage_today n/a']])
+def test_incomplete_stats(ftl_server, monkeypatch, stats_reply):
+    """ Missing or malformed counters raise FTLError, stat_grabber falls back to pihole -c -e """
+    monkeypatch.setitem(REPLIES, '>stats', stats_reply)
+    client = create_client(ftl_server)
+    with pytest.raises(FTLError):
+        client.stats()
+
+    client.close()
+
+    fallbacks = []
+    stat_grabber = StatGrabber()
+    # Client class of the module stat_grabber imported, it catches that FTLError
+    stat_grabber.ftl_client = type(stat_grabber.ftl_client)(port=ftl_server.server_address[1])
+    stat_grabber.refresh_pihole_stats_no_api_access = lambda: fallbacks.append(True)
+    stat_grabber.refresh_pihole_stats()
+    assert fallbacks == [True]
+    stat_grabber.ftl_client.close()
+
+
+@pytest.mark.linux
+def test_unix_socket(tmp_path):
+    """ FTL is reachable over its Unix socket as well """
+    path = str(tmp_path / 'FTL.sock')
+    server = FTLUnixServer(path)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        client = FTLClient(socket_path=path)
+        assert client.stats()['clients_ever_seen'] == 17
+        client.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_stat_grabber_reads_ftl(ftl_server, tmp_path):
+    """ pihole stats are read from FTL with the fields parsed from pihole -c -e """
+    (tmp_path / 'dhcp.leases').write_text('1600000000 00:11:22:33:44:55 192.168.1.23 tv *\n')
+    stat_grabber = StatGrabber()
+    stat_grabber.ftl_client = create_client(ftl_server)
+    stat_grabber.client_index = ClientIndex(str(tmp_path / 'known_clients'),
+                                            custom_list_path=str(tmp_path / 'custom.list'),
+                                            dhcp_leases_path=str(tmp_path / 'dhcp.leases'),
+                                            hosts_path=str(tmp_path / 'hosts'))
+    stat_grabber.get_active_network_device_count = lambda: 12
+
+    stats = stat_grabber.refresh_pihole_stats()
+    assert stats['ratio'] == (4321, 18765)
+    assert stats['today_percentage'] == 23.026913
+    assert stats['blocking'] == 87234
+    assert stats['status'] == 'Active'
+    assert stats['version_ftl'] == 'v5.3.4'
+    assert stats['topclient'] == 'living-room-television.lan'
+    assert stats['known_client_count'] == 1
+    assert stats['active_device_count'] == 12
+    assert ftl_server.commands == ['>stats', '>version', '>top-clients (1)']
+    stat_grabber.ftl_client.close()
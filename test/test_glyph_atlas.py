@@ -0,0 +1,96 @@
+import os
+import pytest
+from PIL import Image, ImageDraw, ImageFont
+from src.glyph_atlas import GlyphAtlas, shared_atlas
+
+FONT_DIRECTORY = os.path.join(os.path.dirname(__file__), '..', 'fonts')
+FONT_PATH = os.path.join(FONT_DIRECTORY, 'PressStart2P.ttf')
+ICON_FONT_PATH = os.path.join(FONT_DIRECTORY, 'pixel_dingbats-7.ttf')
+
+STRINGS = ['Blocked today:', '(4,321/18,765', 'Partly cloudy 21°C RH:64%', ' gjpqy ', 'Ž‹', '']
+
+
+def draw_atlas(atlas, text):
+    image = Image.new('1', (400, 40))
+    bitmap, (left, top) = atlas.render_text(text)
+    ImageDraw.Draw(image).bitmap((2 + left, 2 + top), bitmap, fill=255)
+    return image
+
+
+def draw_direct(font, text):
+    image = Image.new('1', (400, 40))
+    ImageDraw.Draw(image).text((2, 2), text, font=font, fill=255)
+    return image
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+@pytest.mark.parametrize('font_path', [FONT_PATH, ICON_FONT_PATH])
+@pytest.mark.parametrize('size', [8, 16, 32])
+def test_atlas_matches_freetype(font_path, size):
+    """ Blitted glyphs are pixel identical to FreeType and report the same metrics """
+    atlas = GlyphAtlas(font_path, size)
+    font = ImageFont.truetype(font_path, size)
+
+    for text in STRINGS:
+        assert atlas.getbbox(text) == font.getbbox(text)
+        assert atlas.getlength(text) == font.getlength(text)
+        assert draw_atlas(atlas, text).tobytes() == draw_direct(font, text).tobytes()
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_atlas_is_cached_on_disk(tmp_path):
+    """ A second atlas of the same font and size is loaded without FreeType """
+    atlas = GlyphAtlas(FONT_PATH, 16, str(tmp_path))
+    assert len(os.listdir(str(tmp_path))) == 1
+
+    cached = GlyphAtlas(FONT_PATH, 16, str(tmp_path))
+    assert cached._font is None
+    for text in STRINGS:
+        assert draw_atlas(cached, text).tobytes() == draw_atlas(atlas, text).tobytes()
+
+    # Other sizes get their own atlas
+    GlyphAtlas(FONT_PATH, 8, str(tmp_path))
+    assert len(os.listdir(str(tmp_path))) == 2
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_missing_arrows_are_substituted():
+    """ Diagonal arrows PressStart2P lacks are drawn as pairs of straight arrows """
+    atlas = GlyphAtlas(FONT_PATH, 8)
+    font = ImageFont.truetype(FONT_PATH, 8)
+
+    assert draw_atlas(atlas, '← 5km/h').tobytes() == draw_direct(font, '← 5km/h').tobytes()
+    assert draw_atlas(atlas, '↙ 5km/h').tobytes() == draw_direct(font, '↓← 5km/h').tobytes()
+    assert atlas.getlength('↗') == 16
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_new_glyphs_are_added_once(tmp_path):
+    """ Glyphs outside the base charset are rasterized on first use and only
+    persisted by save_if_dirty(), never while rendering """
+    atlas = GlyphAtlas(FONT_PATH, 8, str(tmp_path), charset='ab')
+    assert set(atlas.glyphs) == {'a', 'b'}
+    written = os.stat(atlas.cache_path).st_mtime_ns
+
+    atlas.render_text('abc')
+    assert set(atlas.glyphs) == {'a', 'b', 'c'}
+    assert atlas.dirty
+    assert os.stat(atlas.cache_path).st_mtime_ns == written
+
+    atlas.save_if_dirty()
+    assert not atlas.dirty
+    cached = GlyphAtlas(FONT_PATH, 8, str(tmp_path), charset='ab')
+    assert set(cached.glyphs) == {'a', 'b', 'c'}
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_atlases_are_shared(tmp_path):
+    """ Each font and size is built once per process """
+    atlas = shared_atlas(FONT_PATH, 8, str(tmp_path))
+    assert shared_atlas(FONT_PATH, 8, str(tmp_path)) is atlas
+    assert shared_atlas(FONT_PATH, 16, str(tmp_path)) is not atlas
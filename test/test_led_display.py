@@ -0,0 +1,92 @@
+import pytest
+from src.display_backend import VirtualBackend, backend_for_name
+
+
+class FixtureStatGrabber():
+    """ Offline stand-in for StatGrabber """
+
+    def get_cpu_load(self):
+        return 42.0
+
+    def get_memory_percentage(self):
+        return 23.0
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_backend_by_name():
+    """ Backends are selected by name """
+    assert isinstance(backend_for_name('virtual'), VirtualBackend)
+
+    with pytest.raises(ValueError):
+        backend_for_name('crt')
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_virtual_backend_keeps_frame(create_display):
+    """ The virtual framebuffer mirrors the rendered image """
+    display = create_display(FixtureStatGrabber())
+    display.clear_display()
+    display.draw_system_stats()
+    display.backend.show(display.image)
+
+    assert display.backend.get_image().tobytes() == display.image.tobytes()
+    assert display.backend.frame_count == 2
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_static_frame_is_not_transferred(create_display):
+    """ Repeating a frame does not cost any bus bytes """
+    display = create_display(FixtureStatGrabber())
+    display.clear_display()
+    display.draw_system_stats()
+    display.backend.show(display.image)
+
+    transferred = display.backend.bytes_transferred
+    display.backend.show(display.image)
+    assert display.backend.bytes_transferred == transferred
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_dump_png(tmp_path, create_display):
+    """ Frames can be dumped for inspection """
+    display = create_display(FixtureStatGrabber())
+    display.ph_q_blocked = '1,234'
+    display.ph_q_total = '56,789'
+    display.ph_q_perc = 0.25
+    display.clear_display()
+    display.draw_blocked_stats(tick=0)
+    display.backend.show(display.image)
+
+    path = tmp_path / 'blocked.png'
+    display.backend.dump_png(str(path))
+    assert path.exists()
+    assert path.stat().st_size > 0
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_static_layer_is_composed_once(create_display):
+    """ Static content is drawn once and reused by later frames """
+    display = create_display(FixtureStatGrabber())
+    compose_calls = []
+
+    def compose():
+        compose_calls.append(1)
+        display.draw_text((0, 0), 'CPU: ', font=display.half_font)
+
+    display.start_from_static_layer('test', compose)
+    first_frame = display.image.tobytes()
+    display.clear_display()
+    display.start_from_static_layer('test', compose)
+
+    assert len(compose_calls) == 1
+    assert display.image.tobytes() == first_frame
+
+    # Fonts changes invalidate all layers
+    display.init_fonts()
+    display.start_from_static_layer('test', compose)
+    assert len(compose_calls) == 2
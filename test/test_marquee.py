@@ -0,0 +1,87 @@
+import os
+import pytest
+from PIL import Image, ImageDraw, ImageFont
+from src.marquee import Marquee, MARQUEE_PAUSE, MARQUEE_WRAP
+from src.text_cache import TextCache
+from src.page_canvas import PageCanvas
+
+FONT_DIRECTORY = os.path.join(os.path.dirname(__file__), '..', 'fonts')
+font = ImageFont.truetype(os.path.join(FONT_DIRECTORY, 'PressStart2P.ttf'), 8)
+
+LONG_TEXT = 'Partly cloudy 21°C RH:64%'
+
+
+def draw_direct(position, text):
+    image = Image.new('1', (128, 32))
+    ImageDraw.Draw(image).text(position, text, font=font, fill=255)
+    return image
+
+
+def draw_marquee(marquee, position):
+    canvas = PageCanvas(128, 32)
+    marquee.draw(canvas, position)
+    return canvas.to_image()
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_short_text_is_static(clock):
+    """ Text that fits is drawn like plain text """
+    marquee = Marquee('Top Client:', font, 128, TextCache(), clock=clock)
+    assert not marquee.scrolling
+
+    clock.now += 5
+    assert draw_marquee(marquee, (0, 8)).tobytes() == draw_direct((0, 8), 'Top Client:').tobytes()
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_pause_mode_follows_elapsed_time(clock):
+    """ Pauses at both ends and scrolls at constant speed in between """
+    marquee = Marquee(LONG_TEXT, font, 128, TextCache(), mode=MARQUEE_PAUSE,
+                      speed=20, pause=1.0, clock=clock)
+    assert marquee.scrolling
+    travel = marquee.text_width - 128
+
+    assert marquee.offset(clock.now + 0.5) == 0
+    assert marquee.offset(clock.now + 1.5) == 10
+    assert marquee.offset(clock.now + 1.0 + travel / 20 + 0.5) == travel
+
+    # The viewport equals plain text drawn at the negative offset
+    clock.now += 1.5
+    assert draw_marquee(marquee, (0, 16)).tobytes() == draw_direct((-10, 16), LONG_TEXT).tobytes()
+
+    # Starts over after the second pause
+    assert marquee.offset(clock.now - 1.5 + 2.0 + travel / 20 + 0.25) == 0
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_wrap_mode_repeats_text(clock):
+    """ The text follows itself after the gap """
+    marquee = Marquee(LONG_TEXT, font, 128, TextCache(), mode=MARQUEE_WRAP,
+                      speed=16, gap=16, clock=clock)
+    period = marquee.text_width + 16
+
+    clock.now += period / 16
+    assert marquee.offset() == 0
+
+    clock.now += 1.25
+    expected = draw_direct((-20, 0), LONG_TEXT)
+    ImageDraw.Draw(expected).text((period - 20, 0), LONG_TEXT, font=font, fill=255)
+    assert draw_marquee(marquee, (0, 0)).tobytes() == expected.tobytes()
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_strip_is_rendered_once(clock):
+    """ Frames only copy from the strip, the text is not rasterized again """
+    cache = TextCache()
+    marquee = Marquee(LONG_TEXT, font, 128, cache, clock=clock)
+    misses = cache.misses
+
+    for _ in range(100):
+        clock.now += 1 / 30
+        draw_marquee(marquee, (0, 0))
+    assert cache.misses == misses
+    assert cache.hits == 0
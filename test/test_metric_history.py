@@ -0,0 +1,100 @@
+import pytest
+import numpy as np
+from src.metric_history import RingBuffer, MetricHistory, column_heights, bar_graph
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_ring_buffer_wraps_around():
+    """ Appending beyond the capacity drops the oldest samples """
+    ring = RingBuffer(4)
+    for value in range(3):
+        ring.append(value)
+    assert ring.values().tolist() == [0, 1, 2]
+
+    for value in range(3, 7):
+        ring.append(value)
+    assert ring.values().tolist() == [3, 4, 5, 6]
+    assert ring.nbytes() == 16
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_resolutions_average_samples():
+    """ Coarser resolutions hold the average of their step """
+    history = MetricHistory(metrics=['cpu'], resolutions=[(60, 10), (600, 10)])
+    for minute in range(21):
+        history.add({'cpu': minute % 10}, now=minute * 60)
+
+    # The current step is not complete yet
+    assert history.values('cpu', 0).tolist() == [0, 1, 2, 3, 4, 5, 6, 7, 8, 9]
+    assert history.values('cpu', 1).tolist() == [4.5, 4.5]
+
+    # Missing samples are skipped, minute 20 is completed by the next sample
+    history.add({'cpu': float('nan')}, now=21 * 60)
+    history.add({'cpu': None}, now=22 * 60)
+    assert history.values('cpu', 0)[-1] == 9
+    history.add({'cpu': 5}, now=23 * 60)
+    assert history.values('cpu', 0)[-1] == 0
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_memory_is_fixed():
+    """ The sample arrays are allocated once, a day per minute fits in tens of KB """
+    history = MetricHistory()
+    nbytes = history.nbytes()
+    assert nbytes < 64 * 1024
+
+    for minute in range(3 * 24 * 60):
+        history.add({'cpu': 50.0, 'memory': 20.0, 'blocked_percentage': 10.0}, now=minute * 60)
+    assert history.nbytes() == nbytes
+    assert len(history.values('cpu')) == 24 * 60
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_column_heights():
+    """ Samples are reduced to the peak of each column, newest last """
+    values = np.array([10, 100, 0, 50, 0], dtype=np.float32)
+    assert column_heights(values, 10, 10).tolist() == [1, 10, 0, 5, 0]
+    # Padded at the front: (0, 10), (100, 0), (50, 0)
+    assert column_heights(values, 3, 10).tolist() == [1, 10, 5]
+    assert len(column_heights(np.zeros(0, dtype=np.float32), 3, 10)) == 0
+
+    assert bar_graph([0, 1, 3], 3).tolist() == [[False, False, True],
+                                                 [False, False, True],
+                                                 [False, True, True]]
+
+
+class FixtureStatGrabber():
+    """ Offline stand-in for StatGrabber """
+
+    def __init__(self):
+        self.metric_history = MetricHistory()
+        for minute in range(61):
+            self.metric_history.add({'cpu': 100.0 if minute == 59 else 0.0,
+                                     'blocked_percentage': 50.0}, now=minute * 60)
+
+    def get_metric_history(self):
+        return self.metric_history
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_history_view(create_display):
+    """ The graphs end at the right edge with the newest sample """
+    display = create_display(FixtureStatGrabber())
+    display.update_history_view()
+    assert display.history_values == {'cpu': '100', 'blocked_percentage': '50'}
+
+    display.draw_history_view()
+    pixels = np.array(display.image)
+    x, y, columns, height = display.history_graph_box(0)
+    newest = x + columns - 1
+    assert pixels[y:y + height, newest].all()
+    assert not pixels[y:y + height, newest - 1].any()
+
+    x, y, columns, height = display.history_graph_box(1)
+    assert pixels[y + height - 1, newest - 59:newest + 1].all()
+    assert not pixels[y + height - 1, newest - 60]
@@ -0,0 +1,81 @@
+import psutil
+import pytest
+from src.metric_sampler import MetricSampler
+
+
+class Readings():
+    """ Returns the given readings in order and counts the reads """
+
+    def __init__(self, *values):
+        self.values = list(values)
+        self.read_count = 0
+
+    def __call__(self):
+        self.read_count += 1
+        value = self.values.pop(0)
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_sampled_once_per_interval(clock):
+    """ Reads within the interval are served from the cache """
+    read = Readings(10, 20)
+    sampler = MetricSampler(clock=clock)
+    sampler.register('memory', read, interval=2)
+
+    for frame in range(30):
+        assert sampler.get('memory') == 10
+        clock.now += 0.0625
+    assert read.read_count == 1
+
+    clock.now += 0.125
+    assert sampler.get('memory') == 20
+    assert read.read_count == 2
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_smoothing(clock):
+    """ New samples move the value by alpha towards the reading """
+    sampler = MetricSampler(clock=clock)
+    sampler.register('cpu', Readings(0, 100, 100), interval=1, alpha=0.5)
+
+    values = []
+    for second in range(3):
+        values.append(sampler.get('cpu'))
+        clock.now += 1
+    assert values == [0, 50, 75]
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_failed_reading_keeps_value(clock):
+    """ A failing reading is counted and the last value is served """
+    sampler = MetricSampler(clock=clock)
+    sampler.register('cpu', Readings(42, OSError('gone')), interval=1)
+
+    assert sampler.get('cpu') == 42
+    clock.now += 1.5
+    assert sampler.get('cpu') == 42
+
+    status = sampler.get_status()['cpu']
+    assert status == {'value': 42, 'age': 0, 'interval': 1, 'samples': 1, 'errors': 1}
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_default_until_first_reading(clock):
+    """ The default is served until a reading succeeds, which then replaces it unsmoothed """
+    sampler = MetricSampler(clock=clock)
+    sampler.register('cpu', Readings(psutil.AccessDenied(), ValueError('empty'), 80),
+                     interval=1, alpha=0.5)
+
+    assert sampler.get('cpu') == 0.0
+    clock.now += 1
+    assert sampler.get('cpu') == 0.0
+    clock.now += 1
+    assert sampler.get('cpu') == 80
+    assert sampler.get_status()['cpu']['errors'] == 2
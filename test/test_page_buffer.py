@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+from src.page_buffer import dirty_windows, window_payload, window_cost, image_to_page_buffer, pages_to_pixels
+
+WIDTH = 128
+PAGES = 4
+
+
+def blank_frame():
+    return bytearray(WIDTH * PAGES)
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_dirty_windows_without_previous_frame():
+    """ First transfer has to cover the whole screen """
+    result = dirty_windows(None, blank_frame(), WIDTH, PAGES)
+    assert result == [(0, PAGES - 1, 0, WIDTH - 1)]
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_dirty_windows_static_frame():
+    """ Unchanged frames do not cause any transfer """
+    frame = blank_frame()
+    frame[5] = 0xFF
+    assert dirty_windows(bytes(frame), bytes(frame), WIDTH, PAGES) == []
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_dirty_windows_progress_column():
+    """ Swap progress bar in the last column only sends a single column """
+    previous = blank_frame()
+    current = blank_frame()
+    for page in range(PAGES):
+        current[page * WIDTH + WIDTH - 1] = 0x80
+
+    result = dirty_windows(bytes(previous), bytes(current), WIDTH, PAGES)
+    assert result == [(0, PAGES - 1, WIDTH - 1, WIDTH - 1)]
+    assert window_cost(result) < WIDTH * PAGES
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_dirty_windows_keeps_separate_pages():
+    """ Distant changes are sent as individual windows when that is cheaper """
+    previous = blank_frame()
+    current = blank_frame()
+    # wide change on the first page, single column on the last page
+    for column in range(0, 100):
+        current[column] = 0x01
+    current[3 * WIDTH + WIDTH - 1] = 0x80
+
+    result = dirty_windows(bytes(previous), bytes(current), WIDTH, PAGES)
+    assert result == [(0, 0, 0, 99), (3, 3, WIDTH - 1, WIDTH - 1)]
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_window_payload_order():
+    """ Payload is ordered page by page, column by column """
+    frame = bytes(range(WIDTH)) * PAGES
+    payload = window_payload(frame, (1, 2, 3, 4), WIDTH)
+    assert payload == bytes([3, 4, 3, 4])
+
+
+def reference_page_buffer(image):
+    """ Per-pixel conversion as done by adafruit_ssd1306 image() """
+    width, height = image.size
+    buffer = bytearray(width * height // 8)
+    pixels = image.load()
+    for x in range(width):
+        for y in range(height):
+            if pixels[(x, y)]:
+                buffer[(y // 8) * width + x] |= 1 << (y % 8)
+    return bytes(buffer)
+
+
+def sample_image():
+    image = Image.new('1', (128, 32))
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((3, 5, 60, 20), fill=1)
+    draw.line((0, 31, 127, 0), fill=1)
+    draw.rectangle((100, 2, 120, 29), outline=1)
+    return image
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_conversion_matches_reference():
+    """ Vectorized conversion produces the driver's page layout """
+    image = sample_image()
+    assert image_to_page_buffer(image, 128, 4) == reference_page_buffer(image)
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_round_trip():
+    """ Page bytes unpack into the original pixels """
+    image = sample_image()
+    pages = np.frombuffer(image_to_page_buffer(image, 128, 4), dtype=np.uint8).reshape(4, 128)
+    assert Image.fromarray(pages_to_pixels(pages)).tobytes() == image.tobytes()
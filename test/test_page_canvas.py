@@ -0,0 +1,133 @@
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+from src.page_canvas import PageCanvas
+from src.page_buffer import image_to_page_buffer
+
+
+def reference_page_buffer(image):
+    """ Per-pixel conversion as done by adafruit_ssd1306 image() """
+    width, height = image.size
+    buffer = bytearray(width * height // 8)
+    pixels = image.load()
+    for x in range(width):
+        for y in range(height):
+            if pixels[(x, y)]:
+                buffer[(y // 8) * width + x] |= 1 << (y % 8)
+    return bytes(buffer)
+
+
+def sample_image():
+    image = Image.new('1', (128, 32))
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((3, 5, 60, 20), fill=1)
+    draw.line((0, 31, 127, 0), fill=1)
+    draw.rectangle((100, 2, 120, 29), outline=1)
+    return image
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_conversion_matches_reference():
+    """ Vectorized conversion produces the driver's page layout """
+    image = sample_image()
+    assert image_to_page_buffer(image, 128, 4) == reference_page_buffer(image)
+    assert PageCanvas.from_image(image).tobytes() == reference_page_buffer(image)
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_round_trip():
+    image = sample_image()
+    assert PageCanvas.from_image(image).to_image().tobytes() == image.tobytes()
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+@pytest.mark.parametrize('rect', [(3, 5, 60, 20), (0, 0, 127, 31), (10, 9, 10, 14), (-5, -5, 4, 3), (120, 30, 140, 40)])
+def test_fill_rect_matches_pil(rect):
+    """ Filled rectangles match PIL, including clipping """
+    image = Image.new('1', (128, 32))
+    ImageDraw.Draw(image).rectangle(rect, fill=1)
+
+    canvas = PageCanvas()
+    canvas.fill_rect(*rect)
+    assert canvas.tobytes() == reference_page_buffer(image)
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_fill_rect_clears():
+    canvas = PageCanvas()
+    canvas.clear(fill=1)
+    canvas.fill_rect(0, 3, 127, 12, color=0)
+    pixels = np.asarray(canvas.to_image())
+    assert pixels[:3].all()
+    assert not pixels[3:13].any()
+    assert pixels[13:].all()
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+@pytest.mark.parametrize('position', [(0, 0), (13, 5), (-7, -3), (120, 27)])
+def test_blit_matches_pil(position):
+    """ Unaligned and clipped blits match PIL bitmap drawing """
+    bitmap = Image.new('1', (20, 11))
+    ImageDraw.Draw(bitmap).ellipse((0, 0, 19, 10), outline=1)
+
+    image = sample_image()
+    ImageDraw.Draw(image).bitmap(position, bitmap, fill=1)
+
+    canvas = PageCanvas.from_image(sample_image())
+    canvas.blit(bitmap, *position)
+    assert canvas.tobytes() == reference_page_buffer(image)
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_shift_window():
+    """ Only the window rows move, scrolled in columns are cleared """
+    canvas = PageCanvas()
+    canvas.fill_rect(0, 0, 127, 31)
+    canvas.shift_window(0, 10, 127, 17, -4)
+
+    pixels = np.asarray(canvas.to_image())
+    assert pixels[10:18, :124].all()
+    assert not pixels[10:18, 124:].any()
+    assert pixels[:10].all()
+    assert pixels[18:].all()
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_paste_pages_replaces():
+    """ Pasted pages replace the covered bytes, blitted pages are ORed. Both are clipped """
+    canvas = PageCanvas()
+    canvas.fill_rect(0, 0, 127, 31)
+    layer = canvas.copy_pages()
+
+    canvas.paste_pages(np.zeros((4, 8), dtype=np.uint8), 124, 0)
+    pixels = np.asarray(canvas.to_image())
+    assert not pixels[:, 124:].any()
+    assert pixels[:, :124].all()
+
+    canvas.blit_pages(np.full((2, 2), 0x01, dtype=np.uint8), 127, 3)
+    assert np.asarray(canvas.to_image())[24, 127]
+
+    canvas.restore_pages(layer)
+    assert np.asarray(canvas.to_image()).all()
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+@pytest.mark.parametrize('position', [(-3, -1), (126, 3), (130, 0), (0, 5)])
+def test_blit_pages_clips(position):
+    """ Pre-packed pages outside of the canvas are clipped like bitmaps """
+    pages = np.full((2, 6), 0xFF, dtype=np.uint8)
+    x, page = position
+    image = Image.new('1', (128, 32))
+    ImageDraw.Draw(image).rectangle((x, page * 8, x + 5, page * 8 + 15), fill=1)
+
+    canvas = PageCanvas()
+    canvas.blit_pages(pages, x, page)
+    assert canvas.tobytes() == reference_page_buffer(image)
@@ -0,0 +1,86 @@
+import pytest
+from src.proc_metrics import ProcMetrics, human_gigabytes, GIB
+from src.stat_grabber import StatGrabber
+
+ARP = '''IP address       HW type     Flags       HW address            Mask     Device
+192.168.1.1      0x1         0x2         a0:b1:c2:d3:e4:f5     *        eth0
+192.168.1.23     0x1         0x2         00:11:22:33:44:55     *        eth0
+192.168.1.42     0x1         0x0         00:00:00:00:00:00     *        eth0
+'''
+
+MEMINFO = '''MemTotal:        1000000 kB
+MemFree:          200000 kB
+MemAvailable:     750000 kB
+Buffers:           50000 kB
+Cached:           400000 kB
+HugePages_Total:       0
+'''
+
+
+def create_proc_root(tmp_path):
+    (tmp_path / 'net').mkdir()
+    (tmp_path / 'net' / 'arp').write_text(ARP)
+    (tmp_path / 'meminfo').write_text(MEMINFO)
+    (tmp_path / 'loadavg').write_text('0.52 0.31 0.27 1/123 4567\n')
+    (tmp_path / 'uptime').write_text('12345.67 45678.90\n')
+    return str(tmp_path)
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_proc_files(tmp_path):
+    """ Neighbours, load, uptime and memory are parsed from /proc files """
+    metrics = ProcMetrics(proc_root=create_proc_root(tmp_path))
+
+    entries = metrics.arp_entries()
+    assert [entry['ip'] for entry in entries] == ['192.168.1.1', '192.168.1.23', '192.168.1.42']
+    assert entries[1] == {'ip': '192.168.1.23', 'flags': 0x2, 'mac': '00:11:22:33:44:55', 'device': 'eth0'}
+
+    assert metrics.load_average() == (0.52, 0.31, 0.27)
+    assert metrics.uptime() == 12345.67
+
+    assert metrics.memory_info()['HugePages_Total'] == 0
+    assert metrics.memory_usage() == (250000 * 1024, 1000000 * 1024)
+    assert metrics.memory_percentage() == 25.0
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_missing_proc_files(tmp_path):
+    """ Missing files raise OSError, the stat grabber falls back to the shell then """
+    metrics = ProcMetrics(proc_root=str(tmp_path))
+    with pytest.raises(OSError):
+        metrics.load_average()
+    with pytest.raises(OSError):
+        metrics.arp_entries()
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_human_gigabytes():
+    """ Sizes are rounded up like df -h """
+    assert human_gigabytes(3.01 * GIB) == 3.1
+    assert human_gigabytes(9.0 * GIB) == 9.0
+    assert human_gigabytes(28.2 * GIB) == 29
+
+
+@pytest.mark.linux
+def test_stat_grabber_shapes(tmp_path):
+    """ The public getters keep their shapes with the native reader """
+    stat_grabber = StatGrabber()
+    stat_grabber.proc_metrics = ProcMetrics(proc_root=create_proc_root(tmp_path))
+
+    # Same count as arp -a | wc -l minus one
+    assert stat_grabber.get_active_network_device_count() == 2
+    assert stat_grabber.stats['active_device_count'] == 2
+    assert stat_grabber.get_memory_ratio() == (244.1, 976.6)
+    assert stat_grabber.get_load_average() == (0.52, 0.31, 0.27)
+
+    disk_space = stat_grabber.get_disk_space()
+    assert isinstance(disk_space, str)
+    used, total = disk_space.split(' GB  ')[0].split('/')
+    assert int(used) <= int(total)
+    assert disk_space.endswith('%')
+
+    local_ip = stat_grabber.get_local_ip()
+    assert isinstance(local_ip, str)
@@ -0,0 +1,127 @@
+import sqlite3
+import pytest
+import numpy as np
+from src.query_history import QueryHistory, HOUR
+
+NOW = 1000 * HOUR + 1800
+
+
+def create_database(path):
+    """ Returns a connection to a database with the queries table of pihole-FTL """
+    connection = sqlite3.connect(path)
+    connection.execute('CREATE TABLE queries (id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp INTEGER NOT NULL, '
+                       'type INTEGER NOT NULL, status INTEGER NOT NULL, domain TEXT NOT NULL, '
+                       'client TEXT NOT NULL, forward TEXT, additional_info TEXT)')
+    connection.execute('CREATE INDEX idx_queries_timestamps ON queries (timestamp)')
+    return connection
+
+
+def add_queries(connection, timestamp, statuses):
+    connection.executemany('INSERT INTO queries (timestamp, type, status, domain, client) VALUES (?, 1, ?, ?, ?)',
+                           [(timestamp, status, 'example.com', '192.168.1.23') for status in statuses])
+    connection.commit()
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_hourly_rollups(tmp_path):
+    """ Queries are counted per hour as blocked or allowed """
+    path = str(tmp_path / 'pihole-FTL.db')
+    connection = create_database(path)
+    # Older than the window
+    add_queries(connection, NOW - 30 * HOUR, [1, 2])
+    add_queries(connection, NOW - 2 * HOUR, [1, 4, 2, 3])
+    add_queries(connection, NOW, [5, 2])
+
+    history = QueryHistory(path, hours=3, clock=lambda: NOW)
+    assert history.refresh() == [(1000 * HOUR - 2 * HOUR, 2, 2),
+                                 (1000 * HOUR - HOUR, 0, 0),
+                                 (1000 * HOUR, 1, 1)]
+    assert history.get_stats()['rows_read'] == 6
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_refresh_reads_new_rows_only(tmp_path):
+    """ Every refresh continues after the last seen query id """
+    path = str(tmp_path / 'pihole-FTL.db')
+    connection = create_database(path)
+    add_queries(connection, NOW, [1, 2, 2])
+
+    history = QueryHistory(path, hours=2, clock=lambda: NOW)
+    history.refresh()
+    assert history.get_stats()['last_id'] == 3
+
+    history.refresh()
+    assert history.get_stats()['rows_read'] == 3
+
+    add_queries(connection, NOW + 60, [1])
+    assert history.refresh()[-1] == (1000 * HOUR, 2, 2)
+    assert history.get_stats()['rows_read'] == 4
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_rollups_are_bounded(tmp_path):
+    """ Hours leaving the window are dropped """
+    path = str(tmp_path / 'pihole-FTL.db')
+    connection = create_database(path)
+    now = [NOW]
+    history = QueryHistory(path, hours=4, clock=lambda: now[0])
+
+    for hour in range(48):
+        add_queries(connection, now[0], [1, 2])
+        history.refresh()
+        now[0] += HOUR
+
+    assert history.get_stats()['hours'] <= 4
+    assert [blocked for _, blocked, _ in history.get_history()] == [1, 1, 1, 0]
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_database_is_read_only(tmp_path):
+    """ The reader never writes to the FTL database """
+    path = str(tmp_path / 'pihole-FTL.db')
+    create_database(path)
+
+    history = QueryHistory(path, clock=lambda: NOW)
+    history.refresh()
+    with pytest.raises(sqlite3.OperationalError):
+        history.connection.execute('DELETE FROM queries')
+
+    missing = QueryHistory(str(tmp_path / 'missing.db'))
+    with pytest.raises(sqlite3.OperationalError):
+        missing.refresh()
+
+
+class FixtureStatGrabber():
+    """ Offline stand-in for StatGrabber """
+
+    def get_query_history(self):
+        # Quiet day, the newest hour is the busiest one
+        return [(hour * HOUR, 0, 10) for hour in range(23)] + [(23 * HOUR, 1500, 2500)]
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_query_view(create_display):
+    """ One bar per hour, the newest one at the right edge and scaled to the busiest hour """
+    display = create_display(FixtureStatGrabber())
+    display.update_query_view()
+    assert display.query_values == {'queries': '4k', 'blocked': '1k'}
+
+    display.draw_query_view()
+    pixels = np.array(display.image)
+    x, y, columns, height = display.history_graph_box(0)
+    bar_width = columns // 24
+    # Newest bar at full height, then the blank column between bars
+    newest = x + columns - 2
+    assert pixels[y:y + height, newest - bar_width + 2:newest + 1].all()
+    assert not pixels[y:y + height, newest + 1].any()
+    assert not pixels[y:y + height - 1, newest - bar_width].any()
+
+    x, y, columns, height = display.history_graph_box(1)
+    # 1500 of 4000 queries blocked
+    assert pixels[y + height - 6:y + height, newest].all()
+    assert not pixels[y:y + height - 6, newest].any()
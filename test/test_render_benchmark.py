@@ -0,0 +1,21 @@
+import json
+import pytest
+from benchmark.render_benchmark import run_benchmarks, VIEWS
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_render_benchmark_report(cache_config):
+    """ Every view is reported with machine-readable timings """
+    report = run_benchmarks(ticks=3, config=cache_config)
+
+    assert set(report['views']) == set(VIEWS)
+    for name, result in report['views'].items():
+        if 'skipped' in result:
+            continue
+        assert result['frames'] == 3
+        assert result['fps'] > 0
+        assert result['frame_time_p50_ms'] <= result['frame_time_p99_ms']
+
+    # Report is serializable
+    json.dumps(report)
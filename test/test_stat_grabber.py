@@ -1,5 +1,8 @@
+import os
+import subprocess
 import pytest
-from src.stat_grabber import StatGrabber
+from src.stat_grabber import StatGrabber, PIHOLE_DEADLINE
+from src.metric_history import MetricHistory
 
 stat_grabber = StatGrabber()
 
@@ -142,3 +145,65 @@ def test_get_pihole_stats():
         datetime.datetime.strptime(result, date_format)
     except ValueError:
         raise ValueError('Incorrect data format, should be {}'.format(date_format))
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_shell_commands_time_out(monkeypatch):
+    """ Hanging shell commands are given up before the collector deadline and
+    the last stats are kept """
+    timeouts = []
+
+    def hanging_check_output(cmd, shell, timeout):
+        timeouts.append(timeout)
+        raise subprocess.TimeoutExpired(cmd, timeout)
+
+    monkeypatch.setattr(subprocess, 'check_output', hanging_check_output)
+    grabber = StatGrabber()
+    grabber.stats = {'api': True, 'today_percentage': 23.0}
+    grabber.refresh_pihole_stats_no_api_access()
+
+    assert grabber.stats == {'api': True, 'today_percentage': 23.0}
+    assert timeouts and sum(timeouts) < PIHOLE_DEADLINE
+    assert grabber.get_disk_space() is not None
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+@pytest.mark.parametrize('name, known_client_count', [('synthetic-pihole-v5.2.4-dhcp-color', 12),
+                                                      ('synthetic-pihole-v5.3.1-disabled', 3)])
+def test_leased_client_count(monkeypatch, name, known_client_count):
+    """ The DHCP leases of pihole -c -e are the known clients, without them the leases file is counted """
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus', 'chronometer', name + '.txt')
+    with open(path, 'rb') as output_file:
+        output = output_file.read()
+
+    monkeypatch.setattr(subprocess, 'check_output', lambda cmd, shell, timeout: output)
+    grabber = StatGrabber()
+    grabber.client_index.lease_count = 3
+    grabber.refresh_pihole_stats_no_api_access()
+
+    assert grabber.stats['known_client_count'] == known_client_count
+    assert 'leased_client_count' not in grabber.stats
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_metric_history_skips_fallback_values(monkeypatch, clock):
+    """ Query totals are recorded, a blocked percentage the script did not report is not """
+    outputs = [b'Pi-hole: Active\nAds Today: 23.0% (Total: 4,321 of 18,765)\n',
+               b'Pi-hole: Active\nAds Today: n/a (Total: 4,400 of 19,000)\n',
+               b'Pi-hole: Active\nAds Today: 24.0% (Total: 4,500 of 19,100)\n']
+    monkeypatch.setattr(subprocess, 'check_output', lambda cmd, shell, timeout: outputs.pop(0))
+    grabber = StatGrabber()
+    grabber.metric_history = MetricHistory(clock=clock)
+
+    for minute in range(3):
+        grabber.refresh_pihole_stats_no_api_access()
+        grabber.sample_metric_history()
+        clock.now += 60
+    assert grabber.stats['today_percentage'] == 24.0
+
+    assert grabber.metric_history.values('queries').tolist() == [18765, 19000]
+    # The fallback 0.0 of the second minute is not recorded
+    assert grabber.metric_history.values('blocked_percentage').tolist() == [23.0]
@@ -0,0 +1,74 @@
+import os
+import pytest
+from PIL import Image, ImageDraw, ImageFont
+from src.text_cache import TextCache
+from src.page_canvas import PageCanvas
+
+FONT_DIRECTORY = os.path.join(os.path.dirname(__file__), '..', 'fonts')
+font = ImageFont.truetype(os.path.join(FONT_DIRECTORY, 'PressStart2P.ttf'), 8)
+
+
+def paste_cached(cache, position, text):
+    image = Image.new('1', (128, 32))
+    bitmap, offset = cache.render(text, font)
+    ImageDraw.Draw(image).bitmap((position[0] + offset[0], position[1] + offset[1]),
+                                 bitmap,
+                                 fill=255)
+    return image
+
+
+def draw_direct(position, text):
+    image = Image.new('1', (128, 32))
+    ImageDraw.Draw(image).text(position, text, font=font, fill=255)
+    return image
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+@pytest.mark.parametrize('position', [(0, 0), (30, 8), (-17, 24)])
+def test_cached_bitmap_matches_direct_rendering(position):
+    """ Pasted bitmaps are pixel identical to draw.text """
+    cache = TextCache()
+    text = 'Blocked today: (1,234/56,789'
+    assert paste_cached(cache, position, text).tobytes() == draw_direct(position, text).tobytes()
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_render_is_cached():
+    """ Strings are rasterized only once """
+    cache = TextCache()
+    first = cache.render('Blocked today:', font)
+    second = cache.render('Blocked today:', font)
+
+    assert first is second
+    assert cache.get_stats()['hits'] == 1
+    assert cache.get_stats()['misses'] == 1
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_lru_eviction():
+    """ Least recently used entries are dropped first """
+    cache = TextCache(capacity=2)
+    cache.text_width('a', font)
+    cache.text_width('b', font)
+    cache.text_width('a', font)
+    cache.text_width('c', font)
+
+    assert ('a', font) in cache.widths
+    assert ('b', font) not in cache.widths
+    assert len(cache.widths) == 2
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+@pytest.mark.parametrize('position', [(0, 0), (30, 5), (-17, 27), (3, -2)])
+def test_cached_pages_match_direct_rendering(position):
+    """ Pre-packed text blitted onto a canvas is pixel identical to draw.text """
+    cache = TextCache()
+    canvas = PageCanvas(128, 32)
+    for _ in range(2):
+        pages, offset = cache.render_pages('Blocked today: gjpqy', font, position[1])
+        canvas.blit_pages(pages, position[0] + offset[0], (position[1] + offset[1]) >> 3)
+    assert canvas.to_image().tobytes() == draw_direct(position, 'Blocked today: gjpqy').tobytes()
@@ -0,0 +1,86 @@
+import json
+import pytest
+from src.weather_cache import WeatherCache
+# The error class as imported by stat_grabber
+from src.stat_grabber import StatGrabber, WeatherError
+
+WEATHER = {'weatherDesc': [{'value': 'Partly cloudy'}],
+           'precipMM': '1.2',
+           'winddir16Point': 'WSW',
+           'windspeedKmph': '17',
+           'pressure': '998',
+           'temp_C': '19',
+           'humidity': '81'}
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_cache_survives_restart(tmp_path, clock):
+    """ Stored weather is loaded by the next process with its fetch time """
+    path = str(tmp_path / 'cache' / 'weather.json')
+    WeatherCache(path, clock=clock).store(WEATHER)
+
+    with open(path) as cache_file:
+        assert json.load(cache_file)['fetched_at'] == 1000.0
+
+    clock.now += 60
+    cache = WeatherCache(path, ttl=900, clock=clock)
+    assert cache.load()
+    assert cache.age() == 60
+    assert cache.is_fresh()
+    assert cache.get() == dict(WEATHER, connection=True)
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_ttl_and_max_age(tmp_path, clock):
+    """ Stale weather is served until max_age, but needs revalidation after the TTL """
+    cache = WeatherCache(str(tmp_path / 'weather.json'), ttl=900, max_age=3600, clock=clock)
+    assert not cache.load()
+    assert cache.get() is None
+
+    cache.store(WEATHER)
+    clock.now += 1000
+    assert not cache.is_fresh()
+    assert cache.get()['temp_C'] == '19'
+
+    clock.now += 3000
+    assert cache.get() is None
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_corrupt_cache(tmp_path):
+    """ An unreadable cache is ignored """
+    path = tmp_path / 'weather.json'
+    path.write_text('{"weather": ')
+    assert not WeatherCache(str(path)).load()
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_failed_refresh_serves_cached_weather(tmp_path, clock):
+    """ The stat grabber revalidates expired weather and keeps the last good one on failure """
+    stat_grabber = StatGrabber()
+    stat_grabber.weather_cache = WeatherCache(str(tmp_path / 'weather.json'), ttl=900, max_age=3600, clock=clock)
+    stat_grabber.weather_cache.store(WEATHER)
+
+    requests = []
+    def load(location):
+        requests.append(clock.now)
+        raise WeatherError('offline')
+    stat_grabber.weather_client.load = load
+
+    # Fresh: not fetched again
+    stat_grabber.weather = {'connection': False}
+    stat_grabber.load_weather()
+    assert requests == []
+
+    # Expired and offline: last good weather
+    clock.now += 1000
+    assert stat_grabber.load_weather() == dict(WEATHER, connection=True)
+    assert requests == [clock.now]
+
+    # Too old to be shown
+    clock.now += 3000
+    assert stat_grabber.load_weather() == {'connection': False}
@@ -0,0 +1,136 @@
+import asyncio
+import threading
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from src.weather_client import WeatherClient, WeatherError, parse_lean_weather, LEAN_FORMAT
+
+LEAN_WEATHER = 'Partly cloudy|+19°C|81%|↙17km/h|1.2mm|998hPa\n'
+
+
+class FixedRandom():
+    """ Jitter at its maximum """
+
+    def uniform(self, low, high):
+        return high
+
+
+def create_app(requests, delay=0, status=200):
+    """ Returns a stand-in for wttr.in that records its requests """
+    async def handle_weather(request):
+        requests.append({'location': request.match_info['location'],
+                         'query': dict(request.query),
+                         'accept_encoding': request.headers.get('Accept-Encoding', ''),
+                         'peer': request.transport.get_extra_info('peername')})
+        if delay:
+            await asyncio.sleep(delay)
+        response = web.Response(text=LEAN_WEATHER, status=status)
+        response.enable_compression()
+        return response
+
+    app = web.Application()
+    app.router.add_get('/{location}', handle_weather)
+    return app
+
+
+async def fetch_from_stand_in(app, client, locations):
+    server = TestServer(app)
+    await server.start_server()
+    client.url = str(server.make_url('/')) + '{location}'
+    try:
+        results = []
+        for location in locations:
+            try:
+                results.append(await client.fetch(location))
+            except WeatherError as exc:
+                results.append(exc)
+        return results
+    finally:
+        await client.close()
+        await server.close()
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_parse_lean_weather():
+    """ The lean format yields the current_condition keys of the weather view """
+    assert parse_lean_weather(LEAN_WEATHER) == {'weatherDesc': [{'value': 'Partly cloudy'}],
+                                                'temp_C': '19',
+                                                'humidity': '81',
+                                                'winddir16Point': 'NE',
+                                                'windspeedKmph': '17',
+                                                'precipMM': '1.2mm',
+                                                'pressure': '998'}
+    assert parse_lean_weather('Clear|-3°C|60%|↑5km/h|0.0mm|1021hPa')['temp_C'] == '-3'
+    with pytest.raises(ValueError):
+        parse_lean_weather('Unknown location; please try ~53.5,-97.9')
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_pooled_compressed_requests():
+    """ Requests share a keep-alive connection, ask for gzip and the lean format """
+    requests = []
+    client = WeatherClient()
+    results = asyncio.run(fetch_from_stand_in(create_app(requests), client, ['winkler manitoba', 'Berlin']))
+
+    assert results[0]['temp_C'] == '19'
+    assert requests[0]['location'] == 'winkler+manitoba'
+    assert requests[0]['query']['format'] == LEAN_FORMAT
+    assert 'gzip' in requests[0]['accept_encoding']
+    assert requests[0]['peer'] == requests[1]['peer']
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_read_timeout():
+    """ A server that does not answer in time fails the request """
+    requests = []
+    client = WeatherClient(connect_timeout=1, read_timeout=0.2)
+    results = asyncio.run(fetch_from_stand_in(create_app(requests, delay=1), client, ['Berlin']))
+    assert isinstance(results[0], WeatherError)
+    assert client.failure_count == 1
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_backoff_with_jitter(clock):
+    """ Failed requests double the wait before the next attempt, up to a maximum """
+    requests = []
+    client = WeatherClient(backoff_base=30, backoff_max=100, clock=clock, rng=FixedRandom())
+    results = asyncio.run(fetch_from_stand_in(create_app(requests, status=503), client, ['Berlin', 'Berlin']))
+
+    # The second fetch is not sent while backing off
+    assert all(isinstance(result, WeatherError) for result in results)
+    assert len(requests) == 1
+    assert client.next_attempt == 1030
+
+    clock.now = 1030
+    client.record_failure()
+    assert client.next_attempt == 1030 + 60
+    client.record_failure()
+    assert client.next_attempt == 1030 + 100
+
+    client.record_success()
+    assert not client.is_backing_off()
+
+
+@pytest.mark.linux
+@pytest.mark.mac
+def test_sync_load():
+    """ Collector threads load the weather through the client's own event loop """
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+
+    server = TestServer(create_app([]))
+    asyncio.run_coroutine_threadsafe(server.start_server(), loop).result(5)
+    client = WeatherClient(url=str(server.make_url('/')) + '{location}')
+    try:
+        assert client.load('Berlin')['pressure'] == '998'
+        assert client.load('Berlin')['humidity'] == '81'
+        assert client.request_count == 2
+    finally:
+        client.shutdown()
+        asyncio.run_coroutine_threadsafe(server.close(), loop).result(5)
+        loop.call_soon_threadsafe(loop.stop)